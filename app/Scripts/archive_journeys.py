@@ -0,0 +1,38 @@
+"""
+Move completed journeys older than N days from the hot table into the archive.
+
+    python -m app.Scripts.archive_journeys --days 30
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import SessionLocal, init_engine
+from app.Services.Archive.archive import JourneyArchiver
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive completed journeys")
+    parser.add_argument("--days", type=int, default=30, help="Archive journeys that ended more than this many days ago")
+    parser.add_argument("--root", default=None, help="Archive directory (default JOURNEY_ARCHIVE_PATH)")
+    args = parser.parse_args()
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        count = JourneyArchiver.archive_completed(db, older_than_days=args.days, root=args.root)
+        print(f"Archived {count:,} journeys")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+One-off: add `active_journeys` rows for journeys that were already in progress
+before the hot table existed, so they can be expired like any other.
+
+    python -m app.Scripts.backfill_active_journeys
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import Base, SessionLocal, init_engine
+from app.models.Journey import ActiveJourney
+from app.Services.journeyService.active_store import active_store
+
+
+def main():
+    engine = init_engine()
+    Base.metadata.create_all(engine, tables=[ActiveJourney.__table__])
+    db = SessionLocal()
+    try:
+        count = active_store.backfill(db)
+        print(f"Tracked {count:,} active journeys")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Replay completed journeys through prediction variants and compare their errors.
+
+    python -m app.Scripts.backtest_predictions --predictors service hourly recorded --since 2026-06-01
+    python -m app.Scripts.backtest_predictions --routes 16-O 16-I --workers 4 --out report.json
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import init_engine
+from app.Services.Backtest.backtest import PREDICTORS, WARMUP_DAYS, Backtest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest prediction variants against journey history")
+    parser.add_argument("--predictors", nargs="+", default=["service", "recorded"], choices=sorted(PREDICTORS))
+    parser.add_argument("--routes", nargs="*", default=None, help="Route ids (default all with completed journeys)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Score journeys from (ISO)")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="Score journeys until, exclusive")
+    parser.add_argument("--warmup-days", type=int, default=WARMUP_DAYS, help="History replayed before --since")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default CPU count)")
+    parser.add_argument("--out", default=None, help="Write the full report (by route and hour) as JSON")
+    args = parser.parse_args()
+
+    init_engine()
+    report = Backtest.run(
+        args.predictors,
+        route_ids=args.routes,
+        since=args.since,
+        until=args.until,
+        workers=args.workers,
+        warmup_days=args.warmup_days,
+    )
+
+    print(f"{report['journeys']:,} journeys, {report['routes']} routes, {report['seconds']}s")
+    print(f"{'predictor':<12}{'MAE':>8}{'bias':>8}{'p50':>8}{'p90':>8}{'p95':>8}{'<=5min':>9}")
+    for name, result in report["predictors"].items():
+        o = result["overall"]
+        if not o["journeys"]:
+            print(f"{name:<12}{'no predictions':>49}")
+            continue
+        print(
+            f"{name:<12}{o['mae_minutes']:>8}{o['bias_minutes']:>8}{o['p50_abs_minutes']:>8}"
+            f"{o['p90_abs_minutes']:>8}{o['p95_abs_minutes']:>8}{o['within_5_min_pct']:>8}%"
+        )
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
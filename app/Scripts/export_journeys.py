@@ -0,0 +1,52 @@
+"""
+Stream journeys to a file (or stdout) as NDJSON or CSV, for offline model training.
+
+    python -m app.Scripts.export_journeys --format csv --route 16 --since 2026-01-01 --out journeys.csv
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import init_engine
+from app.Services.journeyService.export import FORMATS, JourneyExport
+from app.utils.logger.logger import get_logger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export journeys as NDJSON or CSV")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson")
+    parser.add_argument("--route", default=None, help="Only this route")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="created_at from (ISO format)")
+    parser.add_argument("--until", type=datetime.fromisoformat, default=None, help="created_at until, exclusive")
+    parser.add_argument("--data-source", default=None, help="user or official")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per fetch (default EXPORT_BATCH_SIZE)")
+    parser.add_argument("--hot-only", action="store_true", help="Skip journeys moved to the archive")
+    parser.add_argument("--out", default="-", help="Output file, - for stdout")
+    args = parser.parse_args()
+
+    if args.out == "-":
+        # The app logger writes to stdout, keep it out of the export
+        for handler in get_logger().handlers:
+            handler.setStream(sys.stderr)
+
+    init_engine()
+    filters = {"route_id": args.route, "start": args.since, "end": args.until, "data_source": args.data_source}
+    statement = JourneyExport.statement(**filters)
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    try:
+        for chunk in JourneyExport.stream(
+            args.format, statement, size=args.batch_size, archived=None if args.hot_only else filters,
+        ):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
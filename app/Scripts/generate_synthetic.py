@@ -0,0 +1,75 @@
+"""
+Generate synthetic journeys from the official timetable for load testing and
+prediction tuning. Needs a catalog snapshot (built from CIF_PATH).
+
+    python -m app.Scripts.generate_synthetic --per-route 100000 --user-share 0.3
+    python -m app.Scripts.generate_synthetic --clear
+"""
+
+import argparse
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import SessionLocal, init_engine
+from app.Services.Catalog.snapshot import get_catalog
+from app.Services.Synthetic.generator import SyntheticJourneyGenerator
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic journeys")
+    parser.add_argument("--per-route", type=int, default=10_000, help="Journeys per route")
+    parser.add_argument("--routes", nargs="*", default=None, help="Route ids (default all with official trips)")
+    parser.add_argument("--days", type=int, default=90, help="Spread journeys over this many days")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Last day (ISO, default today)")
+    parser.add_argument("--user-share", type=float, default=0.0, help="Fraction marked data_source=user")
+    parser.add_argument("--noise", type=float, default=0.12, help="Sigma of the lognormal duration noise")
+    parser.add_argument("--rush-factor", type=float, default=0.25, help="Extra duration share in weekday rush hours")
+    parser.add_argument("--delay-rate", type=float, default=0.08, help="Fraction of journeys with an incident delay")
+    parser.add_argument("--delay-mean", type=float, default=480.0, help="Mean incident delay in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--clear", action="store_true", help="Delete synthetic journeys (for --routes) instead")
+    args = parser.parse_args()
+
+    init_engine()
+    db = SessionLocal()
+    try:
+        if args.clear:
+            count = SyntheticJourneyGenerator.clear(db, args.routes)
+            print(f"Deleted {count:,} synthetic journeys")
+            return
+
+        catalog = get_catalog()
+        if catalog is None:
+            print("No catalog snapshot, build it first (python initdb.py)")
+            sys.exit(1)
+
+        generator = SyntheticJourneyGenerator(
+            catalog,
+            days=args.days,
+            end=args.end,
+            user_share=args.user_share,
+            noise=args.noise,
+            rush_factor=args.rush_factor,
+            delay_rate=args.delay_rate,
+            delay_mean_seconds=args.delay_mean,
+            seed=args.seed,
+        )
+        started = time.perf_counter()
+        count = generator.generate(db, args.per_route, args.routes)
+        elapsed = time.perf_counter() - started
+        print(f"Loaded {count:,} synthetic journeys in {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f}/s)")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,12 @@ import pandas as pd
 project_root = Path(__file__).resolve().parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-from app.models.Stop import Stop
-from app.models.Route import Route
-from app.models.RouteStop import RouteStop 
-from app.models.Database import engine, SessionLocal
-from app.models.base import Base
+from app.models.Route import Route, Stop, RouteStop
+from app.models.Database import SessionLocal, init_engine
 
 def populate_stops():
  
+    init_engine()
     db = SessionLocal()
     try:
         csv_path = Path(__file__).parent / "stops.csv"
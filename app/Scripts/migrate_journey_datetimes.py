@@ -0,0 +1,115 @@
+"""
+One-off: convert `journeys.predicted_arrival`, `official_start_time` and
+`official_end_time` from strings to timezone-aware timestamps.
+
+    python -m app.Scripts.migrate_journey_datetimes
+
+Stop the API first and deploy the new code after. The old columns are renamed
+to <name>_text, the new ones added and backfilled in id order, then the old
+ones dropped. Rerunning after a failure picks up where it stopped.
+    predicted_arrival    "YYYY-MM-DD HH:MM:SS" UTC
+    official_*_time      "HH:MM" local timetable time, placed on the local day
+                         of planned_start_time (created_at if none); an end
+                         before the start is the next day
+Values that don't parse become NULL. Archive part files aren't rewritten; the
+archive reader converts these columns from older parts the same way on decode.
+"""
+
+import argparse
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import DateTime, bindparam, inspect, text
+
+from app.models.Database import init_engine
+from app.models.Journey import Journey
+from app.utils.timetable import timetable_minute, timetable_span
+
+COLUMNS = ("predicted_arrival", "official_start_time", "official_end_time")
+
+
+def _arrival(value: str | None) -> datetime | None:
+    try:
+        return datetime.strptime(value.strip(), "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _prepare(engine) -> bool:
+    """Rename the string columns aside and add the new ones. False if already migrated."""
+    existing = {column["name"]: column["type"] for column in inspect(engine).get_columns("journeys")}
+    pending = [name for name in COLUMNS if f"{name}_text" not in existing]
+    if all(isinstance(existing.get(name), DateTime) for name in pending):
+        return any(f"{name}_text" in existing for name in COLUMNS)
+
+    column_type = DateTime(timezone=True).compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        for name in pending:
+            conn.execute(text(f"ALTER TABLE journeys RENAME COLUMN {name} TO {name}_text"))
+            if engine.dialect.name == "postgresql":
+                conn.execute(text(f"ALTER TABLE journeys ALTER COLUMN {name}_text DROP NOT NULL"))
+            conn.execute(text(f"ALTER TABLE journeys ADD COLUMN {name} {column_type}"))
+    return True
+
+
+def _backfill(engine, batch_size: int) -> int:
+    table = Journey.__table__
+    update = table.update().where(table.c.id == bindparam("b_id")).values(
+        predicted_arrival=bindparam("b_arrival"),
+        official_start_time=bindparam("b_start"),
+        official_end_time=bindparam("b_end"),
+    )
+    select_batch = text(
+        "SELECT id, planned_start_time, created_at, predicted_arrival_text, "
+        "official_start_time_text, official_end_time_text "
+        "FROM journeys WHERE id > :last ORDER BY id LIMIT :limit"
+    ).columns(planned_start_time=DateTime, created_at=DateTime)
+
+    last = ""
+    done = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(select_batch, {"last": last, "limit": batch_size}).all()
+            if not rows:
+                return done
+            params = []
+            for row in rows:
+                day = row.planned_start_time or row.created_at
+                start, end = timetable_span(
+                    day, timetable_minute(row.official_start_time_text), timetable_minute(row.official_end_time_text)
+                ) if day is not None else (None, None)
+                params.append({
+                    "b_id": row.id,
+                    "b_arrival": _arrival(row.predicted_arrival_text),
+                    "b_start": start,
+                    "b_end": end,
+                })
+            conn.execute(update, params)
+        last = rows[-1].id
+        done += len(rows)
+        print(f"  {done:,} journeys converted")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Store journey predicted/official times as timestamps")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    engine = init_engine()
+    if not _prepare(engine):
+        print("Already migrated")
+        return
+
+    count = _backfill(engine, args.batch_size)
+    with engine.begin() as conn:
+        for name in COLUMNS:
+            conn.execute(text(f"ALTER TABLE journeys DROP COLUMN {name}_text"))
+    print(f"Converted {count:,} journeys")
+
+
+if __name__ == "__main__":
+    main()
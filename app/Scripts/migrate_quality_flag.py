@@ -0,0 +1,36 @@
+"""
+One-off: add `journeys.quality_flag` to databases created before the
+data-quality check existed.
+
+    python -m app.Scripts.migrate_quality_flag
+
+Run it before deploying the code that reads the column. Existing rows are
+left NULL, which prediction stats treat as usable. Rerunning is a no-op.
+"""
+
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import String, inspect, text
+
+from app.models.Database import init_engine
+
+
+def main():
+    engine = init_engine()
+    existing = {column["name"] for column in inspect(engine).get_columns("journeys")}
+    if "quality_flag" in existing:
+        print("Already migrated")
+        return
+
+    column_type = String().compile(dialect=engine.dialect)
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE journeys ADD COLUMN quality_flag {column_type}"))
+    print("Added journeys.quality_flag")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Import-time budget check for the API process.
+
+Runs `python -X importtime -c "import main"` in a clean interpreter, prints the
+slowest modules and fails if the total import time goes over budget or a heavy
+module (pandas, pdfplumber, ...) ends up on the API import path.
+
+    python -m app.Scripts.profile_startup --budget-ms 1500
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+
+# Modules that belong to ingest scripts and must never load in a worker
+FORBIDDEN = ("pandas", "pdfplumber", "numpy", "celery")
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def profile_imports(target: str = "main") -> list[tuple[str, int, int]]:
+    """Returns (module, self_us, cumulative_us) for every module imported by `target`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=project_root,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--target", default="main")
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    modules = profile_imports(args.target)
+    total_ms = sum(self_us for _, self_us, _ in modules) / 1000
+
+    print(f"Slowest imports for '{args.target}':")
+    for name, _, cumulative in sorted(modules, key=lambda m: m[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"Total: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    forbidden = sorted({name for name, _, _ in modules if name.split(".")[0] in FORBIDDEN})
+    if forbidden:
+        print(f"FAIL: heavy modules on the import path: {', '.join(forbidden)}")
+        return 1
+    if total_ms > args.budget_ms:
+        print("FAIL: import time over budget")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
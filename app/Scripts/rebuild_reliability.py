@@ -0,0 +1,42 @@
+"""
+Create the `route_reliability` rollup table if needed and (re)build it from
+completed journeys, archived and hot. New completions keep it up to date after that.
+
+    python -m app.Scripts.rebuild_reliability [--since 2026-01-01]
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import Base, SessionLocal, init_engine
+from app.models.Reliability import RouteReliability
+from app.Services.Reliability.rollup import ReliabilityRollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild route reliability rollups")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None,
+                        help="Only rebuild from this date (ISO format), default everything")
+    args = parser.parse_args()
+
+    engine = init_engine()
+    Base.metadata.create_all(engine, tables=[RouteReliability.__table__])
+    db = SessionLocal()
+    try:
+        count = ReliabilityRollup.rebuild(db, since=args.since)
+        print(f"Rolled up {count:,} journeys")
+    except Exception as e:
+        db.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
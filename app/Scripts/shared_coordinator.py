@@ -0,0 +1,115 @@
+"""
+Coordinator for multi-worker deployments.
+
+Publishes the catalog snapshot and per-route prediction tables into shared
+memory for API workers started with the same SHARED_TABLES_NAME, and runs the
+background jobs so the workers don't have to:
+
+    SHARED_TABLES_NAME=bus-tracker python -m app.Scripts.shared_coordinator
+    SHARED_TABLES_NAME=bus-tracker SCHEDULER_MODE=worker uvicorn main:create_app --factory --workers 8
+"""
+
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.models.Database import SessionLocal, init_engine
+from app.Services.Catalog.snapshot import CatalogSnapshot, snapshot_path
+from app.Services.Prediction.prediction import PredictionService
+from app.Services.Scheduler import scheduler
+from app.Services.Shared.shared_tables import SharedTablesPublisher, pack_predictions
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+# Sources worth sharing; timetable and fallback predictions depend on the
+# rider's stops, so workers keep computing those themselves
+SHARED_SOURCES = ("user_only", "blended", "official")
+
+
+def compute_predictions(catalog: CatalogSnapshot) -> dict:
+    init_engine()
+    db = SessionLocal()
+    try:
+        predictions = {}
+        for route_id in catalog.route_ids():
+            seconds, status, source = PredictionService.predict_duration_with_source(db, route_id)
+            if source in SHARED_SOURCES:
+                predictions[route_id] = (seconds, status)
+        return predictions
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish shared catalog and prediction tables")
+    parser.add_argument("--name", default=os.getenv("SHARED_TABLES_NAME", "bus-tracker"))
+    parser.add_argument("--predictions-seconds", type=float,
+                        default=float(os.getenv("SHARED_PREDICTIONS_SECONDS", "60")))
+    parser.add_argument("--no-jobs", action="store_true", help="Don't run the background jobs here")
+    args = parser.parse_args()
+
+    init_engine()  # Also loads .env
+    publisher = SharedTablesPublisher(args.name)
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    jobs = [] if args.no_jobs else [name for name, job in scheduler.JOBS.items() if not job.process_local]
+    next_job_run = {name: time.monotonic() + scheduler.JOBS[name].interval for name in jobs}
+    catalog = None
+    catalog_mtime = None
+    next_predictions = 0.0
+    logger.info(f"[SHARED] coordinator publishing as {args.name}, jobs: {', '.join(jobs) or 'none'}")
+
+    try:
+        while not stopping:
+            path = snapshot_path()
+            if os.path.exists(path) and os.path.getmtime(path) != catalog_mtime:
+                catalog_mtime = os.path.getmtime(path)
+                with open(path, "rb") as f:
+                    data = f.read()
+                publisher.publish_catalog(data, catalog_mtime)
+                catalog = CatalogSnapshot(data)
+                next_predictions = 0.0  # Predictions are aligned to the catalog's routes
+
+            now = time.monotonic()
+            if catalog is not None and now >= next_predictions:
+                started = time.perf_counter()
+                predictions = compute_predictions(catalog)
+                publisher.publish_predictions(pack_predictions(
+                    catalog, predictions,
+                    generation=publisher.next_predictions_generation(),
+                    catalog_generation=publisher.catalog_generation,
+                ))
+                logger.info(
+                    f"[SHARED] {len(predictions)} route predictions published "
+                    f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+                )
+                next_predictions = now + args.predictions_seconds
+
+            for name in jobs:
+                if time.monotonic() >= next_job_run[name]:
+                    scheduler.run_job(name)
+                    next_job_run[name] = time.monotonic() + scheduler.JOBS[name].interval
+
+            publisher.collect()
+            time.sleep(1.0)
+    finally:
+        publisher.close()
+        logger.info("[SHARED] coordinator stopped, segments unlinked")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Columnar archive for completed journeys.
+
+Completed journeys older than N days are moved out of the hot `journeys` table
+into files partitioned by route and month:
+
+    <root>/route=<route_id>/month=<YYYY-MM>/part-<timestamp>.jcol
+
+Each part file stores one block per column, so scans only decode the columns
+they ask for, and partition pruning by route/month happens on directory names.
+
+Part layout:
+    magic(8s) header_len(I) header(JSON) column blocks
+    float64 columns: n doubles (NaN for NULL), epoch seconds for datetimes
+    uint8 columns:   n bytes
+    string columns:  u32 offsets[n + 1], u8 null flags[n], utf-8 blob
+
+Parts written before predicted_arrival and the official times became
+timestamps hold them as strings; read_part() converts them on decode, so
+readers always get datetimes.
+"""
+
+import json
+import math
+import os
+import struct
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterator
+
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.schemas.journey import JourneyEventType
+from app.utils.timetable import timetable_minute, timetable_span
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+MAGIC = b"BTJCOL01"
+DEFAULT_ARCHIVE_PATH = "app/data/archive"
+
+# Journeys loaded per pass, and so the most rows in one part file
+PART_ROWS = 50_000
+DELETE_BATCH = 1_000
+
+COLUMNS = (
+    ("id", "str"),
+    ("start_stop_id", "str"),
+    ("end_stop_id", "str"),
+    ("planned_start_time", "time"),
+    ("start_time", "time"),
+    ("end_time", "time"),
+    ("created_at", "time"),
+    ("status", "str"),
+    ("official_start_time", "time"),
+    ("official_end_time", "time"),
+    ("predicted_status", "str"),
+    ("predicted_arrival", "time"),
+    ("data_source", "str"),
+    ("is_synthetic", "bool"),
+    ("quality_flag", "str"),
+)
+
+KINDS = dict(COLUMNS)
+# Columns that older parts stored as strings
+LEGACY_TIME_COLUMNS = ("predicted_arrival", "official_start_time", "official_end_time")
+
+# Journeys in these states are finished and can leave the hot table
+ARCHIVABLE_STATUSES = (JourneyEventType.EVENT_TYPE_STOP_REACHED, JourneyEventType.EVENT_TYPE_ABANDONED)
+
+
+def archive_path() -> str:
+    return os.getenv("JOURNEY_ARCHIVE_PATH", DEFAULT_ARCHIVE_PATH)
+
+
+def _to_epoch(value: datetime | None) -> float:
+    if value is None:
+        return math.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _from_epoch(value: float) -> datetime | None:
+    return None if math.isnan(value) else datetime.fromtimestamp(value, tz=timezone.utc)
+
+
+def _encode_column(kind: str, values: list) -> bytes:
+    n = len(values)
+    if kind == "time":
+        return struct.pack(f"<{n}d", *(_to_epoch(v) for v in values))
+    if kind == "bool":
+        return bytes(1 if v else 0 for v in values)
+
+    encoded = [b"" if v is None else str(v).encode("utf-8") for v in values]
+    offsets = [0]
+    for item in encoded:
+        offsets.append(offsets[-1] + len(item))
+    nulls = bytes(1 if v is None else 0 for v in values)
+    return struct.pack(f"<{n + 1}I", *offsets) + nulls + b"".join(encoded)
+
+
+def _decode_column(kind: str, block: memoryview, n: int) -> list:
+    if kind == "time":
+        return [_from_epoch(v) for v in struct.unpack_from(f"<{n}d", block)]
+    if kind == "bool":
+        return [bool(b) for b in block[:n]]
+
+    offsets = struct.unpack_from(f"<{n + 1}I", block)
+    nulls = block[4 * (n + 1):4 * (n + 1) + n]
+    blob = bytes(block[4 * (n + 1) + n:])
+    return [
+        None if nulls[i] else blob[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(n)
+    ]
+
+
+def _legacy_arrival(value: str | None) -> datetime | None:
+    # "YYYY-MM-DD HH:MM:SS" UTC, as the API used to store it
+    try:
+        return datetime.strptime(value.strip(), "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _upgrade_legacy(result: dict[str, list], decode, legacy: set[str], n: int) -> None:
+    """Turn string-typed time columns from older parts into datetimes, in place."""
+    if "predicted_arrival" in legacy and "predicted_arrival" in result:
+        result["predicted_arrival"] = [_legacy_arrival(v) for v in result["predicted_arrival"]]
+
+    wanted = [name for name in ("official_start_time", "official_end_time") if name in legacy and name in result]
+    if not wanted:
+        return
+    # "HH:MM" local timetable times, placed on the journey's local day as the DB migration does
+    starts = result["official_start_time"] if "official_start_time" in result else decode("official_start_time")
+    ends = result["official_end_time"] if "official_end_time" in result else decode("official_end_time")
+    planned, created = decode("planned_start_time"), decode("created_at")
+    spans = []
+    for i in range(n):
+        day = planned[i] or created[i]
+        spans.append(
+            timetable_span(day, timetable_minute(starts[i]), timetable_minute(ends[i])) if day else (None, None)
+        )
+    if "official_start_time" in wanted:
+        result["official_start_time"] = [start for start, _ in spans]
+    if "official_end_time" in wanted:
+        result["official_end_time"] = [end for _, end in spans]
+
+
+def write_part(directory: Path, rows: list[dict]) -> Path:
+    """Write rows as one columnar part file. Returns the file path."""
+    directory.mkdir(parents=True, exist_ok=True)
+
+    blocks = []
+    header_columns = []
+    offset = 0
+    for name, kind in COLUMNS:
+        block = _encode_column(kind, [row[name] for row in rows])
+        header_columns.append({"name": name, "type": kind, "offset": offset, "length": len(block)})
+        blocks.append(block)
+        offset += len(block)
+
+    header = json.dumps({"rows": len(rows), "columns": header_columns}).encode("utf-8")
+    path = directory / f"part-{time.time_ns()}.jcol"
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_part(path: Path, columns: tuple[str, ...] | None = None) -> dict[str, list]:
+    """Decode the requested columns of one part file."""
+    data = memoryview(path.read_bytes())
+    if bytes(data[:8]) != MAGIC:
+        raise ValueError(f"{path} is not a journey archive part")
+
+    header_len = struct.unpack_from("<I", data, 8)[0]
+    header = json.loads(bytes(data[12:12 + header_len]))
+    body = 12 + header_len
+    n = header["rows"]
+
+    by_name = {column["name"]: column for column in header["columns"]}
+
+    def decode(name: str) -> list:
+        column = by_name.get(name)
+        if column is None:
+            return [None] * n
+        start = body + column["offset"]
+        return _decode_column(column["type"], data[start:start + column["length"]], n)
+
+    result = {name: decode(name) for name in by_name if columns is None or name in columns}
+
+    legacy = {
+        name for name in LEGACY_TIME_COLUMNS
+        if name in by_name and by_name[name]["type"] != KINDS[name]
+    }
+    if legacy:
+        _upgrade_legacy(result, decode, legacy, n)
+    return result
+
+
+def archived_routes(root: str | None = None) -> list[str]:
+    path = Path(root or archive_path())
+    if not path.exists():
+        return []
+    return sorted(d.name[len("route="):] for d in path.glob("route=*"))
+
+
+def _partitions(root: Path, route_id: str | None, since: datetime | None, until: datetime | None, newest_first: bool) -> list[tuple[str, Path]]:
+    if not root.exists():
+        return []
+
+    since_month = since.strftime("%Y-%m") if since else None
+    until_month = until.strftime("%Y-%m") if until else None
+
+    result = []
+    for route_dir in root.glob("route=*"):
+        route = route_dir.name[len("route="):]
+        if route_id is not None and route != route_id:
+            continue
+        for month_dir in route_dir.glob("month=*"):
+            month = month_dir.name[len("month="):]
+            if since_month and month < since_month:
+                continue
+            if until_month and month > until_month:
+                continue
+            result.append((month, route, month_dir))
+
+    result.sort(reverse=newest_first)
+    return [(route, month_dir) for _, route, month_dir in result]
+
+
+def scan(
+    route_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    columns: tuple[str, ...] | None = None,
+    newest_first: bool = False,
+    root: str | None = None,
+) -> Iterator[dict]:
+    """
+    Stream archived journeys as row dicts, one part file in memory at a time.
+    Rows include `route_id`, `id` and `end_time`; since/until filter on end_time.
+    A journey archived twice (a crash mid-archive) comes out once: a journey
+    always lands in the same route/month partition, so ids are deduped per partition.
+    """
+    wanted = None
+    if columns is not None:
+        wanted = tuple((set(columns) | {"id", "end_time"}) - {"route_id"})
+
+    for route, month_dir in _partitions(Path(root or archive_path()), route_id, since, until, newest_first):
+        seen: set[str] = set()
+        parts = sorted(month_dir.glob("*.jcol"), reverse=newest_first)
+        for part in parts:
+            decoded = read_part(part, wanted)
+            names = list(decoded)
+            ids = decoded["id"]
+            end_times = decoded["end_time"]
+            indexes = range(len(end_times))
+            if newest_first:
+                indexes = reversed(indexes)
+            for i in indexes:
+                if ids[i] in seen:
+                    continue
+                seen.add(ids[i])
+                end_time = end_times[i]
+                if since and end_time and end_time < since:
+                    continue
+                if until and end_time and end_time >= until:
+                    continue
+                row = {name: decoded[name][i] for name in names}
+                row["route_id"] = route
+                yield row
+
+
+class JourneyArchiver:
+    """Moves completed journeys out of the hot table into the columnar archive."""
+
+    @staticmethod
+    def archive_completed(db: Session, older_than_days: int = 30, root: str | None = None) -> int:
+        """
+        Archive completed journeys that ended more than `older_than_days` ago.
+
+        Works through at most PART_ROWS journeys at a time. Each part file is
+        fully written before its rows are deleted and committed, so a failure
+        loses nothing and keeps earlier parts' deletes; a crash between the
+        write and the commit leaves that part's rows in both places, and
+        scan() drops the second copy. Returns rows archived.
+        """
+        root_path = Path(root or archive_path())
+        cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+
+        query = (
+            db.query(Journey)
+            .filter(
+                Journey.status.in_(ARCHIVABLE_STATUSES),
+                Journey.end_time.is_not(None),
+                Journey.end_time < cutoff,
+            )
+            .order_by(Journey.route_id, Journey.end_time, Journey.id)
+            .limit(PART_ROWS)
+        )
+
+        archived = parts_written = 0
+        while True:
+            # Archived rows are deleted, so every pass starts from the top again
+            batch = query.all()
+            partitions: dict[tuple[str, str], list[dict]] = {}
+            for journey in batch:
+                key = (journey.route_id, journey.end_time.strftime("%Y-%m"))
+                partitions.setdefault(key, []).append({name: getattr(journey, name) for name, _ in COLUMNS})
+            db.expunge_all()
+
+            for (route_id, month), rows in partitions.items():
+                write_part(root_path / f"route={route_id}" / f"month={month}", rows)
+                ids = [row["id"] for row in rows]
+                for i in range(0, len(ids), DELETE_BATCH):
+                    db.query(Journey).filter(Journey.id.in_(ids[i:i + DELETE_BATCH])).delete(synchronize_session=False)
+                db.commit()
+                archived += len(rows)
+                parts_written += 1
+
+            if len(batch) < PART_ROWS:
+                break
+
+        logger.info(
+            f"[ARCHIVE] {archived:,} journeys older than {older_than_days}d "
+            f"archived into {parts_written} part files under {root_path}"
+        )
+        return archived
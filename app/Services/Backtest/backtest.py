@@ -0,0 +1,361 @@
+"""
+Prediction backtesting.
+
+Replays completed journeys in the order they were started (created_at) through
+one or more predictors, and scores each prediction against the duration the
+journey actually took. A predictor only ever sees journeys that had finished
+(end_time) before the moment it is asked, the same as the live service, so
+there is no leakage from the future.
+
+Routes are independent (every prediction only looks at its own route's
+history), so they are replayed in parallel, one route per task, and the
+per-route error stats merged afterwards. Errors are kept in fixed 10s
+buckets, so merging and percentiles don't need the raw errors.
+
+Not replayed: the live delay correction (it needs the live event stream) and
+the prediction cache, which only changes when a prediction is recomputed.
+"""
+
+import heapq
+import os
+from abc import ABC, abstractmethod
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.models import Database
+from app.models.Database import init_engine
+from app.models.Journey import Journey
+from app.schemas.journey import JourneyEventType
+from app.Services.Prediction.data_quality import usable_for_stats
+from app.Services.Prediction.prediction import PredictionService
+from app.utils.dates import naive_utc
+from app.utils.timetable import timetable_zone
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+ERROR_BUCKET_SECONDS = 10
+MAX_ERROR_SECONDS = 7200
+ON_TARGET_SECONDS = 300
+# History replayed before `since` so predictors don't start cold
+WARMUP_DAYS = 30
+STREAM_BATCH = 5000
+
+
+class Predictor(ABC):
+    """
+    What the backtest drives. Journeys are dicts with route_id, start_stop_id,
+    end_stop_id, created_at, start_time, end_time, duration (seconds),
+    data_source, predicted_arrival and local_hour.
+    """
+
+    name = "base"
+
+    def __init__(self, route_id: str):
+        self.route_id = route_id
+
+    def observe(self, journey: dict) -> None:
+        """A journey on this route finished before the next predict() call."""
+
+    @abstractmethod
+    def predict(self, journey: dict) -> float | None:
+        """Predicted duration in seconds for a journey starting now, None to abstain."""
+
+    def actual(self, journey: dict) -> float:
+        """The duration predict() is scored against: boarding (start_time) to end_time."""
+        return journey["duration"]
+
+
+class ServicePredictor(Predictor):
+    """PredictionService's rules, over the replayed history instead of the database."""
+
+    name = "service"
+
+    def __init__(self, route_id: str):
+        super().__init__(route_id)
+        self.user = deque(maxlen=PredictionService.USER_WINDOW)
+        self.official = deque(maxlen=PredictionService.OFFICIAL_WINDOW)
+        self._timetable: dict[tuple, float | None] = {}
+
+    def observe(self, journey: dict) -> None:
+        if journey["duration"] <= 60:
+            return
+        if journey["data_source"] == "user":
+            self.user.append(journey["duration"])
+        elif journey["data_source"] == "official":
+            self.official.append(journey["duration"])
+
+    def _from_durations(self, user: list[float], official: list[float], journey: dict) -> float:
+        durations, _ = PredictionService.select_durations(user, official)
+        if not durations:
+            segment = (journey["start_stop_id"], journey["end_stop_id"])
+            if segment not in self._timetable:
+                self._timetable[segment] = PredictionService._official_duration(self.route_id, *segment)
+            official_sec = self._timetable[segment]
+            if official_sec is None:
+                return PredictionService.FALLBACK_MINUTES * 60.0
+            durations = [official_sec]
+        predicted_sec, _ = PredictionService.status_from_stats(PredictionService.summarize_durations(durations))
+        return predicted_sec
+
+    def predict(self, journey: dict) -> float | None:
+        return self._from_durations(list(self.user), list(self.official), journey)
+
+
+class HourlyPredictor(ServicePredictor):
+    """Variant: prefer user history from the same local hour of day when there is enough of it."""
+
+    name = "hourly"
+
+    def __init__(self, route_id: str):
+        super().__init__(route_id)
+        self.by_hour = [deque(maxlen=PredictionService.USER_WINDOW) for _ in range(24)]
+
+    def observe(self, journey: dict) -> None:
+        super().observe(journey)
+        if journey["data_source"] == "user" and journey["duration"] > 60:
+            self.by_hour[journey["local_hour"]].append(journey["duration"])
+
+    def predict(self, journey: dict) -> float | None:
+        same_hour = self.by_hour[journey["local_hour"]]
+        if len(same_hour) >= PredictionService.MIN_FOR_STATS:
+            return self._from_durations(list(same_hour), [], journey)
+        return super().predict(journey)
+
+
+class RecordedPredictor(Predictor):
+    """
+    What was actually served: the stored predicted_arrival, as a duration from
+    created_at. It was served before the rider boarded, so it is scored from
+    created_at too (error = predicted_arrival - end_time) rather than against the
+    ride alone, which would count the wait at the stop against it.
+    """
+
+    name = "recorded"
+
+    def predict(self, journey: dict) -> float | None:
+        predicted = journey["predicted_arrival"]
+        if predicted is None:
+            return None
+        return (naive_utc(predicted) - journey["created_at"]).total_seconds()
+
+    def actual(self, journey: dict) -> float:
+        return (journey["end_time"] - journey["created_at"]).total_seconds()
+
+
+PREDICTORS = {
+    ServicePredictor.name: ServicePredictor,
+    HourlyPredictor.name: HourlyPredictor,
+    RecordedPredictor.name: RecordedPredictor,
+}
+
+
+class ErrorStats:
+    """Mergeable prediction error summary (error = predicted - actual seconds)."""
+
+    BUCKETS = MAX_ERROR_SECONDS // ERROR_BUCKET_SECONDS + 1
+
+    def __init__(self):
+        self.count = 0
+        self.abs_sum = 0.0
+        self.sum = 0.0
+        self.on_target = 0
+        self.histogram = [0] * self.BUCKETS
+
+    def add(self, error: float) -> None:
+        magnitude = abs(error)
+        self.count += 1
+        self.abs_sum += magnitude
+        self.sum += error
+        if magnitude <= ON_TARGET_SECONDS:
+            self.on_target += 1
+        self.histogram[min(int(magnitude // ERROR_BUCKET_SECONDS), self.BUCKETS - 1)] += 1
+
+    def merge(self, other: "ErrorStats") -> "ErrorStats":
+        self.count += other.count
+        self.abs_sum += other.abs_sum
+        self.sum += other.sum
+        self.on_target += other.on_target
+        for i, count in enumerate(other.histogram):
+            self.histogram[i] += count
+        return self
+
+    def percentile(self, q: float) -> float | None:
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, count in enumerate(self.histogram):
+            if count and seen + count >= target:
+                return (i + (target - seen) / count) * ERROR_BUCKET_SECONDS
+            seen += count
+        return float(MAX_ERROR_SECONDS)
+
+    def summary(self) -> dict:
+        def minutes(value):
+            return None if value is None else round(value / 60, 2)
+
+        return {
+            "journeys": self.count,
+            "mae_minutes": minutes(self.abs_sum / self.count) if self.count else None,
+            "bias_minutes": minutes(self.sum / self.count) if self.count else None,
+            "p50_abs_minutes": minutes(self.percentile(0.5)),
+            "p90_abs_minutes": minutes(self.percentile(0.9)),
+            "p95_abs_minutes": minutes(self.percentile(0.95)),
+            "within_5_min_pct": round(100 * self.on_target / self.count, 1) if self.count else None,
+        }
+
+
+def _statement(route_id: str, start: datetime | None, until: datetime | None):
+    table = Journey.__table__
+    query = select(
+        table.c.route_id, table.c.start_stop_id, table.c.end_stop_id, table.c.created_at,
+        table.c.start_time, table.c.end_time, table.c.data_source, table.c.predicted_arrival,
+    ).where(
+        table.c.route_id == route_id,
+        table.c.status == JourneyEventType.EVENT_TYPE_STOP_REACHED,
+        table.c.start_time.is_not(None),
+        table.c.end_time.is_not(None),
+        table.c.end_time > table.c.start_time,
+        usable_for_stats(),
+    )
+    if start is not None:
+        query = query.where(table.c.created_at >= start)
+    if until is not None:
+        query = query.where(table.c.created_at < until)
+    return query.order_by(table.c.created_at)
+
+
+def replay_route(route_id: str, predictor_names: list[str], since: datetime | None = None,
+                 until: datetime | None = None, warmup_days: int = WARMUP_DAYS) -> tuple[dict, int]:
+    """
+    Replay one route. Returns ({predictor: {local_hour: ErrorStats}}, journeys scored).
+    Journeys from warmup_days before `since` feed history but aren't scored.
+    """
+    since, until = naive_utc(since), naive_utc(until)
+    start = since - timedelta(days=warmup_days) if since is not None else None
+    zone = timetable_zone()
+    predictors = [PREDICTORS[name](route_id) for name in predictor_names]
+    stats = {name: {} for name in predictor_names}
+    pending: list[tuple] = []  # (end_time, seq, journey) not yet visible to predictors
+    scored = 0
+
+    with init_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=STREAM_BATCH).execute(
+            _statement(route_id, start, until)
+        )
+        for seq, row in enumerate(result):
+            created_at = naive_utc(row.created_at)
+            while pending and pending[0][0] <= created_at:
+                finished = heapq.heappop(pending)[2]
+                for predictor in predictors:
+                    predictor.observe(finished)
+
+            start_time, end_time = naive_utc(row.start_time), naive_utc(row.end_time)
+            journey = {
+                "route_id": route_id,
+                "start_stop_id": row.start_stop_id,
+                "end_stop_id": row.end_stop_id,
+                "created_at": created_at,
+                "start_time": start_time,
+                "end_time": end_time,
+                "duration": (end_time - start_time).total_seconds(),
+                "data_source": row.data_source,
+                "predicted_arrival": row.predicted_arrival,
+                "local_hour": created_at.replace(tzinfo=timezone.utc).astimezone(zone).hour,
+            }
+
+            # Real riders are what the service is judged on
+            if row.data_source == "user" and (since is None or created_at >= since):
+                for predictor in predictors:
+                    predicted = predictor.predict(journey)
+                    if predicted is not None:
+                        by_hour = stats[predictor.name]
+                        cell = by_hour.get(journey["local_hour"])
+                        if cell is None:
+                            cell = by_hour[journey["local_hour"]] = ErrorStats()
+                        cell.add(predicted - predictor.actual(journey))
+                scored += 1
+
+            heapq.heappush(pending, (end_time, seq, journey))
+
+    return stats, scored
+
+
+def _init_worker() -> None:
+    # Don't reuse the parent's pooled connections after fork
+    if Database.engine is not None:
+        Database.engine.dispose(close=False)
+
+
+def _replay_task(args: tuple) -> tuple[str, dict, int]:
+    route_id = args[0]
+    stats, scored = replay_route(*args)
+    return route_id, stats, scored
+
+
+class Backtest:
+
+    @staticmethod
+    def routes(since: datetime | None = None, until: datetime | None = None) -> list[str]:
+        """Routes with completed journeys in the range."""
+        table = Journey.__table__
+        query = select(table.c.route_id).distinct().where(table.c.status == JourneyEventType.EVENT_TYPE_STOP_REACHED)
+        if since is not None:
+            query = query.where(table.c.created_at >= naive_utc(since))
+        if until is not None:
+            query = query.where(table.c.created_at < naive_utc(until))
+        with init_engine().connect() as conn:
+            return sorted(route_id for (route_id,) in conn.execute(query))
+
+    @staticmethod
+    def run(predictor_names: list[str], route_ids: list[str] | None = None, since: datetime | None = None,
+            until: datetime | None = None, workers: int | None = None, warmup_days: int = WARMUP_DAYS) -> dict:
+        unknown = [name for name in predictor_names if name not in PREDICTORS]
+        if unknown:
+            raise ValueError(f"Unknown predictors: {', '.join(unknown)} (have {', '.join(PREDICTORS)})")
+
+        started = time.perf_counter()
+        route_ids = route_ids or Backtest.routes(since, until)
+        workers = workers or os.cpu_count() or 1
+        tasks = [(route_id, predictor_names, since, until, warmup_days) for route_id in route_ids]
+
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker) as pool:
+                results = list(pool.map(_replay_task, tasks))
+        else:
+            results = [_replay_task(task) for task in tasks]
+
+        report = {}
+        for name in predictor_names:
+            overall = ErrorStats()
+            by_route, by_hour, by_route_hour = {}, {}, {}
+            for route_id, stats, _ in results:
+                route_total = ErrorStats()
+                for hour, cell in sorted(stats[name].items()):
+                    route_total.merge(cell)
+                    by_hour.setdefault(hour, ErrorStats()).merge(cell)
+                    by_route_hour.setdefault(route_id, {})[hour] = cell.summary()
+                if route_total.count:
+                    by_route[route_id] = route_total.summary()
+                overall.merge(route_total)
+            report[name] = {
+                "overall": overall.summary(),
+                "by_route": by_route,
+                "by_hour": {hour: cell.summary() for hour, cell in sorted(by_hour.items())},
+                "by_route_hour": by_route_hour,
+            }
+        total = sum(scored for _, _, scored in results)
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"[BACKTEST] {total:,} journeys on {len(route_ids)} routes in {elapsed:.1f}s")
+        return {
+            "journeys": total,
+            "routes": len(route_ids),
+            "seconds": round(elapsed, 1),
+            "predictors": report,
+        }
@@ -0,0 +1,191 @@
+"""Builds the catalog snapshot from the database and the CIF timetable."""
+
+import os
+from datetime import timedelta
+from sqlalchemy.orm import Session
+
+from app.models.Route import Route, Stop, RouteStop
+from app.models.Journey import Journey
+from app.Services.Archive import archive
+from app.Services.Catalog.snapshot import pack_snapshot, write_snapshot, snapshot_path
+from app.Services.Catalog.stop_sequence import compile_sequence
+from app.Services.Prediction.prediction import PredictionService
+from app.Services.Prediction.data_quality import usable_for_stats, EXCLUDED_FLAGS
+from app.utils.fetch_timetable_cif import parse_cif_trips, parse_cif_route_sequences
+from app.utils.logger.logger import get_logger
+
+DEFAULT_CIF_PATH = "app/data/Metro.cif"
+
+# Same window predict_journey looks at for user journeys
+STATS_WINDOW = 100
+# Recent journeys per route that segment factors are learned from, and how
+# many of them must cover a leg before it gets its own factor
+SEGMENT_WINDOW = 500
+MIN_SEGMENT_JOURNEYS = 5
+
+
+def _route_stats(db: Session) -> dict:
+    """Per-route duration stats over the most recent completed user journeys."""
+    rows = db.query(
+        Journey.route_id,
+        (Journey.end_time - Journey.start_time).label("duration"),
+    ).filter(
+        Journey.status == "STOP_REACHED",
+        Journey.data_source == "user",
+        Journey.start_time.is_not(None),
+        Journey.end_time.is_not(None),
+        Journey.end_time > Journey.start_time,
+        (Journey.end_time - Journey.start_time) > timedelta(minutes=1),
+        usable_for_stats()
+    ).order_by(Journey.route_id, Journey.start_time.desc()).yield_per(1000)
+
+    durations: dict[str, list[float]] = {}
+    for row in rows:
+        route_durations = durations.setdefault(row.route_id, [])
+        if len(route_durations) < STATS_WINDOW:
+            route_durations.append(row.duration.total_seconds())
+
+    # Routes with little recent traffic are topped up from the archive
+    for route_id in archive.archived_routes():
+        route_durations = durations.setdefault(route_id, [])
+        if len(route_durations) >= STATS_WINDOW:
+            continue
+        columns = ("start_time", "end_time", "data_source", "quality_flag")
+        for row in archive.scan(route_id=route_id, columns=columns, newest_first=True):
+            if row["data_source"] != "user" or not row["start_time"] or row.get("quality_flag") in EXCLUDED_FLAGS:
+                continue
+            duration = (row["end_time"] - row["start_time"]).total_seconds()
+            if duration > 60:
+                route_durations.append(duration)
+                if len(route_durations) >= STATS_WINDOW:
+                    break
+
+    return {
+        route_id: PredictionService.summarize_durations(values)
+        for route_id, values in durations.items()
+    }
+
+
+def _segment_factors(db: Session, routes: list[dict], trips: dict) -> dict:
+    """
+    Per-leg ratio of real to official travel time, learned from completed user
+    journeys. A journey's ratio (its duration over the official time for its
+    share of the route) counts towards every leg it covered; a leg's factor is
+    the median of those, or 0 when fewer than MIN_SEGMENT_JOURNEYS covered it.
+    """
+    rows = db.query(
+        Journey.route_id,
+        Journey.start_stop_id,
+        Journey.end_stop_id,
+        Journey.start_time,
+        Journey.end_time,
+    ).filter(
+        Journey.status == "STOP_REACHED",
+        Journey.data_source == "user",
+        Journey.start_time.is_not(None),
+        Journey.end_time.is_not(None),
+        Journey.end_stop_id.is_not(None),
+        Journey.end_time > Journey.start_time,
+        usable_for_stats()
+    ).order_by(Journey.route_id, Journey.start_time.desc()).yield_per(1000)
+
+    by_route: dict[str, list] = {}
+    for row in rows:
+        route_rows = by_route.setdefault(row.route_id, [])
+        if len(route_rows) < SEGMENT_WINDOW:
+            route_rows.append(row)
+
+    factors = {}
+    for route in routes:
+        route_rows = by_route.get(route["id"])
+        route_trips = trips.get(route["id"])
+        stop_ids = route["stops"]
+        legs = len(stop_ids) - 1
+        if not route_rows or not route_trips or legs < 1:
+            continue
+        official = sorted(end - start for start, end in route_trips)[len(route_trips) // 2] * 60
+        if official <= 0:
+            continue
+
+        distances = route["distances"]
+        if len(distances) == len(stop_ids) and distances[-1] > 0:
+            shares = [d / distances[-1] for d in distances]
+        else:
+            shares = [i / legs for i in range(legs + 1)]
+        positions: dict[str, list[int]] = {}
+        for i, stop_id in enumerate(stop_ids):
+            positions.setdefault(stop_id, []).append(i)
+
+        ratios: list[list[float]] = [[] for _ in range(legs)]
+        for row in route_rows:
+            # First call at the start stop, paired with the next call at the end stop
+            span = next(
+                ((start, end) for start in positions.get(row.start_stop_id, [])
+                 for end in positions.get(row.end_stop_id, []) if end > start),
+                None,
+            )
+            if span is None:
+                continue
+            expected = official * (shares[span[1]] - shares[span[0]])
+            if expected <= 0:
+                continue
+            ratio = (row.end_time - row.start_time).total_seconds() / expected
+            for leg in range(*span):
+                ratios[leg].append(ratio)
+
+        route_factors = [
+            sorted(values)[len(values) // 2] if len(values) >= MIN_SEGMENT_JOURNEYS else 0.0
+            for values in ratios
+        ]
+        if any(route_factors):
+            factors[route["id"]] = route_factors + [0.0]
+    return factors
+
+
+def build_snapshot(db: Session, cif_path: str = DEFAULT_CIF_PATH) -> bytes:
+    stops = [
+        {"id": s.id, "name": s.name, "latitude": s.latitude, "longitude": s.longitude}
+        for s in db.query(Stop).all()
+    ]
+
+    stops_by_id = {s["id"]: s for s in stops}
+
+    # RouteStop keeps one row per (route, stop), so loop routes lose their
+    # second call there. The CIF sequence is the full one; RouteStop order is
+    # the fallback for routes (or deployments) without it.
+    sequences: dict[str, list[str]] = {}
+    for route_id, stop_id in (
+        db.query(RouteStop.route_id, RouteStop.stop_id)
+        .order_by(RouteStop.route_id, RouteStop.sequence)
+    ):
+        sequences.setdefault(route_id, []).append(stop_id)
+    if os.path.exists(cif_path):
+        _, cif_sequences = parse_cif_route_sequences(cif_path)
+        sequences.update(cif_sequences)
+
+    logger = get_logger()
+    routes = []
+    for r in db.query(Route).all():
+        compiled = compile_sequence(sequences.get(r.id, []), stops_by_id)
+        if compiled.dropped:
+            logger.debug(f"[CATALOG] {r.id}: dropped {compiled.dropped} invalid or repeated stops")
+        routes.append({
+            "id": r.id,
+            "name": r.name,
+            "direction": r.direction,
+            "stops": compiled.stop_ids,
+            "distances": compiled.distances,
+            "loop": compiled.is_loop,
+        })
+
+    trips = parse_cif_trips(cif_path)
+    return pack_snapshot(routes, stops, trips, _route_stats(db), _segment_factors(db, routes, trips))
+
+
+def rebuild_snapshot(db: Session, cif_path: str = DEFAULT_CIF_PATH, path: str | None = None) -> str:
+    """Build and atomically write the snapshot. Returns the path written."""
+    path = path or snapshot_path()
+    data = build_snapshot(db, cif_path)
+    write_snapshot(path, data)
+    get_logger().info(f"Catalog snapshot written to {path} ({len(data):,} bytes)")
+    return path
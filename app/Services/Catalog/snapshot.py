@@ -0,0 +1,404 @@
+"""
+Read-only catalog snapshot.
+
+The snapshot is a compact struct-packed file written at ingest time holding
+routes, stops, route stop sequences, official trip times and per-route
+prediction stats. Workers mmap it read-only at startup, so every worker on a
+host shares one page-cache copy and nothing has to be loaded from the DB.
+
+Layout (little endian):
+    header   magic(8s) version(I) created_at(Q) + one (offset Q, count Q) per section
+    STRINGS  u32 offsets[count + 1] followed by one utf-8 blob
+    ROUTES   count x (id, name, direction, seq_start, seq_len, trip_start, trip_len, flags) u32
+    STOPS    count x (id, name) u32 + (latitude, longitude) f64
+    SEQUENCE u32 stop indexes, one run per route (loop routes repeat stops)
+    DISTANCE f32 metres from the first stop, parallel to SEQUENCE
+    TRIPS    u16 (start_minute, end_minute) pairs, one run per route
+    STATS    one (count u32, avg_sec, median_sec, p75_sec f32) per route
+    SEGMENTS f32 learned real/official time ratio of the leg leaving each
+             position, parallel to SEQUENCE (0 = too few journeys to tell)
+"""
+
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from datetime import datetime, timezone
+from threading import Lock
+
+from app.utils.logger.logger import get_logger
+
+MAGIC = b"BTSNAP01"
+VERSION = 3
+SECTIONS = ("strings", "routes", "stops", "sequence", "trips", "stats", "distances", "segments")
+
+HEADER = struct.Struct("<8sIQ" + "QQ" * len(SECTIONS))
+ROUTE = struct.Struct("<8I")
+STOP = struct.Struct("<2I2d")
+SEQ = struct.Struct("<I")
+TRIP = struct.Struct("<2H")
+STATS = struct.Struct("<I3f")
+DIST = struct.Struct("<f")
+SEGMENT = struct.Struct("<f")
+
+NO_STRING = 0xFFFFFFFF
+FLAG_LOOP = 1
+
+DEFAULT_SNAPSHOT_PATH = "app/data/catalog.snap"
+
+
+def snapshot_path() -> str:
+    return os.getenv("CATALOG_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+
+
+class CatalogSnapshot:
+    """Zero-copy view over a snapshot buffer (an mmap or any bytes-like object)."""
+
+    def __init__(self, buffer, source: str = "<buffer>", mtime: float | None = None):
+        self._buf = memoryview(buffer)
+        self.source = source
+        # Modification time of the mapped file, used to notice rewrites
+        self.mtime = mtime
+
+        magic, version, created_at, *sections = HEADER.unpack_from(self._buf, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{source} is not a version {VERSION} catalog snapshot")
+
+        self.created_at = datetime.fromtimestamp(created_at, tz=timezone.utc)
+        self._sections = {
+            name: (sections[i * 2], sections[i * 2 + 1]) for i, name in enumerate(SECTIONS)
+        }
+
+        # Small index so lookups by route id don't scan the routes section
+        routes_off, routes_count = self._sections["routes"]
+        self._route_index = {
+            self.string(ROUTE.unpack_from(self._buf, routes_off + i * ROUTE.size)[0]): i
+            for i in range(routes_count)
+        }
+        self._stop_index = None
+
+    @classmethod
+    def open(cls, path: str) -> "CatalogSnapshot":
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            mtime = os.fstat(f.fileno()).st_mtime
+        return cls(mapped, source=path, mtime=mtime)
+
+    def string(self, idx: int) -> str | None:
+        if idx == NO_STRING:
+            return None
+        off, count = self._sections["strings"]
+        start, end = struct.unpack_from("<2I", self._buf, off + 4 * idx)
+        blob = off + 4 * (count + 1)
+        return bytes(self._buf[blob + start:blob + end]).decode("utf-8")
+
+    def _route(self, route_id: str) -> tuple | None:
+        i = self._route_index.get(route_id)
+        if i is None:
+            return None
+        off, _ = self._sections["routes"]
+        return ROUTE.unpack_from(self._buf, off + i * ROUTE.size)
+
+    def _stop(self, idx: int) -> dict:
+        off, _ = self._sections["stops"]
+        id_idx, name_idx, lat, lon = STOP.unpack_from(self._buf, off + idx * STOP.size)
+        return {"id": self.string(id_idx), "name": self.string(name_idx), "latitude": lat, "longitude": lon}
+
+    def route_ids(self) -> list[str]:
+        return list(self._route_index)
+
+    def route_position(self, route_id: str) -> int | None:
+        """Index of the route in the (id sorted) routes section."""
+        return self._route_index.get(route_id)
+
+    def routes(self) -> list[dict]:
+        off, count = self._sections["routes"]
+        result = []
+        for i in range(count):
+            id_idx, name_idx, dir_idx, *_ = ROUTE.unpack_from(self._buf, off + i * ROUTE.size)
+            result.append({"id": self.string(id_idx), "name": self.string(name_idx), "direction": self.string(dir_idx)})
+        return result
+
+    def stop_count(self) -> int:
+        return self._sections["stops"][1]
+
+    def stop(self, stop_id: str) -> dict | None:
+        idx = self.stop_idx(stop_id)
+        return None if idx is None else self._stop(idx)
+
+    def stop_at(self, idx: int) -> dict:
+        return self._stop(idx)
+
+    def stop_idx(self, stop_id: str) -> int | None:
+        if self._stop_index is None:
+            off, count = self._sections["stops"]
+            self._stop_index = {
+                self.string(STOP.unpack_from(self._buf, off + i * STOP.size)[0]): i
+                for i in range(count)
+            }
+        return self._stop_index.get(stop_id)
+
+    def route_stop_indexes(self, route_id: str) -> list[int]:
+        route = self._route(route_id)
+        if route is None:
+            return []
+        seq_start, seq_len = route[3], route[4]
+        off, _ = self._sections["sequence"]
+        start = off + seq_start * SEQ.size
+        return list(struct.unpack_from(f"<{seq_len}I", self._buf, start))
+
+    def route_distances(self, route_id: str) -> list[float]:
+        """Metres from the first stop for each position of route_stop_indexes."""
+        route = self._route(route_id)
+        if route is None:
+            return []
+        seq_start, seq_len = route[3], route[4]
+        off, _ = self._sections["distances"]
+        return list(struct.unpack_from(f"<{seq_len}f", self._buf, off + seq_start * DIST.size))
+
+    def route_segment_factors(self, route_id: str) -> list[float]:
+        """Learned time ratio of the leg leaving each position of route_stop_indexes, 0 where unknown."""
+        route = self._route(route_id)
+        if route is None:
+            return []
+        seq_start, seq_len = route[3], route[4]
+        off, _ = self._sections["segments"]
+        return list(struct.unpack_from(f"<{seq_len}f", self._buf, off + seq_start * SEGMENT.size))
+
+    def is_loop(self, route_id: str) -> bool:
+        route = self._route(route_id)
+        return route is not None and bool(route[7] & FLAG_LOOP)
+
+    def stop_positions(self, route_id: str, stop_id: str) -> list[int]:
+        """Positions of a stop in the route sequence. Loop routes can call at a stop more than once."""
+        idx = self.stop_idx(stop_id)
+        if idx is None:
+            return []
+        return [i for i, s in enumerate(self.route_stop_indexes(route_id)) if s == idx]
+
+    def segment_fraction(self, route_id: str, from_stop_id: str, to_stop_id: str) -> float | None:
+        """
+        Share of the route's length between two stops, or None when it can't be told.
+        On loop routes the first call at `from_stop_id` is paired with the next call at `to_stop_id`.
+        """
+        distances = self.route_distances(route_id)
+        if not distances or distances[-1] <= 0:
+            return None
+        for start in self.stop_positions(route_id, from_stop_id):
+            for end in self.stop_positions(route_id, to_stop_id):
+                if end > start:
+                    return (distances[end] - distances[start]) / distances[-1]
+        return None
+
+    def route_stops(self, route_id: str) -> list[dict]:
+        """Stops on a route in sequence order, shaped like the /stops endpoint."""
+        route = self._route(route_id)
+        if route is None:
+            return []
+        direction = self.string(route[2])
+        distances = self.route_distances(route_id)
+        result = []
+        for position, idx in enumerate(self.route_stop_indexes(route_id)):
+            stop = self._stop(idx)
+            result.append({
+                "id": stop["id"],
+                "name": stop["name"],
+                "sequence": position + 1,
+                "direction": direction,
+                "distance_m": round(distances[position], 1),
+            })
+        return result
+
+    def trips(self, route_id: str) -> list[tuple[int, int]]:
+        """Official (start_minute, end_minute) trips for a route, sorted by start."""
+        route = self._route(route_id)
+        if route is None or route[6] == 0:
+            return []
+        trip_start, trip_len = route[5], route[6]
+        off, _ = self._sections["trips"]
+        flat = struct.unpack_from(f"<{trip_len * 2}H", self._buf, off + trip_start * TRIP.size)
+        return list(zip(flat[0::2], flat[1::2]))
+
+    def closest_trip(self, route_id: str, planned: datetime) -> tuple[int, int] | None:
+        trips = self.trips(route_id)
+        if not trips:
+            return None
+        minute = planned.hour * 60 + planned.minute
+        i = bisect_left(trips, (minute, 0))
+        candidates = trips[max(i - 1, 0):i + 1]
+        return min(candidates, key=lambda trip: abs(trip[0] - minute))
+
+    def route_stats(self, route_id: str) -> dict | None:
+        i = self._route_index.get(route_id)
+        if i is None:
+            return None
+        off, _ = self._sections["stats"]
+        count, avg_sec, median_sec, p75_sec = STATS.unpack_from(self._buf, off + i * STATS.size)
+        if count == 0:
+            return None
+        return {"count": count, "avg_sec": avg_sec, "median_sec": median_sec, "p75_sec": p75_sec}
+
+
+def pack_snapshot(routes: list[dict], stops: list[dict], trips: dict, stats: dict, segments: dict | None = None) -> bytes:
+    """
+    Pack catalog data into snapshot bytes.
+
+    routes: [{"id", "name", "direction", "stops": [stop_id, ...], "distances": [metres, ...], "loop": bool}]
+    stops:  [{"id", "name", "latitude", "longitude"}]
+    trips:  {route_id: [(start_minute, end_minute), ...]}
+    stats:  {route_id: {"count", "avg_sec", "median_sec", "p75_sec"}}
+    segments: {route_id: [factor, ...]} parallel to the route's "stops", 0 where unknown
+    """
+    strings: list[bytes] = []
+    string_ids: dict[str, int] = {}
+
+    def intern(value: str | None) -> int:
+        if value is None:
+            return NO_STRING
+        if value not in string_ids:
+            string_ids[value] = len(strings)
+            strings.append(value.encode("utf-8"))
+        return string_ids[value]
+
+    stop_index = {}
+    stop_section = bytearray()
+    for stop in stops:
+        stop_index[stop["id"]] = len(stop_index)
+        stop_section += STOP.pack(
+            intern(stop["id"]), intern(stop["name"]),
+            stop.get("latitude") or 0.0, stop.get("longitude") or 0.0,
+        )
+
+    route_section = bytearray()
+    seq_section = bytearray()
+    trip_section = bytearray()
+    stats_section = bytearray()
+    dist_section = bytearray()
+    segment_section = bytearray()
+    seq_count = trip_count = 0
+
+    for route in sorted(routes, key=lambda r: r["id"]):
+        # Sequences are compiled (validated) before packing, see stop_sequence.py
+        positions = [i for i, s in enumerate(route.get("stops", [])) if s in stop_index]
+        seq = [stop_index[route["stops"][i]] for i in positions]
+        route_distances = route.get("distances")
+        distances = [route_distances[i] for i in positions] if route_distances else [0.0] * len(seq)
+        route_segments = (segments or {}).get(route["id"])
+        factors = [route_segments[i] for i in positions] if route_segments else [0.0] * len(seq)
+        route_trips = [t for t in trips.get(route["id"], []) if 0 <= t[0] <= t[1] <= 0xFFFF]
+
+        route_section += ROUTE.pack(
+            intern(route["id"]), intern(route["name"]), intern(route.get("direction")),
+            seq_count, len(seq), trip_count, len(route_trips),
+            FLAG_LOOP if route.get("loop") else 0,
+        )
+        seq_section += struct.pack(f"<{len(seq)}I", *seq)
+        dist_section += struct.pack(f"<{len(distances)}f", *distances)
+        segment_section += struct.pack(f"<{len(factors)}f", *factors)
+        for start, end in route_trips:
+            trip_section += TRIP.pack(start, end)
+        seq_count += len(seq)
+        trip_count += len(route_trips)
+
+        route_stats = stats.get(route["id"])
+        if route_stats:
+            stats_section += STATS.pack(
+                route_stats["count"], route_stats["avg_sec"], route_stats["median_sec"], route_stats["p75_sec"]
+            )
+        else:
+            stats_section += STATS.pack(0, 0.0, 0.0, 0.0)
+
+    offsets = [0]
+    for value in strings:
+        offsets.append(offsets[-1] + len(value))
+    string_section = struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(strings)
+
+    bodies = [
+        (string_section, len(strings)),
+        (route_section, len(routes)),
+        (stop_section, len(stops)),
+        (seq_section, seq_count),
+        (trip_section, trip_count),
+        (stats_section, len(routes)),
+        (dist_section, seq_count),
+        (segment_section, seq_count),
+    ]
+
+    header_fields = []
+    offset = HEADER.size
+    for body, count in bodies:
+        # Keep sections 8-byte aligned so float fields never straddle pages oddly
+        offset += -offset % 8
+        header_fields += [offset, count]
+        offset += len(body)
+
+    out = bytearray(HEADER.pack(MAGIC, VERSION, int(datetime.now(timezone.utc).timestamp()), *header_fields))
+    for body, _ in bodies:
+        out += b"\0" * (-len(out) % 8)
+        out += body
+    return bytes(out)
+
+
+def write_snapshot(path: str, data: bytes) -> None:
+    """Atomically replace the snapshot so mapped readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+_catalog = None
+_catalog_loaded = False
+_lock = Lock()
+
+
+def get_catalog() -> CatalogSnapshot | None:
+    """
+    Process-wide catalog, mapped on first use. None when no snapshot exists.
+    Workers in shared mode (SHARED_TABLES_NAME) read the coordinator's copy instead.
+    """
+    global _catalog, _catalog_loaded
+
+    from app.Services.Shared.shared_tables import get_shared_reader
+
+    shared = get_shared_reader()
+    if shared is not None:
+        catalog = shared.catalog()
+        if catalog is not None:
+            return catalog
+
+    if _catalog_loaded:
+        return _catalog
+
+    with _lock:
+        if not _catalog_loaded:
+            _catalog = _load(snapshot_path())
+            _catalog_loaded = True
+    return _catalog
+
+
+def reload_catalog() -> CatalogSnapshot | None:
+    """Re-map the snapshot file, e.g. after ingest has rewritten it."""
+    global _catalog, _catalog_loaded
+
+    with _lock:
+        _catalog = _load(snapshot_path())
+        _catalog_loaded = True
+    return _catalog
+
+
+def _load(path: str) -> CatalogSnapshot | None:
+    logger = get_logger()
+    if not os.path.exists(path):
+        logger.info(f"No catalog snapshot at {path}, serving from the database")
+        return None
+    try:
+        catalog = CatalogSnapshot.open(path)
+    except (OSError, ValueError, struct.error) as e:
+        logger.warning(f"Could not load catalog snapshot {path}: {e}")
+        return None
+    logger.info(f"Catalog snapshot loaded from {path} ({len(catalog.route_ids())} routes)")
+    return catalog
@@ -0,0 +1,65 @@
+"""
+Stop sequence compilation, run once at ingest.
+
+Raw sequences come from the CIF timetable (or RouteStop order when there is no
+CIF file). Compiling drops stops that don't exist or have no usable name,
+collapses a stop repeated back to back, and keeps stops a loop route visits
+twice, so each position in the compiled sequence is one real call of the bus.
+Cumulative distances along the route are worked out from stop coordinates.
+"""
+
+import math
+
+EARTH_RADIUS_M = 6_371_000
+INVALID_STOP_NAMES = {"", "Unknown Stop"}
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class CompiledSequence:
+    __slots__ = ("stop_ids", "distances", "is_loop", "dropped")
+
+    def __init__(self, stop_ids: list[str], distances: list[float], is_loop: bool, dropped: int):
+        self.stop_ids = stop_ids
+        # Metres from the first stop, one per position
+        self.distances = distances
+        self.is_loop = is_loop
+        self.dropped = dropped
+
+
+def compile_sequence(stop_ids: list[str], stops_by_id: dict[str, dict]) -> CompiledSequence:
+    """Validate a raw stop sequence against known stops and attach cumulative distances."""
+    valid = []
+    dropped = 0
+    for stop_id in stop_ids:
+        stop = stops_by_id.get(stop_id)
+        if stop is None or (stop.get("name") or "").strip() in INVALID_STOP_NAMES:
+            dropped += 1
+            continue
+        if valid and valid[-1] == stop_id:
+            dropped += 1
+            continue
+        valid.append(stop_id)
+
+    distances = []
+    total = 0.0
+    previous = None
+    for stop_id in valid:
+        stop = stops_by_id[stop_id]
+        if previous is not None and _has_coords(previous) and _has_coords(stop):
+            total += haversine_m(previous["latitude"], previous["longitude"], stop["latitude"], stop["longitude"])
+        distances.append(total)
+        previous = stop
+
+    is_loop = len(valid) > 1 and len(set(valid)) < len(valid)
+    return CompiledSequence(valid, distances, is_loop, dropped)
+
+
+def _has_coords(stop: dict) -> bool:
+    return bool(stop.get("latitude")) and bool(stop.get("longitude"))
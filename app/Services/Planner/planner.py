@@ -0,0 +1,255 @@
+"""
+Journey planner over the catalog snapshot.
+
+The snapshot's route stop sequences and official CIF trips are compiled once
+into a stop→routes graph and a timetable of elementary connections (one bus
+moving between two consecutive stops), stored as flat arrays sorted by
+departure. Queries run a Connection Scan (CSA) over those arrays, so a plan
+is answered in memory without touching the database.
+
+Stop times inside a trip are spread between the CIF origin departure and
+destination arrival in proportion to the compiled distance along the route
+(evenly by stop when coordinates are missing). Each leg is then stretched by
+its learned ratio of real to official travel time from the snapshot, or by
+the route's ratio where too few journeys covered that leg.
+
+Queries bisect to the first connection at or after the requested departure.
+The arrays also hold the next service day's early trips and the previous
+day's trips running past midnight, so a late evening or small hours query
+still finds buses across the day boundary.
+"""
+
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from zoneinfo import ZoneInfo
+
+from app.Services.Catalog.snapshot import CatalogSnapshot, get_catalog
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+INF = float("inf")
+DAY_SECONDS = 24 * 3600
+
+
+class CompiledNetwork:
+    MIN_TRANSFER_SECONDS = 60
+    # Don't scan connections more than this far past the requested departure
+    HORIZON_SECONDS = 4 * 3600
+    # Bounds for the learned real/official travel time ratios
+    MIN_SPEED_FACTOR = 0.5
+    MAX_SPEED_FACTOR = 3.0
+
+    def __init__(self, catalog: CatalogSnapshot):
+        self.catalog = catalog
+        self.stop_routes: dict[int, list[str]] = {}
+        self.trip_route: list[str] = []
+
+        connections = []
+        for route_id in catalog.route_ids():
+            seq = catalog.route_stop_indexes(route_id)
+            for stop_idx in set(seq):
+                self.stop_routes.setdefault(stop_idx, []).append(route_id)
+
+            trips = catalog.trips(route_id)
+            if len(seq) < 2 or not trips:
+                continue
+
+            legs = len(seq) - 1
+            shares = self._shares(catalog.route_distances(route_id), legs)
+            factors = self._leg_factors(route_id, trips, legs)
+            # Seconds from trip start to each stop position per second of official trip time
+            offsets = [0.0]
+            for i in range(legs):
+                offsets.append(offsets[-1] + (shares[i + 1] - shares[i]) * factors[i])
+            for start_min, end_min in trips:
+                trip = len(self.trip_route)
+                self.trip_route.append(route_id)
+                start = start_min * 60
+                duration = (end_min - start_min) * 60
+                for i in range(legs):
+                    connections.append((
+                        int(start + duration * offsets[i]),
+                        int(start + duration * offsets[i + 1]),
+                        seq[i],
+                        seq[i + 1],
+                        trip,
+                    ))
+
+        # Across the day boundary: tomorrow's trips within the horizon and the
+        # part of yesterday's trips that runs past midnight, as separate trip ids
+        trips_per_day = len(self.trip_route)
+        connections += [
+            (dep + DAY_SECONDS, arr + DAY_SECONDS, a, b, trip + trips_per_day)
+            for dep, arr, a, b, trip in connections if dep <= self.HORIZON_SECONDS
+        ] + [
+            (dep - DAY_SECONDS, arr - DAY_SECONDS, a, b, trip + 2 * trips_per_day)
+            for dep, arr, a, b, trip in connections if dep >= DAY_SECONDS
+        ]
+
+        connections.sort()
+        self.dep = array("i", (c[0] for c in connections))
+        self.arr = array("i", (c[1] for c in connections))
+        self.from_stop = array("I", (c[2] for c in connections))
+        self.to_stop = array("I", (c[3] for c in connections))
+        self.trip = array("I", (c[4] for c in connections))
+
+        logger.info(
+            f"[PLANNER] compiled {len(self.dep):,} connections over "
+            f"{trips_per_day:,} trips and {len(self.stop_routes):,} stops"
+        )
+
+    @staticmethod
+    def _shares(distances: list[float], legs: int) -> list[float]:
+        """Fraction of the trip completed at each stop position."""
+        if len(distances) == legs + 1 and distances[-1] > 0:
+            return [d / distances[-1] for d in distances]
+        return [i / legs for i in range(legs + 1)]
+
+    def _speed_factor(self, route_id: str, trips: list[tuple[int, int]]) -> float:
+        stats = self.catalog.route_stats(route_id)
+        if not stats:
+            return 1.0
+        official = sorted(end - start for start, end in trips)[len(trips) // 2] * 60
+        if official <= 0:
+            return 1.0
+        return self._clamp(stats["median_sec"] / official)
+
+    def _leg_factors(self, route_id: str, trips: list[tuple[int, int]], legs: int) -> list[float]:
+        """Learned time ratio per leg, falling back to the route's ratio where the snapshot has none."""
+        route_factor = self._speed_factor(route_id, trips)
+        learned = self.catalog.route_segment_factors(route_id)
+        return [
+            self._clamp(learned[i]) if i < len(learned) and learned[i] > 0 else route_factor
+            for i in range(legs)
+        ]
+
+    def _clamp(self, factor: float) -> float:
+        return min(max(factor, self.MIN_SPEED_FACTOR), self.MAX_SPEED_FACTOR)
+
+    def route_of(self, trip: int) -> str:
+        # Trip ids past the day's count are the shifted copies of the same trips
+        return self.trip_route[trip % len(self.trip_route)]
+
+    def earliest_arrival(self, origin: int, target: int, depart_sec: int) -> list[tuple[int, int]] | None:
+        """
+        Connection scan from `origin` at `depart_sec` (seconds past service-day midnight),
+        starting from the first connection at or after it.
+        Returns the journey as [(first_connection, last_connection), ...] one per leg, or None.
+        """
+        earliest = {origin: depart_sec}
+        arrived_by: dict[int, tuple[int, int]] = {}
+        boarded: dict[int, int] = {}
+        best = INF
+        horizon = depart_sec + self.HORIZON_SECONDS
+
+        dep, arr, from_stop, to_stop, trip_ids = self.dep, self.arr, self.from_stop, self.to_stop, self.trip
+        for i in range(bisect_left(dep, depart_sec), len(dep)):
+            dep_i = dep[i]
+            if dep_i >= best or dep_i > horizon:
+                break
+
+            trip = trip_ids[i]
+            if trip not in boarded:
+                stop = from_stop[i]
+                reached = earliest.get(stop)
+                if reached is None:
+                    continue
+                if stop != origin:
+                    reached += self.MIN_TRANSFER_SECONDS
+                if reached > dep_i:
+                    continue
+                boarded[trip] = i
+
+            to = to_stop[i]
+            if arr[i] < earliest.get(to, INF):
+                earliest[to] = arr[i]
+                arrived_by[to] = (boarded[trip], i)
+                if to == target:
+                    best = arr[i]
+
+        if target not in arrived_by:
+            return None
+
+        legs = []
+        stop = target
+        while stop != origin:
+            first, last = arrived_by[stop]
+            legs.append((first, last))
+            stop = self.from_stop[first]
+        legs.reverse()
+        return legs
+
+    def plan(self, from_stop_id: str, to_stop_id: str, depart: datetime, options: int = 3, tz: ZoneInfo | None = None) -> list[dict]:
+        """Up to `options` itineraries, each leaving later than the previous one."""
+        origin = self.catalog.stop_idx(from_stop_id)
+        target = self.catalog.stop_idx(to_stop_id)
+        if origin is None or target is None or origin == target:
+            return []
+        # Stops no route serves can't be part of any plan
+        if origin not in self.stop_routes or target not in self.stop_routes:
+            return []
+
+        local = depart.astimezone(tz) if tz else depart
+        midnight = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        depart_sec = int((local - midnight).total_seconds())
+
+        results = []
+        while len(results) < options:
+            legs = self.earliest_arrival(origin, target, depart_sec)
+            if legs is None:
+                break
+            results.append(self._itinerary(legs, midnight))
+            depart_sec = self.dep[legs[0][0]] + 1
+        return results
+
+    def _itinerary(self, legs: list[tuple[int, int]], midnight: datetime) -> dict:
+        def at(seconds: int) -> str:
+            return (midnight + timedelta(seconds=seconds)).astimezone(timezone.utc).isoformat()
+
+        out = []
+        for first, last in legs:
+            route_id = self.route_of(self.trip[first])
+            from_stop = self.catalog.stop_at(self.from_stop[first])
+            to_stop = self.catalog.stop_at(self.to_stop[last])
+            out.append({
+                "route_id": route_id,
+                "from_stop_id": from_stop["id"],
+                "from_stop_name": from_stop["name"],
+                "to_stop_id": to_stop["id"],
+                "to_stop_name": to_stop["name"],
+                "departure": at(self.dep[first]),
+                "arrival": at(self.arr[last]),
+            })
+
+        departure = self.dep[legs[0][0]]
+        arrival = self.arr[legs[-1][1]]
+        return {
+            "departure": at(departure),
+            "arrival": at(arrival),
+            "duration_minutes": round((arrival - departure) / 60, 1),
+            "transfers": len(legs) - 1,
+            "legs": out,
+        }
+
+
+_network: CompiledNetwork | None = None
+_lock = Lock()
+
+
+def get_network() -> CompiledNetwork | None:
+    """Network compiled from the current catalog, recompiled when the catalog is reloaded."""
+    global _network
+
+    catalog = get_catalog()
+    if catalog is None:
+        return None
+    if _network is not None and _network.catalog is catalog:
+        return _network
+
+    with _lock:
+        if _network is None or _network.catalog is not catalog:
+            _network = CompiledNetwork(catalog)
+    return _network
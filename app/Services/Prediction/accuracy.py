@@ -0,0 +1,72 @@
+"""
+Served prediction accuracy and timetable adherence, aggregated in SQL.
+
+predicted_arrival, end_time and the official times are all timestamps, so
+per-route error figures are a single GROUP BY over completed journeys:
+    prediction error   predicted_arrival - end_time  (positive = predicted too late)
+    timetable start    start_time - official_start_time
+    timetable end      end_time - official_end_time
+Nothing is read back row by row. For what a prediction rule *would* have
+served, replay history with the backtest instead.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Integer, case, func
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.schemas.journey import JourneyEventType
+from app.Services.Prediction.data_quality import usable_for_stats
+from app.utils.dates import naive_utc
+from app.utils.sql import seconds_between
+
+ON_TARGET_SECONDS = 300
+
+
+def _minutes(value) -> float | None:
+    return None if value is None else round(float(value) / 60, 2)
+
+
+class PredictionAccuracy:
+
+    @staticmethod
+    def by_route(db: Session, start: datetime, end: datetime, route_id: str | None = None) -> list[dict]:
+        """Per route figures for real user journeys completed in [start, end)."""
+        error = seconds_between(Journey.predicted_arrival, Journey.end_time)
+        start_adherence = seconds_between(Journey.start_time, Journey.official_start_time)
+        end_adherence = seconds_between(Journey.end_time, Journey.official_end_time)
+
+        query = db.query(
+            Journey.route_id,
+            func.count().label("journeys"),
+            func.count(Journey.predicted_arrival).label("predicted"),
+            func.avg(func.abs(error)).label("mae"),
+            func.avg(error).label("bias"),
+            func.sum(case((func.abs(error) <= ON_TARGET_SECONDS, 1), else_=0), type_=Integer).label("on_target"),
+            func.avg(start_adherence).label("start_adherence"),
+            func.avg(end_adherence).label("end_adherence"),
+        ).filter(
+            Journey.status == JourneyEventType.EVENT_TYPE_STOP_REACHED,
+            Journey.data_source == "user",
+            Journey.is_synthetic.is_not(True),
+            Journey.end_time >= naive_utc(start),
+            Journey.end_time < naive_utc(end),
+            usable_for_stats(),
+        )
+        if route_id is not None:
+            query = query.filter(Journey.route_id == route_id)
+
+        return [
+            {
+                "route_id": row.route_id,
+                "journeys": row.journeys,
+                "predicted": row.predicted,
+                "mae_minutes": _minutes(row.mae),
+                "bias_minutes": _minutes(row.bias),
+                "within_5_min_pct": round(100 * row.on_target / row.predicted, 1) if row.predicted else None,
+                "timetable_start_delay_minutes": _minutes(row.start_adherence),
+                "timetable_end_delay_minutes": _minutes(row.end_adherence),
+            }
+            for row in query.group_by(Journey.route_id).order_by(Journey.route_id)
+        ]
@@ -0,0 +1,183 @@
+"""
+Prediction cache.
+
+Riders on the same route start journeys within seconds of each other and each
+one used to run the same prediction queries. Predictions are cached per
+(route, origin, destination, time bucket) in two tiers:
+
+- in-process LRU + TTL (always on)
+- shared Redis tier (on when PREDICTION_CACHE_REDIS_URL is set)
+
+Concurrent misses for the same key are coalesced so only one request runs the
+queries. A completed journey bumps its route's generation, which makes every
+cached entry for that route unreachable without scanning the cache.
+"""
+
+import json
+import os
+from datetime import datetime
+from threading import Event, Lock
+from typing import Callable, Tuple
+
+from app.utils.lazy import lazy_singleton
+from app.utils.ttl_cache import TTLCache
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+# (predicted_seconds, status)
+CachedPrediction = Tuple[float, str]
+
+
+class RedisTier:
+    """Shared tier so every worker benefits from a prediction computed once."""
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # Only needed when the shared tier is configured
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.05)
+        self.ttl = ttl
+
+    def _generation(self, route_id: str) -> int:
+        return int(self._client.get(f"prediction:gen:{route_id}") or 0)
+
+    def get(self, key: tuple) -> CachedPrediction | None:
+        raw = self._client.get(self._key(key))
+        return tuple(json.loads(raw)) if raw else None
+
+    def set(self, key: tuple, value: CachedPrediction) -> None:
+        self._client.set(self._key(key), json.dumps(value), px=int(self.ttl * 1000))
+
+    def invalidate_route(self, route_id: str) -> None:
+        self._client.incr(f"prediction:gen:{route_id}")
+
+    def _key(self, key: tuple) -> str:
+        route_id = key[0]
+        return f"prediction:{route_id}:{self._generation(route_id)}:" + ":".join(map(str, key[1:]))
+
+
+class _InFlight:
+    __slots__ = ("done", "value")
+
+    def __init__(self):
+        self.done = Event()
+        self.value = None
+
+
+class PredictionCache:
+    COALESCE_WAIT_SECONDS = 5.0
+
+    def __init__(self, shared: RedisTier | None = None, bucket_minutes: int = 5, ttl: float = 60.0, maxsize: int = 4096):
+        self.bucket_minutes = bucket_minutes
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._generations: dict[str, int] = {}
+        self._in_flight: dict[tuple, _InFlight] = {}
+        self._lock = Lock()
+        self.shared_hits = 0
+        self.coalesced = 0
+        self.computed = 0
+        self.invalidations = 0
+
+    def key(self, route_id: str, start_stop_id: str | None, end_stop_id: str | None, start_time: datetime) -> tuple:
+        bucket = int(start_time.timestamp() // (self.bucket_minutes * 60))
+        return (route_id, start_stop_id, end_stop_id, bucket)
+
+    def get_or_compute(self, key: tuple, compute: Callable[[], CachedPrediction]) -> CachedPrediction:
+        local_key = (self._generations.get(key[0], 0),) + key
+        value = self.local.get(local_key)
+        if value is not None:
+            return value
+
+        if self.shared is not None:
+            value = self._shared_get(key)
+            if value is not None:
+                self.shared_hits += 1
+                self.local.set(local_key, value)
+                return value
+
+        with self._lock:
+            flight = self._in_flight.get(local_key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[local_key] = _InFlight()
+
+        if not leader:
+            self.coalesced += 1
+            if flight.done.wait(self.COALESCE_WAIT_SECONDS) and flight.value is not None:
+                return flight.value
+            # Leader failed or is stuck, compute our own
+            return compute()
+
+        try:
+            value = compute()
+            self.computed += 1
+            flight.value = value
+            # Only store if the route wasn't invalidated while we were computing
+            if local_key[0] == self._generations.get(key[0], 0):
+                self.local.set(local_key, value)
+                if self.shared is not None:
+                    self._shared_set(key, value)
+            return value
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._in_flight.pop(local_key, None)
+
+    def invalidate_route(self, route_id: str) -> None:
+        with self._lock:
+            self._generations[route_id] = self._generations.get(route_id, 0) + 1
+        self.invalidations += 1
+        if self.shared is not None:
+            try:
+                self.shared.invalidate_route(route_id)
+            except Exception as e:
+                logger.warning(f"Shared prediction cache invalidation failed for {route_id}: {e}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generations.clear()
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.local.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.computed,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "size": len(self.local),
+            "shared_tier": self.shared is not None,
+        }
+
+    # The shared tier is best effort: if Redis is slow or down we fall back to computing
+    def _shared_get(self, key: tuple) -> CachedPrediction | None:
+        try:
+            return self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Shared prediction cache read failed: {e}")
+            return None
+
+    def _shared_set(self, key: tuple, value: CachedPrediction) -> None:
+        try:
+            self.shared.set(key, value)
+        except Exception as e:
+            logger.warning(f"Shared prediction cache write failed: {e}")
+
+
+@lazy_singleton
+def get_prediction_cache() -> PredictionCache:
+    ttl = float(os.getenv("PREDICTION_CACHE_TTL_SECONDS", "60"))
+    shared = None
+    url = os.getenv("PREDICTION_CACHE_REDIS_URL")
+    if url:
+        try:
+            shared = RedisTier(url, ttl=ttl)
+        except ImportError:
+            logger.warning("PREDICTION_CACHE_REDIS_URL is set but redis is not installed, using local cache only")
+    return PredictionCache(
+        shared=shared,
+        bucket_minutes=int(os.getenv("PREDICTION_CACHE_BUCKET_MINUTES", "5")),
+        ttl=ttl,
+        maxsize=int(os.getenv("PREDICTION_CACHE_MAX_ENTRIES", "4096")),
+    )
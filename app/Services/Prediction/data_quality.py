@@ -0,0 +1,129 @@
+"""
+Data-quality stage for completed journeys.
+
+Runs once when a journey reaches STOP_REACHED and stores the verdict in
+`journeys.quality_flag`, so prediction queries can exclude bad durations with
+a plain filter instead of re-checking every row on every read.
+
+Flags:
+    ok           usable for prediction stats
+    synthetic    seeded data (`is_synthetic`), usable but never used as a baseline
+    implausible  shorter than a minute or longer than MAX_DURATION_HOURS
+    outlier      too far from the route's robust centre (modified z-score / IQR fence)
+    incomplete   missing start or end time
+"""
+
+from typing import List
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.schemas.journey import JourneyEventType
+from app.utils.logger.logger import get_logger
+from app.utils.dates import naive_utc
+
+logger = get_logger()
+
+FLAG_OK = "ok"
+FLAG_SYNTHETIC = "synthetic"
+FLAG_IMPLAUSIBLE = "implausible"
+FLAG_OUTLIER = "outlier"
+FLAG_INCOMPLETE = "incomplete"
+
+# Durations with these flags never feed prediction stats
+EXCLUDED_FLAGS = (FLAG_IMPLAUSIBLE, FLAG_OUTLIER, FLAG_INCOMPLETE)
+
+
+def usable_for_stats():
+    """SQL filter for journeys whose duration may feed prediction stats. Unchecked legacy rows count."""
+    return or_(Journey.quality_flag.is_(None), Journey.quality_flag.not_in(EXCLUDED_FLAGS))
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * q), len(sorted_values) - 1)]
+
+
+class DurationQualityCheck:
+    MIN_DURATION_SECONDS = 60
+    MAX_DURATION_HOURS = 4
+    MIN_BASELINE = 10
+    BASELINE_WINDOW = 100
+    # Newest journeys checked for a shift in the route's typical duration
+    RECENT_WINDOW = 20
+    MAX_MODIFIED_Z = 3.5
+    IQR_FENCE = 3.0
+
+    @staticmethod
+    def baseline(db: Session, route_id: str) -> List[float]:
+        """
+        Recent real user durations for a route (seconds), newest first.
+
+        Rows flagged outlier stay in: the median/MAD score tolerates a minority
+        of them, and leaving them out would freeze the baseline when the route's
+        real duration changes (a diversion, a new timetable). If the newest
+        RECENT_WINDOW journeys sit outside the wider window, the route has
+        shifted and they alone are the baseline until the window catches up.
+        """
+        rows = db.query(Journey.start_time, Journey.end_time).filter(
+            Journey.route_id == route_id,
+            Journey.status == JourneyEventType.EVENT_TYPE_STOP_REACHED,
+            Journey.data_source == "user",
+            Journey.is_synthetic.is_not(True),
+            Journey.quality_flag.in_((FLAG_OK, FLAG_OUTLIER)),
+        ).order_by(Journey.end_time.desc()).limit(DurationQualityCheck.BASELINE_WINDOW).all()
+        durations = [(naive_utc(row.end_time) - naive_utc(row.start_time)).total_seconds() for row in rows]
+
+        recent = durations[:DurationQualityCheck.RECENT_WINDOW]
+        if len(durations) > len(recent) >= DurationQualityCheck.MIN_BASELINE:
+            recent_median = _percentile(sorted(recent), 0.5)
+            if DurationQualityCheck.score(recent_median, durations) == FLAG_OUTLIER:
+                logger.info(f"[QUALITY] {route_id} durations have shifted, re-baselining on the newest {len(recent)}")
+                return recent
+        return durations
+
+    @staticmethod
+    def score(duration_sec: float, baseline: List[float]) -> str:
+        """Classify one duration against a route baseline."""
+        if duration_sec < DurationQualityCheck.MIN_DURATION_SECONDS:
+            return FLAG_IMPLAUSIBLE
+        if duration_sec > DurationQualityCheck.MAX_DURATION_HOURS * 3600:
+            return FLAG_IMPLAUSIBLE
+        if len(baseline) < DurationQualityCheck.MIN_BASELINE:
+            return FLAG_OK
+
+        values = sorted(baseline)
+        median = _percentile(values, 0.5)
+        mad = _percentile(sorted(abs(v - median) for v in values), 0.5)
+
+        if mad > 0:
+            modified_z = 0.6745 * (duration_sec - median) / mad
+            return FLAG_OUTLIER if abs(modified_z) > DurationQualityCheck.MAX_MODIFIED_Z else FLAG_OK
+
+        # More than half the baseline is identical, fall back to an IQR fence
+        q1, q3 = _percentile(values, 0.25), _percentile(values, 0.75)
+        iqr = q3 - q1
+        if iqr == 0:
+            return FLAG_OK
+        low = q1 - DurationQualityCheck.IQR_FENCE * iqr
+        high = q3 + DurationQualityCheck.IQR_FENCE * iqr
+        return FLAG_OK if low <= duration_sec <= high else FLAG_OUTLIER
+
+    @staticmethod
+    def apply(db: Session, journey: Journey) -> str:
+        """Flag a just-completed journey. Joins the caller's transaction, caller commits."""
+        if journey.is_synthetic:
+            flag = FLAG_SYNTHETIC
+        elif journey.start_time is None or journey.end_time is None:
+            flag = FLAG_INCOMPLETE
+        else:
+            duration = naive_utc(journey.end_time) - naive_utc(journey.start_time)
+            flag = DurationQualityCheck.score(
+                duration.total_seconds(),
+                DurationQualityCheck.baseline(db, journey.route_id),
+            )
+
+        journey.quality_flag = flag
+        if flag != FLAG_OK:
+            logger.info(f"[QUALITY] Journey {journey.id} on {journey.route_id} flagged {flag}")
+        return flag
@@ -0,0 +1,120 @@
+"""
+Live delay signal per route and per segment.
+
+Every live event that says something about lateness (a DELAYED report, how
+long a rider waited past their planned start, how far a completed journey
+landed from its predicted arrival) is folded into a time-decayed EWMA. Old
+observations fade with time constant TAU_SECONDS, so a burst of reports in
+the last ten minutes moves predictions and a quiet route drifts back to its
+historical baseline. Updates and reads are O(1).
+
+Observations come from client-supplied times, so implausible ones (a naive
+local planned time read as UTC is an hour out) are dropped rather than
+allowed to skew the whole route.
+"""
+
+import math
+import os
+import time
+from threading import Lock
+
+from app.utils.lazy import lazy_singleton
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+
+class _Ewma:
+    __slots__ = ("value", "weight", "updated")
+
+    def __init__(self, now: float):
+        self.value = 0.0
+        self.weight = 0.0
+        self.updated = now
+
+
+class DelayTracker:
+    # Segments kept before idle ones are pruned
+    MAX_KEYS = 10_000
+
+    def __init__(self, tau_seconds: float = 600.0, max_late_seconds: float = 1800.0, max_early_seconds: float = 600.0):
+        self.tau = tau_seconds
+        self.max_late = max_late_seconds
+        self.max_early = max_early_seconds
+        self._state: dict[tuple, _Ewma] = {}
+        self._lock = Lock()
+        self.observations = 0
+        self.rejected = 0
+
+    def _decay(self, state: _Ewma, now: float) -> float:
+        return state.weight * math.exp(-max(now - state.updated, 0.0) / self.tau)
+
+    def _update(self, key: tuple, delay_sec: float, now: float) -> None:
+        state = self._state.get(key)
+        if state is None:
+            if len(self._state) >= self.MAX_KEYS:
+                self._prune(now)
+            state = self._state[key] = _Ewma(now)
+        weight = self._decay(state, now)
+        state.value = (state.value * weight + delay_sec) / (weight + 1.0)
+        state.weight = weight + 1.0
+        state.updated = now
+
+    def _prune(self, now: float) -> None:
+        for key in [k for k, s in self._state.items() if self._decay(s, now) < 0.01]:
+            del self._state[key]
+
+    def observe(self, route_id: str, delay_sec: float, segment: tuple | None = None, now: float | None = None) -> bool:
+        """
+        Record a delay in seconds (negative = early) for a route and optionally one
+        segment of it. Returns False, recording nothing, if it is out of bounds.
+        """
+        if not -self.max_early <= delay_sec <= self.max_late:
+            with self._lock:
+                self.rejected += 1
+            logger.info(f"[LIVE DELAY] ignored implausible delay of {delay_sec:.0f}s on {route_id}")
+            return False
+
+        now = time.time() if now is None else now
+        with self._lock:
+            self._update((route_id,), delay_sec, now)
+            if segment is not None:
+                self._update((route_id,) + tuple(segment), delay_sec, now)
+            self.observations += 1
+        return True
+
+    def correction(self, route_id: str, segment: tuple | None = None, now: float | None = None) -> float:
+        """
+        Seconds to add to a historical prediction. Scaled by how much recent
+        evidence there is: one fresh report gives half its value, several give nearly all of it.
+        """
+        now = time.time() if now is None else now
+        state = None
+        if segment is not None:
+            state = self._state.get((route_id,) + tuple(segment))
+            if state is not None and self._decay(state, now) < 1.0:
+                state = None  # Too little segment evidence, use the route signal
+        if state is None:
+            state = self._state.get((route_id,))
+        if state is None:
+            return 0.0
+
+        weight = self._decay(state, now)
+        return state.value * weight / (weight + 1.0)
+
+    def stats(self) -> dict:
+        return {
+            "keys": len(self._state),
+            "observations": self.observations,
+            "rejected": self.rejected,
+            "tau_seconds": self.tau,
+        }
+
+
+@lazy_singleton
+def get_delay_tracker() -> DelayTracker:
+    return DelayTracker(
+        tau_seconds=float(os.getenv("LIVE_DELAY_TAU_SECONDS", "600")),
+        max_late_seconds=float(os.getenv("LIVE_DELAY_MAX_LATE_SECONDS", "1800")),
+        max_early_seconds=float(os.getenv("LIVE_DELAY_MAX_EARLY_SECONDS", "600")),
+    )
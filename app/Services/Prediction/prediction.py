@@ -4,6 +4,11 @@ from sqlalchemy.orm import Session
 
 from app.models.Journey import Journey
 from app.utils.logger.logger import get_logger
+from app.Services.Catalog.snapshot import get_catalog
+from app.Services.Prediction.cache import get_prediction_cache
+from app.Services.Prediction.data_quality import usable_for_stats
+from app.Services.Prediction.delay_tracker import get_delay_tracker
+from app.Services.Shared.shared_tables import get_shared_reader
 
 
 class PredictionService:
@@ -21,12 +26,24 @@ class PredictionService:
     HIGH_THRESHOLD_MINUTES = 45
     MIN_FOR_STATS = 5
     MIN_TO_TRUST_USERS_ONLY = 20
+    # Most recent user / official journeys a prediction looks at
+    USER_WINDOW = 100
+    OFFICIAL_WINDOW = 50
+    # Live correction at or above this flips an on-time prediction to delayed
+    LIVE_DELAY_STATUS_SECONDS = 300
 
 
     @staticmethod
-    def predict_journey(db: Session,route_id: str,start_time: datetime,)-> Tuple[datetime, str]:
+    def predict_journey(
+        db: Session,
+        route_id: str,
+        start_time: datetime,
+        start_stop_id: str | None = None,
+        end_stop_id: str | None = None,
+    ) -> Tuple[datetime, str]:
         """
-        Main prediction method.
+        Main prediction method. The historical part is cached per route, stops and
+        time bucket; the live delay correction is added on top on every call.
 
         Returns: (predicted_arrival_time, status)
         status: "on_time", "delayed", "early", "unknown"
@@ -39,6 +56,60 @@ class PredictionService:
             logger.warning(f"Very future start time ({start_time}), using fallback")
             return start_time + timedelta(minutes=PredictionService.FALLBACK_MINUTES), "unknown"
 
+        shared = get_shared_reader()
+        published = shared.prediction(route_id) if shared is not None else None
+        if published is not None:
+            # Multi-worker mode: the coordinator's table, the same in every worker
+            predicted_sec, status = published
+        else:
+            cache = get_prediction_cache()
+            predicted_sec, status = cache.get_or_compute(
+                cache.key(route_id, start_stop_id, end_stop_id, start_time),
+                lambda: PredictionService.predict_duration(db, route_id, start_stop_id, end_stop_id),
+            )
+
+        correction = get_delay_tracker().correction(
+            route_id,
+            segment=(start_stop_id, end_stop_id) if start_stop_id and end_stop_id else None,
+        )
+        if correction:
+            predicted_sec = max(predicted_sec + correction, 60.0)
+            if correction >= PredictionService.LIVE_DELAY_STATUS_SECONDS and status in ("on_time", "early"):
+                status = "delayed"
+            logger.debug(f"[PREDICTION] live correction {correction / 60:+.1f} min for {route_id}")
+
+        return start_time + timedelta(seconds=predicted_sec), status
+
+    @staticmethod
+    def predict_duration(
+        db: Session,
+        route_id: str,
+        start_stop_id: str | None = None,
+        end_stop_id: str | None = None,
+    ) -> Tuple[float, str]:
+        """
+        Uncached prediction from journey history.
+
+        Returns: (predicted_seconds, status)
+        """
+        predicted_sec, status, _ = PredictionService.predict_duration_with_source(
+            db, route_id, start_stop_id, end_stop_id
+        )
+        return predicted_sec, status
+
+    @staticmethod
+    def predict_duration_with_source(
+        db: Session,
+        route_id: str,
+        start_stop_id: str | None = None,
+        end_stop_id: str | None = None,
+    ) -> Tuple[float, str, str]:
+        """
+        Same as predict_duration, plus where the number came from:
+        "user_only", "blended", "official", "timetable" or "fallback".
+        """
+        logger = get_logger()
+
         # Get user submitted completed journeys (only durations)
         user_durations = db.query(
             (Journey.end_time - Journey.start_time).label("duration")
@@ -49,16 +120,15 @@ class PredictionService:
             Journey.start_time.is_not(None),
             Journey.end_time.is_not(None),
             Journey.end_time > Journey.start_time,
-            (Journey.end_time - Journey.start_time) > timedelta(minutes=1)
-        ).order_by(Journey.start_time.desc()).limit(100).all()
+            (Journey.end_time - Journey.start_time) > timedelta(minutes=1),
+            usable_for_stats()
+        ).order_by(Journey.start_time.desc()).limit(PredictionService.USER_WINDOW).all()
 
         user_count = len(user_durations)
         logger.debug(f"User journeys found: {user_count}")
 
-        if user_count >= PredictionService.MIN_TO_TRUST_USERS_ONLY:
-            durations_sec = [row.duration.total_seconds() for row in user_durations]
-            source = "user_only"
-        else:
+        official_durations = []
+        if user_count < PredictionService.MIN_TO_TRUST_USERS_ONLY:
             official_durations = db.query(
                 (Journey.end_time - Journey.start_time).label("duration")
             ).filter(
@@ -68,47 +138,98 @@ class PredictionService:
                 Journey.start_time.is_not(None),
                 Journey.end_time.is_not(None),
                 Journey.end_time > Journey.start_time,
-                (Journey.end_time - Journey.start_time) > timedelta(minutes=1)
-            ).limit(50).all()
+                (Journey.end_time - Journey.start_time) > timedelta(minutes=1),
+                usable_for_stats()
+            ).limit(PredictionService.OFFICIAL_WINDOW).all()
 
-            combined = user_durations + official_durations
-            durations_sec = [row.duration.total_seconds() for row in combined]
-            source = "blended" if user_count > 0 else "official"
+        durations_sec, source = PredictionService.select_durations(
+            [row.duration.total_seconds() for row in user_durations],
+            [row.duration.total_seconds() for row in official_durations],
+        )
 
         if not durations_sec:
-            logger.info(f"No valid durations for route {route_id} → fallback")
-            return start_time + timedelta(minutes=PredictionService.FALLBACK_MINUTES), "unknown"
+            official_sec = PredictionService._official_duration(route_id, start_stop_id, end_stop_id)
+            if official_sec is None:
+                logger.info(f"No valid durations for route {route_id} → fallback")
+                return PredictionService.FALLBACK_MINUTES * 60.0, "unknown", "fallback"
+            logger.info(f"No valid durations for route {route_id} → catalog timetable")
+            durations_sec = [official_sec]
+            source = "timetable"
+
+        stats = PredictionService.summarize_durations(durations_sec)
+        predicted_sec, status = PredictionService.status_from_stats(stats)
+        count = stats["count"]
 
-        # Compute stats
+        # Log result
+        logger.info(
+            f"[PREDICTION] {source} | "
+            f"{count} journeys | "
+            f"ETA +{predicted_sec/60:.1f} min | "
+            f"status: {status}"
+        )
+        return predicted_sec, status, source
+
+    @staticmethod
+    def select_durations(user_sec: List[float], official_sec: List[float]) -> Tuple[List[float], str]:
+        """
+        Which durations a prediction is based on, given the recent user and official ones.
+        Returns (durations_sec, source); durations_sec is empty when there are none.
+        """
+        if len(user_sec) >= PredictionService.MIN_TO_TRUST_USERS_ONLY:
+            return user_sec, "user_only"
+        return user_sec + official_sec, "blended" if user_sec else "official"
+
+    @staticmethod
+    def summarize_durations(durations_sec: List[float]) -> dict:
+        """Reduce a list of journey durations (seconds) to the stats predictions use."""
         count = len(durations_sec)
-        avg_sec = sum(durations_sec) / count
         sorted_sec = sorted(durations_sec)
-        median_sec = sorted_sec[count // 2]
+        return {
+            "count": count,
+            "avg_sec": sum(sorted_sec) / count,
+            "median_sec": sorted_sec[count // 2],
+            "p75_sec": sorted_sec[int(count * 0.75)],
+        }
 
-        # Median is more robust with enough data
-        use_median = count >= PredictionService.MIN_FOR_STATS
-        predicted_sec = median_sec if use_median else avg_sec
+    @staticmethod
+    def status_from_stats(stats: dict) -> Tuple[float, str]:
+        """
+        Pick the predicted duration and status from summarized stats.
 
-        predicted_arrival = start_time + timedelta(seconds=predicted_sec)
+        Returns: (predicted_seconds, status)
+        """
+        # Median is more robust with enough data
+        use_median = stats["count"] >= PredictionService.MIN_FOR_STATS
+        predicted_sec = stats["median_sec"] if use_median else stats["avg_sec"]
 
-        # Status logic
         status = "on_time"
-
         if use_median:
-            p75 = sorted_sec[int(count * 0.75)]
-            if predicted_sec > p75 * 1.25:
+            if predicted_sec > stats["p75_sec"] * 1.25:
                 status = "delayed"
-            elif predicted_sec < avg_sec * 0.75:
+            elif predicted_sec < stats["avg_sec"] * 0.75:
                 status = "early"
         else:
             if predicted_sec > PredictionService.HIGH_THRESHOLD_MINUTES * 60:
                 status = "delayed"
 
-        # Log result
-        logger.info(
-            f"[PREDICTION] {source} | "
-            f"{count} journeys | "
-            f"ETA +{predicted_sec/60:.1f} min | "
-            f"status: {status}"
-        )
-        return predicted_arrival, status
\ No newline at end of file
+        return predicted_sec, status
+
+    @staticmethod
+    def _official_duration(route_id: str, start_stop_id: str | None = None, end_stop_id: str | None = None) -> float | None:
+        """
+        Median official trip duration from the catalog snapshot, if one is loaded.
+        With both stops given it is scaled to their share of the route's compiled length.
+        """
+        catalog = get_catalog()
+        if catalog is None:
+            return None
+        trips = catalog.trips(route_id)
+        if not trips:
+            return None
+        minutes = sorted(end - start for start, end in trips)
+        duration = minutes[len(minutes) // 2] * 60.0
+        if start_stop_id and end_stop_id:
+            fraction = catalog.segment_fraction(route_id, start_stop_id, end_stop_id)
+            if fraction:
+                duration *= fraction
+        return duration
@@ -0,0 +1,323 @@
+"""
+Route reliability rollups.
+
+Each completed journey is added once to an hourly and a daily row for its
+route (`route_reliability`): counts, sums and a fixed-bucket delay histogram.
+All of them merge by addition, so any time range is answered by adding up a
+handful of rows:
+    - whole local days inside the range from daily rows
+    - the partial days at either end from hourly rows
+    - "at 8am" questions from hourly rows with local_hour == 8
+
+Delay is how late the bus turned up: start_time (ARRIVED) minus the rider's
+planned start. Medians and percentiles are read off the histogram,
+interpolating inside a bucket, which is close enough for reliability figures
+and keeps the state a fixed size.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.models.Reliability import RouteReliability
+from app.schemas.journey import JourneyEventType
+from app.Services.Archive import archive
+from app.Services.Prediction.data_quality import EXCLUDED_FLAGS, usable_for_stats
+from app.utils.dates import naive_utc
+from app.utils.timetable import timetable_zone
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+# Upper bucket edges in seconds; the last bucket is open ended
+DELAY_BUCKETS = (-300, -120, -60, 0, 60, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 2700, 3600)
+# Lower bound used when interpolating inside the first bucket / upper for the last
+DELAY_FLOOR = -600
+DELAY_CEILING = 5400
+
+ON_TIME_SECONDS = 300
+GRANULARITIES = ("hour", "day")
+
+# What journey_metrics reads from an archived row
+ARCHIVE_COLUMNS = (
+    "id", "status", "data_source", "is_synthetic", "quality_flag",
+    "planned_start_time", "start_time", "end_time", "created_at",
+)
+
+
+def _bucket(delay_sec: float) -> int:
+    for i, edge in enumerate(DELAY_BUCKETS):
+        if delay_sec < edge:
+            return i
+    return len(DELAY_BUCKETS)
+
+
+def _slots(moment: datetime) -> dict:
+    """{granularity: (slot_start naive UTC, local_hour)} for a UTC moment."""
+    local = moment.replace(tzinfo=timezone.utc).astimezone(timetable_zone())
+    hour = local.replace(minute=0, second=0, microsecond=0)
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "hour": (naive_utc(hour), local.hour),
+        "day": (naive_utc(day), None),
+    }
+
+
+def _moment(journey):
+    """The time a journey is bucketed (and a rebuild's `since` filtered) by."""
+    return journey.planned_start_time or journey.start_time or journey.created_at
+
+
+def _archived(row: dict) -> SimpleNamespace:
+    # Parts written before a column existed don't have it
+    return SimpleNamespace(**{name: row.get(name) for name in ARCHIVE_COLUMNS})
+
+
+def journey_metrics(journey: Journey) -> dict | None:
+    """What a completed journey adds to its rollup rows, None when it shouldn't count."""
+    if journey.status != JourneyEventType.EVENT_TYPE_STOP_REACHED:
+        return None
+    if journey.data_source != "user" or journey.is_synthetic or journey.quality_flag in EXCLUDED_FLAGS:
+        return None
+
+    moment = _moment(journey)
+    if moment is None:
+        return None
+
+    delay = None
+    if journey.start_time is not None and journey.planned_start_time is not None:
+        delay = (naive_utc(journey.start_time) - naive_utc(journey.planned_start_time)).total_seconds()
+
+    duration = None
+    if journey.start_time is not None and journey.end_time is not None:
+        duration = (naive_utc(journey.end_time) - naive_utc(journey.start_time)).total_seconds()
+
+    return {"moment": naive_utc(moment), "delay": delay, "duration": duration}
+
+
+def _add(row: RouteReliability, metrics: dict) -> None:
+    row.journeys = (row.journeys or 0) + 1
+    delay = metrics["delay"]
+    if delay is not None:
+        row.delay_count = (row.delay_count or 0) + 1
+        row.on_time = (row.on_time or 0) + (1 if delay <= ON_TIME_SECONDS else 0)
+        row.delay_sum = (row.delay_sum or 0.0) + delay
+        row.delay_sq_sum = (row.delay_sq_sum or 0.0) + delay * delay
+        histogram = list(row.delay_histogram or [0] * (len(DELAY_BUCKETS) + 1))
+        histogram[_bucket(delay)] += 1
+        row.delay_histogram = histogram  # New list so the JSON column is marked dirty
+    if metrics["duration"] is not None:
+        row.duration_count = (row.duration_count or 0) + 1
+        row.duration_sum = (row.duration_sum or 0.0) + metrics["duration"]
+
+
+def _row(db: Session, route_id: str, granularity: str, slot_start: datetime, local_hour: int | None) -> RouteReliability:
+    row = (
+        db.query(RouteReliability)
+        .filter(
+            RouteReliability.route_id == route_id,
+            RouteReliability.granularity == granularity,
+            RouteReliability.slot_start == slot_start,
+        )
+        .with_for_update()
+        .first()
+    )
+    if row is None:
+        row = RouteReliability(
+            route_id=route_id, granularity=granularity, slot_start=slot_start, local_hour=local_hour,
+            journeys=0, delay_count=0, on_time=0, delay_sum=0.0, delay_sq_sum=0.0,
+            duration_count=0, duration_sum=0.0, delay_histogram=[0] * (len(DELAY_BUCKETS) + 1),
+        )
+        db.add(row)
+    return row
+
+
+def _percentile(histogram: list[int], total: int, q: float) -> float | None:
+    if not total:
+        return None
+    target = q * total
+    seen = 0
+    for i, count in enumerate(histogram):
+        if count and seen + count >= target:
+            low = DELAY_BUCKETS[i - 1] if i > 0 else DELAY_FLOOR
+            high = DELAY_BUCKETS[i] if i < len(DELAY_BUCKETS) else DELAY_CEILING
+            return low + (high - low) * (target - seen) / count
+        seen += count
+    return float(DELAY_CEILING)
+
+
+class ReliabilityRollup:
+
+    @staticmethod
+    def record(db: Session, journey: Journey) -> bool:
+        """
+        Add a completed journey to its rollup rows and commit. Runs after the journey
+        itself is committed, so a failure here never loses the journey. Returns whether it counted.
+        """
+        metrics = journey_metrics(journey)
+        if metrics is None:
+            return False
+
+        for attempt in range(2):
+            try:
+                for granularity, (slot_start, local_hour) in _slots(metrics["moment"]).items():
+                    _add(_row(db, journey.route_id, granularity, slot_start, local_hour), metrics)
+                db.commit()
+                return True
+            except IntegrityError:
+                # Another worker created the same slot row first; retry as an update
+                db.rollback()
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"[RELIABILITY] could not record journey {journey.id}: {e}")
+                return False
+        logger.warning(f"[RELIABILITY] gave up recording journey {journey.id}")
+        return False
+
+    @staticmethod
+    def rebuild(db: Session, since: datetime | None = None, root: str | None = None) -> int:
+        """
+        Recompute rollups from the journey archive and the journeys table (backfill
+        or repair). Returns journeys counted.
+        """
+        rollup_query = db.query(RouteReliability)
+        journey_query = db.query(Journey).filter(
+            Journey.status == JourneyEventType.EVENT_TYPE_STOP_REACHED,
+            Journey.data_source == "user",
+            usable_for_stats(),
+        )
+        if since is not None:
+            since = naive_utc(since)
+            # Whole local days, so the daily rows are rebuilt complete
+            since = _slots(since)["day"][0]
+            rollup_query = rollup_query.filter(RouteReliability.slot_start >= since)
+            # Same time the rows are bucketed by, so nothing deleted above is left out
+            journey_query = journey_query.filter(
+                func.coalesce(Journey.planned_start_time, Journey.start_time, Journey.created_at) >= since
+            )
+        rollup_query.delete(synchronize_session=False)
+
+        rows: dict[tuple, RouteReliability] = {}
+        counted = 0
+
+        def add(route_id: str, metrics: dict | None) -> bool:
+            nonlocal counted
+            if metrics is None or (since is not None and metrics["moment"] < since):
+                return False
+            for granularity, (slot_start, local_hour) in _slots(metrics["moment"]).items():
+                key = (route_id, granularity, slot_start)
+                row = rows.get(key)
+                if row is None:
+                    row = rows[key] = RouteReliability(
+                        route_id=route_id, granularity=granularity,
+                        slot_start=slot_start, local_hour=local_hour,
+                    )
+                _add(row, metrics)
+            counted += 1
+            return True
+
+        # Archived history first. A journey ends after its planned start, so the
+        # archive's end_time filter only prunes journeys that fall before `since`.
+        archived_ids = set()
+        archive_since = since.replace(tzinfo=timezone.utc) if since is not None else None
+        for row in archive.scan(since=archive_since, columns=ARCHIVE_COLUMNS, root=root):
+            if add(row["route_id"], journey_metrics(_archived(row))):
+                archived_ids.add(row["id"])
+
+        for journey in journey_query.yield_per(1000):
+            # An interrupted archive run can leave a journey in both places
+            if journey.id not in archived_ids:
+                add(journey.route_id, journey_metrics(journey))
+
+        db.add_all(rows.values())
+        db.commit()
+        logger.info(
+            f"[RELIABILITY] rebuilt {len(rows):,} rollup rows from {counted:,} journeys "
+            f"({len(archived_ids):,} archived)"
+        )
+        return counted
+
+    @staticmethod
+    def query(db: Session, route_id: str, start: datetime, end: datetime, hour: int | None = None) -> dict:
+        """Merge rollup rows covering [start, end), optionally only one local hour of the day."""
+        start, end = naive_utc(start), naive_utc(end)
+
+        if hour is not None:
+            rows = db.query(RouteReliability).filter(
+                RouteReliability.route_id == route_id,
+                RouteReliability.granularity == "hour",
+                RouteReliability.local_hour == hour,
+                RouteReliability.slot_start >= start,
+                RouteReliability.slot_start < end,
+            ).all()
+        else:
+            # Whole local days inside the range come from daily rows, the ends from hourly rows
+            first_day = _slots(start)["day"][0]
+            if first_day < start:
+                first_day = _slots(start + timedelta(days=1))["day"][0]
+            last_day = _slots(end)["day"][0]
+            rows = []
+            if first_day < last_day:
+                rows += db.query(RouteReliability).filter(
+                    RouteReliability.route_id == route_id,
+                    RouteReliability.granularity == "day",
+                    RouteReliability.slot_start >= first_day,
+                    RouteReliability.slot_start < last_day,
+                ).all()
+                edges = [(start, first_day), (last_day, end)]
+            else:
+                edges = [(start, end)]
+            for edge_start, edge_end in edges:
+                if edge_start < edge_end:
+                    rows += db.query(RouteReliability).filter(
+                        RouteReliability.route_id == route_id,
+                        RouteReliability.granularity == "hour",
+                        RouteReliability.slot_start >= edge_start,
+                        RouteReliability.slot_start < edge_end,
+                    ).all()
+
+        return ReliabilityRollup.summarize(rows)
+
+    @staticmethod
+    def summarize(rows: list[RouteReliability]) -> dict:
+        histogram = [0] * (len(DELAY_BUCKETS) + 1)
+        journeys = delay_count = on_time = duration_count = 0
+        delay_sum = delay_sq_sum = duration_sum = 0.0
+        for row in rows:
+            journeys += row.journeys or 0
+            delay_count += row.delay_count or 0
+            on_time += row.on_time or 0
+            delay_sum += row.delay_sum or 0.0
+            delay_sq_sum += row.delay_sq_sum or 0.0
+            duration_count += row.duration_count or 0
+            duration_sum += row.duration_sum or 0.0
+            for i, count in enumerate(row.delay_histogram or []):
+                histogram[i] += count
+
+        mean = delay_sum / delay_count if delay_count else None
+        stddev = None
+        if delay_count > 1:
+            stddev = math.sqrt(max(delay_sq_sum / delay_count - mean * mean, 0.0))
+        p25 = _percentile(histogram, delay_count, 0.25)
+        p75 = _percentile(histogram, delay_count, 0.75)
+
+        def minutes(value):
+            return None if value is None else round(value / 60, 1)
+
+        return {
+            "journeys": journeys,
+            "journeys_with_delay": delay_count,
+            "on_time_pct": round(100 * on_time / delay_count, 1) if delay_count else None,
+            "mean_delay_minutes": minutes(mean),
+            "median_delay_minutes": minutes(_percentile(histogram, delay_count, 0.5)),
+            "p90_delay_minutes": minutes(_percentile(histogram, delay_count, 0.9)),
+            "delay_stddev_minutes": minutes(stddev),
+            "delay_iqr_minutes": minutes(p75 - p25) if p25 is not None else None,
+            "avg_duration_minutes": minutes(duration_sum / duration_count) if duration_count else None,
+            "rows_merged": len(rows),
+        }
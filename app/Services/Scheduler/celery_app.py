@@ -0,0 +1,39 @@
+"""
+Worker mode: the scheduler jobs as Celery tasks with a beat schedule.
+
+    SCHEDULER_MODE=worker celery -A app.Services.Scheduler.celery_app worker --beat
+
+CELERY_BROKER_URL defaults to the in-memory broker, which runs tasks eagerly in
+the calling process. That is the stand-in used for local runs and tests; set a
+real broker (e.g. redis://) for deployments.
+"""
+
+import os
+
+from celery import Celery
+
+from app.Services.Scheduler.scheduler import JOBS, run_job
+
+broker_url = os.getenv("CELERY_BROKER_URL", "memory://")
+
+celery_app = Celery("bus_tracker", broker=broker_url)
+celery_app.conf.update(
+    task_always_eager=broker_url.startswith("memory://"),
+    task_ignore_result=True,
+    timezone="UTC",
+    # Process-local jobs refresh in-memory state and stay in the API processes
+    beat_schedule={
+        name: {"task": f"scheduler.{name}", "schedule": job.interval}
+        for name, job in JOBS.items() if not job.process_local
+    },
+)
+
+
+def _register(name: str):
+    @celery_app.task(name=f"scheduler.{name}")
+    def task():
+        return run_job(name)
+    return task
+
+
+tasks = {name: _register(name) for name, job in JOBS.items() if not job.process_local}
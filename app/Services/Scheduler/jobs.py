@@ -0,0 +1,117 @@
+"""
+Periodic jobs. Each job opens its own session, so it can run in the API
+process (local mode) or in a Celery worker (worker mode) unchanged.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; jobs then run without the host lock
+    fcntl = None
+
+from app.models.Database import SessionLocal, init_engine
+from app.Services.Archive.archive import JourneyArchiver
+from app.Services.Catalog import snapshot
+from app.Services.Catalog.builder import DEFAULT_CIF_PATH, rebuild_snapshot
+from app.Services.journeyService.active_store import active_store
+from app.Services.Prediction.cache import get_prediction_cache
+from app.Services.Shared.shared_tables import get_shared_reader
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+
+@contextmanager
+def _session():
+    init_engine()
+    db = SessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+@contextmanager
+def _exclusive(name: str):
+    """
+    Host-wide lock so several workers in local mode don't run the same job at once.
+    Yields False when another process holds it. Without fcntl there is no host
+    lock and it always yields True.
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    path = os.path.join(os.getenv("SCHEDULER_LOCK_DIR", "/tmp"), f"bus-tracker-{name}.lock")
+    with open(path, "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _cif_path() -> str:
+    return os.getenv("CIF_PATH", DEFAULT_CIF_PATH)
+
+
+def rebuild_prediction_stats() -> dict:
+    """Recompute per-route stats into a fresh catalog snapshot and drop cached predictions."""
+    with _exclusive("snapshot") as acquired:
+        if not acquired:
+            return {"skipped": "locked"}
+        with _session() as db:
+            path = rebuild_snapshot(db, cif_path=_cif_path())
+    snapshot.reload_catalog()
+    get_prediction_cache().clear()
+    return {"snapshot": path}
+
+
+def refresh_timetable() -> dict:
+    """Rebuild the snapshot when Metro.cif is newer than the loaded one."""
+    cif_path = _cif_path()
+    if not os.path.exists(cif_path):
+        return {"skipped": "no cif"}
+
+    catalog = snapshot.get_catalog()
+    if catalog is not None and os.path.getmtime(cif_path) <= catalog.created_at.timestamp():
+        return {"skipped": "unchanged"}
+    return rebuild_prediction_stats()
+
+
+def reload_catalog() -> dict:
+    """Pick up a snapshot another process rewrote. Cheap, runs in every API process."""
+    if get_shared_reader() is not None:
+        return {"reloaded": False, "shared": True}  # The coordinator publishes new catalogs
+    catalog = snapshot.get_catalog()
+    path = snapshot.snapshot_path()
+    if not os.path.exists(path):
+        return {"reloaded": False}
+    if catalog is not None and catalog.mtime is not None and os.path.getmtime(path) <= catalog.mtime:
+        return {"reloaded": False}
+    snapshot.reload_catalog()
+    get_prediction_cache().clear()
+    return {"reloaded": True}
+
+
+def expire_abandoned_journeys() -> dict:
+    with _session() as db:
+        return {"expired": active_store.expire_stale(db)}
+
+
+def archive_journeys() -> dict:
+    days = int(os.getenv("JOURNEY_ARCHIVE_AFTER_DAYS", "30"))
+    with _exclusive("archive") as acquired:
+        if not acquired:
+            return {"skipped": "locked"}
+        with _session() as db:
+            return {"archived": JourneyArchiver.archive_completed(db, older_than_days=days)}
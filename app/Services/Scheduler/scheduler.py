@@ -0,0 +1,186 @@
+"""
+Background job scheduler.
+
+SCHEDULER_MODE picks where periodic jobs run:
+    local   (default) inside the API process, on the event loop with each job
+            run in its own threadpool thread, so a long archive run doesn't
+            hold up catalog reloads. Meant for single-process deployments;
+            host locks stop duplicate archive/snapshot runs if several
+            workers share a machine.
+    worker  in Celery (see celery_app.py). The API process only keeps its
+            process-local jobs, like picking up a rebuilt catalog snapshot.
+    off     nothing runs.
+
+Every run is timed and recorded, see `stats()` / GET /internal/metrics. A job
+that comes due while its previous run is still going is skipped and counted.
+"""
+
+import asyncio
+import os
+import time
+from threading import Lock
+from typing import Callable
+
+from app.Services.Scheduler import jobs
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+
+class Job:
+    def __init__(self, name: str, func: Callable[[], dict], interval_env: str, default_interval: float, process_local: bool = False):
+        self.name = name
+        self.func = func
+        self.interval_env = interval_env
+        self.default_interval = default_interval
+        # Process-local jobs touch in-memory state and run in every API process
+        self.process_local = process_local
+
+    @property
+    def interval(self) -> float:
+        return float(os.getenv(self.interval_env, self.default_interval))
+
+
+class JobStats:
+    def __init__(self):
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.running = False
+        self.last_duration_ms = None
+        self.total_duration_ms = 0.0
+        self.last_run_at = None
+        self.last_result = None
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "running": self.running,
+            "last_duration_ms": self.last_duration_ms,
+            "avg_duration_ms": self.total_duration_ms / self.runs if self.runs else None,
+            "last_run_at": self.last_run_at,
+            "last_result": self.last_result,
+        }
+
+
+JOBS = {
+    job.name: job for job in (
+        Job("prediction_stats", jobs.rebuild_prediction_stats, "SCHEDULE_PREDICTION_STATS_SECONDS", 900),
+        Job("expire_abandoned", jobs.expire_abandoned_journeys, "ACTIVE_JOURNEY_EXPIRY_INTERVAL_SECONDS", 300),
+        Job("archive", jobs.archive_journeys, "SCHEDULE_ARCHIVE_SECONDS", 86400),
+        Job("timetable_refresh", jobs.refresh_timetable, "SCHEDULE_TIMETABLE_SECONDS", 3600),
+        Job("catalog_reload", jobs.reload_catalog, "SCHEDULE_CATALOG_RELOAD_SECONDS", 60, process_local=True),
+    )
+}
+
+_stats: dict[str, JobStats] = {name: JobStats() for name in JOBS}
+_stats_lock = Lock()
+
+
+def scheduler_mode() -> str:
+    return os.getenv("SCHEDULER_MODE", "local").lower()
+
+
+def run_job(name: str) -> dict | None:
+    """
+    Run one job now, timing it. Failures are logged and counted, never raised.
+    Skipped (returns None) if the same job is still running in this process.
+    """
+    job = JOBS[name]
+    stats = _stats[name]
+    with _stats_lock:
+        if stats.running:
+            stats.skipped += 1
+            logger.warning(f"[SCHEDULER] {name} skipped, previous run still going")
+            return None
+        stats.running = True
+
+    started = time.perf_counter()
+    result = None
+    try:
+        result = job.func()
+        stats.last_result = result
+    except Exception as e:
+        stats.failures += 1
+        stats.last_result = f"error: {e}"
+        logger.exception(f"[SCHEDULER] {name} failed")
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        stats.runs += 1
+        stats.last_duration_ms = duration_ms
+        stats.total_duration_ms += duration_ms
+        stats.last_run_at = time.time()
+        stats.running = False
+        logger.info(f"[SCHEDULER] {name} took {duration_ms:.0f} ms → {stats.last_result}")
+    return result
+
+
+def stats() -> dict:
+    return {
+        "mode": scheduler_mode(),
+        "jobs": {name: {"interval_seconds": JOBS[name].interval, **s.as_dict()} for name, s in _stats.items()},
+    }
+
+
+class LocalScheduler:
+    """
+    Starts due jobs from the event loop. Each run gets its own threadpool thread,
+    so one slow job never delays the others; a job still running when it
+    comes due again is skipped.
+    """
+
+    TICK_SECONDS = 1.0
+
+    def __init__(self, job_names: list[str]):
+        self.job_names = job_names
+        self._task: asyncio.Task | None = None
+        self._running: dict[str, asyncio.Task] = {}
+
+    def start(self) -> None:
+        if self.job_names:
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"[SCHEDULER] local scheduler running: {', '.join(self.job_names)}")
+
+    async def stop(self) -> None:
+        # Job threads can't be interrupted; they finish in the background
+        for task in [self._task, *self._running.values()]:
+            if task is not None:
+                task.cancel()
+        if self._task is not None:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        from starlette.concurrency import run_in_threadpool
+
+        # First run one interval after startup, so a restart storm doesn't pile up jobs
+        now = time.monotonic()
+        next_run = {name: now + JOBS[name].interval for name in self.job_names}
+        while True:
+            await asyncio.sleep(self.TICK_SECONDS)
+            for name in self.job_names:
+                if time.monotonic() < next_run[name]:
+                    continue
+                next_run[name] = time.monotonic() + JOBS[name].interval
+                running = self._running.get(name)
+                if running is not None and not running.done():
+                    with _stats_lock:
+                        _stats[name].skipped += 1
+                    logger.warning(f"[SCHEDULER] {name} skipped, previous run still going")
+                    continue
+                self._running[name] = asyncio.create_task(run_in_threadpool(run_job, name))
+
+
+def build_local_scheduler() -> LocalScheduler:
+    mode = scheduler_mode()
+    if mode == "off":
+        names = []
+    elif mode == "worker":
+        names = [name for name, job in JOBS.items() if job.process_local]
+    else:
+        names = list(JOBS)
+    return LocalScheduler(names)
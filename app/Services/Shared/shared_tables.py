@@ -0,0 +1,290 @@
+"""
+Shared-memory catalog and prediction tables for multi-worker deployments.
+
+One coordinator process (app/Scripts/shared_coordinator.py) publishes into
+POSIX shared memory (multiprocessing.shared_memory):
+    <name>-cat-<gen>   the catalog snapshot bytes, exactly as written by the builder
+    <name>-pred-<gen>  per-route predicted (seconds, status), aligned with the
+                       catalog's routes section
+    <name>-ctl         current generations and sizes of both, behind a seqlock
+
+Workers with SHARED_TABLES_NAME set map the segments read-only. A read checks
+the control block's sequence number and only remaps when a generation changes,
+so there is no lock between the coordinator and any worker and the tables live
+in memory once however many workers there are. Every worker serves the same
+predictions for a route until the next publish.
+
+Segments are published whole and never modified afterwards. Superseded ones
+are unlinked after a grace period; a worker still mapping one keeps a valid
+view until it moves on.
+"""
+
+import mmap
+import os
+import struct
+import time
+from threading import Lock
+
+from app.Services.Catalog.snapshot import CatalogSnapshot
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+# magic, seq | catalog gen, size, source mtime | predictions gen, size, catalog gen | published_at
+CONTROL = struct.Struct("<8sQ QQd QQQ d")
+CONTROL_MAGIC = b"BTSHM001"
+
+PRED_HEADER = struct.Struct("<8sQQdI")
+PRED_MAGIC = b"BTPRED01"
+PRED_ENTRY = struct.Struct("<fI")
+STATUSES = ("", "unknown", "on_time", "delayed", "early")
+
+SHM_DIR = "/dev/shm"
+
+
+def _segment_name(name: str, kind: str, generation: int | None = None) -> str:
+    return f"{name}-{kind}" if generation is None else f"{name}-{kind}-{generation}"
+
+
+def _map_segment(segment: str):
+    """Read-only mmap of a published segment. Linux exposes POSIX shm under /dev/shm."""
+    with open(os.path.join(SHM_DIR, segment), "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def pack_predictions(catalog: CatalogSnapshot, predictions: dict, generation: int, catalog_generation: int) -> bytes:
+    """predictions: {route_id: (seconds, status)}. Routes without one are left empty."""
+    route_ids = catalog.route_ids()
+    entries = [(0.0, 0)] * len(route_ids)
+    for route_id, (seconds, status) in predictions.items():
+        position = catalog.route_position(route_id)
+        if position is not None and status in STATUSES:
+            entries[position] = (seconds, STATUSES.index(status))
+
+    out = bytearray(PRED_HEADER.pack(PRED_MAGIC, generation, catalog_generation, time.time(), len(entries)))
+    for seconds, status in entries:
+        out += PRED_ENTRY.pack(seconds, status)
+    return bytes(out)
+
+
+class SharedTablesPublisher:
+    """Coordinator side. Only one publisher per name may run."""
+
+    # Keep superseded segments this long so workers can finish a read on them
+    GRACE_SECONDS = 60.0
+
+    def __init__(self, name: str):
+        from multiprocessing import shared_memory  # Coordinator only, keeps it off the worker import path
+
+        self._shm = shared_memory
+        self.name = name
+        self._segments: dict = {}
+        self._control = self._create_segment(_segment_name(name, "ctl"), CONTROL.size)
+        self._retired: list[tuple[float, str]] = []
+        self._state = [0, 0, 0.0, 0, 0, 0]
+        self._seq = 0
+        self._write_control()
+
+    def _write_control(self) -> None:
+        # Seqlock: odd while fields are being written, readers retry until it is even and unchanged
+        self._seq += 1
+        struct.pack_into("<8sQ", self._control.buf, 0, CONTROL_MAGIC, self._seq)
+        struct.pack_into("<QQdQQQd", self._control.buf, 16, *self._state, time.time())
+        self._seq += 1
+        struct.pack_into("<Q", self._control.buf, 8, self._seq)
+
+    def _create_segment(self, segment: str, size: int):
+        try:
+            return self._shm.SharedMemory(segment, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a coordinator that didn't shut down cleanly
+            stale = self._shm.SharedMemory(segment)
+            stale.close()
+            stale.unlink()
+            logger.warning(f"[SHARED] removed stale segment {segment}")
+            return self._shm.SharedMemory(segment, create=True, size=size)
+
+    def _create(self, kind: str, generation: int, data: bytes) -> None:
+        segment = _segment_name(self.name, kind, generation)
+        shm = self._create_segment(segment, max(len(data), 1))
+        shm.buf[:len(data)] = data
+        self._segments[segment] = shm
+
+    def _retire(self, kind: str, generation: int) -> None:
+        if generation:
+            self._retired.append((time.monotonic() + self.GRACE_SECONDS, _segment_name(self.name, kind, generation)))
+
+    def publish_catalog(self, data: bytes, source_mtime: float) -> int:
+        CatalogSnapshot(data)  # Validate before anyone can map it
+        previous = self._state[0]
+        generation = previous + 1
+        self._create("cat", generation, data)
+        self._state[0:3] = [generation, len(data), source_mtime]
+        self._write_control()
+        self._retire("cat", previous)
+        logger.info(f"[SHARED] catalog generation {generation} published ({len(data):,} bytes)")
+        return generation
+
+    def publish_predictions(self, data: bytes) -> int:
+        previous = self._state[3]
+        generation = previous + 1
+        _, _, catalog_generation, _, _ = PRED_HEADER.unpack_from(data, 0)
+        self._create("pred", generation, data)
+        self._state[3:6] = [generation, len(data), catalog_generation]
+        self._write_control()
+        self._retire("pred", previous)
+        return generation
+
+    @property
+    def catalog_generation(self) -> int:
+        return self._state[0]
+
+    def next_predictions_generation(self) -> int:
+        return self._state[3] + 1
+
+    def collect(self) -> int:
+        """Unlink superseded segments past their grace period."""
+        now = time.monotonic()
+        due = [segment for expires, segment in self._retired if expires <= now]
+        self._retired = [(expires, segment) for expires, segment in self._retired if expires > now]
+        for segment in due:
+            shm = self._segments.pop(segment, None)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        return len(due)
+
+    def close(self) -> None:
+        for shm in list(self._segments.values()) + [self._control]:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        self._segments.clear()
+
+
+class SharedTablesReader:
+    """Worker side. Reads are lock-free; only remapping after a publish takes a lock."""
+
+    MAX_RETRIES = 100
+    # How often to check the control segment is still the live one (coordinator restarts)
+    RECHECK_SECONDS = 5.0
+
+    def __init__(self, name: str):
+        self.name = name
+        self._control = None
+        self._control_inode = None
+        self._checked_at = 0.0
+        # (generation, CatalogSnapshot) and (catalog generation, generation, view), swapped whole
+        self._catalog = (0, None)
+        self._predictions = (0, 0, None)
+        self._remap_lock = Lock()
+        self.remaps = 0
+
+    def _attach_control(self) -> bool:
+        path = os.path.join(SHM_DIR, _segment_name(self.name, "ctl"))
+        now = time.monotonic()
+        if self._control is not None and now - self._checked_at < self.RECHECK_SECONDS:
+            return True
+        self._checked_at = now
+        try:
+            inode = os.stat(path).st_ino
+            if self._control is None or inode != self._control_inode:
+                self._control = _map_segment(_segment_name(self.name, "ctl"))
+                self._control_inode = inode
+                # A new coordinator numbers generations from 1 again
+                self._catalog = (0, None)
+                self._predictions = (0, 0, None)
+        except FileNotFoundError:
+            self._control = None  # Coordinator not started yet, or stopped
+        return self._control is not None
+
+    def _read_control(self) -> tuple | None:
+        if not self._attach_control():
+            return None
+
+        control = self._control
+        for _ in range(self.MAX_RETRIES):
+            magic, seq_before = struct.unpack_from("<8sQ", control, 0)
+            if magic != CONTROL_MAGIC:
+                return None
+            if seq_before % 2:
+                continue
+            fields = struct.unpack_from("<QQdQQQd", control, 16)
+            if struct.unpack_from("<Q", control, 8)[0] == seq_before:
+                return fields
+        return None
+
+    def catalog(self) -> CatalogSnapshot | None:
+        state = self._read_control()
+        if state is None or state[0] == 0:
+            return None
+        if state[0] != self._catalog[0]:
+            self._remap(state)
+        return self._catalog[1]
+
+    def prediction(self, route_id: str) -> tuple[float, str] | None:
+        """Published (seconds, status) for a route, None if there is none for the current catalog."""
+        state = self._read_control()
+        if state is None or state[3] == 0 or state[5] != state[0]:
+            return None
+        if state[0] != self._catalog[0] or state[3] != self._predictions[1]:
+            self._remap(state)
+
+        catalog_gen, catalog = self._catalog
+        pred_catalog_gen, _, predictions = self._predictions
+        if catalog is None or predictions is None or pred_catalog_gen != catalog_gen:
+            return None
+        position = catalog.route_position(route_id)
+        if position is None:
+            return None
+        seconds, status = PRED_ENTRY.unpack_from(predictions, PRED_HEADER.size + position * PRED_ENTRY.size)
+        if status == 0:
+            return None
+        return float(seconds), STATUSES[status]
+
+    def _remap(self, state: tuple) -> None:
+        catalog_gen, catalog_size, source_mtime, pred_gen, pred_size, pred_catalog_gen, _ = state
+        with self._remap_lock:
+            try:
+                if catalog_gen != self._catalog[0]:
+                    buf = memoryview(_map_segment(_segment_name(self.name, "cat", catalog_gen)))[:catalog_size]
+                    catalog = CatalogSnapshot(buf, source=f"shm:{self.name}#{catalog_gen}", mtime=source_mtime)
+                    self._catalog = (catalog_gen, catalog)
+                if pred_gen and pred_gen != self._predictions[1]:
+                    view = memoryview(_map_segment(_segment_name(self.name, "pred", pred_gen)))[:pred_size]
+                    self._predictions = (pred_catalog_gen, pred_gen, view)
+                self.remaps += 1
+            except FileNotFoundError:
+                # Published and retired between our control read and the map; next read catches up
+                pass
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "attached": self._control is not None,
+            "catalog_generation": self._catalog[0],
+            "predictions_generation": self._predictions[1],
+            "remaps": self.remaps,
+        }
+
+
+_reader = None
+_reader_loaded = False
+_reader_lock = Lock()
+
+
+def get_shared_reader() -> SharedTablesReader | None:
+    """None unless SHARED_TABLES_NAME is set."""
+    global _reader, _reader_loaded
+
+    if _reader_loaded:
+        return _reader
+
+    with _reader_lock:
+        if not _reader_loaded:
+            name = os.getenv("SHARED_TABLES_NAME")
+            _reader = SharedTablesReader(name) if name else None
+            _reader_loaded = True
+    return _reader
@@ -0,0 +1,199 @@
+"""
+Synthetic journeys for seeding and scale testing.
+
+Journeys are drawn from each route's official CIF trips in the catalog
+snapshot: pick a day and an official departure, then perturb it
+    - start delay:  the bus turns up late, N(START_DELAY_MEAN, START_DELAY_SD) seconds,
+                    plus an exponential incident delay on `delay_rate` of journeys
+    - duration:     the official trip time x (1 + rush_factor in weekday rush hours)
+                    x a lognormal noise factor with sigma `noise`
+so route stats come out with a realistic centre, spread and tail.
+
+Rows are built a batch at a time, column by column, and bulk-loaded: COPY on
+PostgreSQL with psycopg2, a Core executemany elsewhere. Everything is
+`is_synthetic` with quality flag "synthetic", so it can feed prediction stats
+but never becomes a quality baseline, and `clear()` removes it again.
+"""
+
+import csv
+import io
+import math
+import random
+import uuid
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Iterator
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey
+from app.schemas.journey import JourneyEventType
+from app.Services.Catalog.snapshot import CatalogSnapshot
+from app.Services.Prediction.data_quality import FLAG_SYNTHETIC
+from app.utils.timetable import timetable_zone
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+# Local hours [start, end) that get the rush_factor on weekdays
+RUSH_HOURS = ((7, 9), (16, 18))
+START_DELAY_MEAN = 60.0
+START_DELAY_SD = 90.0
+EARLIEST_START_SECONDS = -120.0
+# Riders start tracking a few minutes before the planned departure
+MAX_LEAD_SECONDS = 600
+
+BATCH_ROWS = 20_000
+DELETE_BATCH = 10_000
+
+COLUMNS = (
+    "id", "route_id", "start_stop_id", "end_stop_id", "planned_start_time", "start_time",
+    "end_time", "status", "created_at", "official_start_time", "official_end_time",
+    "predicted_status", "predicted_arrival", "data_source", "is_synthetic", "quality_flag",
+)
+
+
+class SyntheticJourneyGenerator:
+
+    def __init__(
+        self,
+        catalog: CatalogSnapshot,
+        days: int = 90,
+        end: date | None = None,
+        user_share: float = 0.0,
+        noise: float = 0.12,
+        rush_factor: float = 0.25,
+        delay_rate: float = 0.08,
+        delay_mean_seconds: float = 480.0,
+        seed: int | None = None,
+    ):
+        self.catalog = catalog
+        self.days = days
+        self.end = end or datetime.now(timezone.utc).date()
+        self.user_share = user_share
+        self.noise = noise
+        self.rush_factor = rush_factor
+        self.delay_rate = delay_rate
+        self.delay_mean_seconds = delay_mean_seconds
+        self.rng = random.Random(seed)
+        self.zone = timetable_zone()
+
+    def usable(self, route_id: str) -> bool:
+        """Journeys need official trips to draw from and two stops to run between."""
+        return bool(self.catalog.trips(route_id)) and len(self.catalog.route_stop_indexes(route_id)) >= 2
+
+    def routes(self) -> list[str]:
+        """Routes with official trips and at least two stops."""
+        return [route_id for route_id in self.catalog.route_ids() if self.usable(route_id)]
+
+    def _day_starts(self) -> list[tuple[datetime, bool]]:
+        """(local midnight, is weekday) for each day in the range."""
+        first = self.end - timedelta(days=self.days)
+        return [
+            (datetime.combine(first + timedelta(days=i), time(), tzinfo=self.zone), (first + timedelta(days=i)).weekday() < 5)
+            for i in range(self.days)
+        ]
+
+    def _departure(self, day: tuple[datetime, bool], offset: int, duration: float, rush: bool) -> tuple:
+        midnight, weekday = day
+        official_start = (midnight + timedelta(seconds=offset)).astimezone(timezone.utc)
+        # The timetable's arrival is what a journey with no history gets predicted
+        official_end = official_start + timedelta(seconds=duration)
+        planned = official_start.replace(tzinfo=None)
+        return planned, official_start, official_end, 1.0 + self.rush_factor if weekday and rush else 1.0
+
+    def batches(self, route_id: str, count: int, batch_rows: int = BATCH_ROWS) -> Iterator[list[tuple]]:
+        """`count` journeys for a route as row tuples in COLUMNS order, batch_rows at a time."""
+        trips = self.catalog.trips(route_id)
+        stops = self.catalog.route_stops(route_id)
+        start_stop, end_stop = stops[0]["id"], stops[-1]["id"]
+        days = self._day_starts()
+        rng = self.rng
+        # Seconds past local midnight and official duration per trip, and whether it leaves in rush hour
+        trip_offsets = [start * 60 for start, _ in trips]
+        trip_durations = [(end - start) * 60.0 for start, end in trips]
+        trip_rush = [any(low * 60 <= start % 1440 < high * 60 for low, high in RUSH_HOURS) for start, _ in trips]
+        # (day, trip) -> (planned naive UTC, official start, official end, duration multiplier)
+        departures: dict[tuple[int, int], tuple] = {}
+
+        done = 0
+        while done < count:
+            n = min(batch_rows, count - done)
+
+            # One column at a time, each a single pass over n draws
+            day_idx = [rng.randrange(len(days)) for _ in range(n)]
+            trip_idx = [rng.randrange(len(trips)) for _ in range(n)]
+            noise = [math.exp(rng.gauss(0.0, self.noise)) for _ in range(n)]
+            delays = [max(rng.gauss(START_DELAY_MEAN, START_DELAY_SD), EARLIEST_START_SECONDS) for _ in range(n)]
+            incidents = [
+                rng.expovariate(1.0 / self.delay_mean_seconds) if rng.random() < self.delay_rate else 0.0
+                for _ in range(n)
+            ]
+            leads = [rng.randrange(MAX_LEAD_SECONDS) for _ in range(n)]
+            sources = ["user" if rng.random() < self.user_share else "official" for _ in range(n)]
+            ids = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(n)]
+
+            rows = []
+            for i in range(n):
+                d, t = day_idx[i], trip_idx[i]
+                departure = departures.get((d, t))
+                if departure is None:
+                    departure = departures[(d, t)] = self._departure(
+                        days[d], trip_offsets[t], trip_durations[t], trip_rush[t]
+                    )
+                planned, official_start, official_end, multiplier = departure
+                start = planned + timedelta(seconds=delays[i] + incidents[i])
+                rows.append((
+                    ids[i], route_id, start_stop, end_stop, planned, start,
+                    start + timedelta(seconds=trip_durations[t] * noise[i] * multiplier),
+                    JourneyEventType.EVENT_TYPE_STOP_REACHED,
+                    planned - timedelta(seconds=leads[i]), official_start, official_end,
+                    "on_time", official_end, sources[i], True, FLAG_SYNTHETIC,
+                ))
+            done += n
+            yield rows
+
+    @staticmethod
+    def load(db: Session, rows: list[tuple]) -> None:
+        """Bulk insert one batch and commit it."""
+        conn = db.connection()
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg2":
+            # Generated rows have no NULLs, so plain CSV is unambiguous
+            buffer = io.StringIO()
+            csv.writer(buffer).writerows(rows)
+            buffer.seek(0)
+            conn.connection.cursor().copy_expert(
+                f"COPY journeys ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer,
+            )
+        else:
+            conn.execute(insert(Journey.__table__), [dict(zip(COLUMNS, row)) for row in rows])
+        db.commit()
+
+    def generate(self, db: Session, per_route: int, route_ids: list[str] | None = None) -> int:
+        """Generate and load per_route journeys for each route. Returns rows loaded."""
+        route_ids = route_ids or self.routes()
+        total = 0
+        for route_id in route_ids:
+            if not self.usable(route_id):
+                logger.warning(f"[SYNTHETIC] {route_id} has no official trips or fewer than 2 stops, skipped")
+                continue
+            for rows in self.batches(route_id, per_route):
+                self.load(db, rows)
+                total += len(rows)
+            logger.info(f"[SYNTHETIC] {route_id}: {per_route:,} journeys")
+        return total
+
+    @staticmethod
+    def clear(db: Session, route_ids: list[str] | None = None) -> int:
+        """Delete synthetic journeys, in batches so the transaction stays small."""
+        deleted = 0
+        while True:
+            ids = db.query(Journey.id).filter(Journey.is_synthetic.is_(True))
+            if route_ids:
+                ids = ids.filter(Journey.route_id.in_(route_ids))
+            batch = [row.id for row in ids.limit(DELETE_BATCH)]
+            if not batch:
+                return deleted
+            db.execute(delete(Journey).where(Journey.id.in_(batch)))
+            db.commit()
+            deleted += len(batch)
@@ -0,0 +1,175 @@
+"""
+Active journey state store.
+
+Journeys in STARTED/ARRIVED/DELAYED live in the small `active_journeys` hot
+table (and a per-worker in-memory copy) instead of being found by status
+filters over the whole `journeys` table. Journeys with no event for longer
+than the TTL are expired into ABANDONED so the working set only holds
+journeys that are really in progress.
+
+The `journeys` row stays the source of truth: the in-memory records are a
+write-through cache and callers re-check `journey.status` after loading it.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+
+from sqlalchemy.orm import Session
+
+from app.models.Journey import Journey, ActiveJourney
+from app.schemas.journey import JourneyEventType
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+ACTIVE_STATUSES = frozenset({
+    JourneyEventType.EVENT_TYPE_STARTED,
+    JourneyEventType.EVENT_TYPE_DELAYED,
+    JourneyEventType.EVENT_TYPE_ARRIVED,
+})
+
+# event -> statuses it can be applied from
+TRANSITIONS = {
+    JourneyEventType.EVENT_TYPE_ARRIVED: {JourneyEventType.EVENT_TYPE_STARTED, JourneyEventType.EVENT_TYPE_DELAYED},
+    JourneyEventType.EVENT_TYPE_DELAYED: {JourneyEventType.EVENT_TYPE_STARTED},
+    JourneyEventType.EVENT_TYPE_STOP_REACHED: set(ACTIVE_STATUSES),
+    JourneyEventType.EVENT_TYPE_ABANDONED: set(ACTIVE_STATUSES),
+}
+
+EXPIRE_BATCH = 500
+
+
+class ActiveRecord:
+    __slots__ = ("journey_id", "route_id", "status", "last_event_at")
+
+    def __init__(self, journey_id: str, route_id: str, status: str, last_event_at: datetime):
+        self.journey_id = journey_id
+        self.route_id = route_id
+        self.status = status
+        self.last_event_at = last_event_at
+
+
+class ActiveJourneyStore:
+    DEFAULT_TTL_HOURS = 3.0
+
+    def __init__(self):
+        self._records: dict[str, ActiveRecord] = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def can_transition(current_status: str | None, event_type: str) -> bool:
+        return current_status in TRANSITIONS.get(event_type, ())
+
+    def add(self, db: Session, journey: Journey) -> None:
+        """Track a new journey. Joins the caller's transaction, caller commits."""
+        now = datetime.now(timezone.utc)
+        db.add(ActiveJourney(journey_id=journey.id, route_id=journey.route_id, status=journey.status, last_event_at=now))
+        with self._lock:
+            self._records[journey.id] = ActiveRecord(journey.id, journey.route_id, journey.status, now)
+
+    def apply(self, db: Session, journey: Journey) -> None:
+        """Mirror the journey's new status: touch it if still active, drop it if finished."""
+        if journey.status not in ACTIVE_STATUSES:
+            self.remove(db, journey.id)
+            return
+
+        now = datetime.now(timezone.utc)
+        updated = db.query(ActiveJourney).filter(ActiveJourney.journey_id == journey.id).update(
+            {ActiveJourney.status: journey.status, ActiveJourney.last_event_at: now},
+            synchronize_session=False,
+        )
+        if not updated:
+            db.add(ActiveJourney(journey_id=journey.id, route_id=journey.route_id, status=journey.status, last_event_at=now))
+        with self._lock:
+            self._records[journey.id] = ActiveRecord(journey.id, journey.route_id, journey.status, now)
+
+    def remove(self, db: Session, journey_id: str) -> None:
+        db.query(ActiveJourney).filter(ActiveJourney.journey_id == journey_id).delete(synchronize_session=False)
+        with self._lock:
+            self._records.pop(journey_id, None)
+
+    def peek(self, journey_id: str) -> ActiveRecord | None:
+        """This worker's in-memory record only, never touches the DB."""
+        return self._records.get(journey_id)
+
+    def get(self, db: Session, journey_id: str) -> ActiveRecord | None:
+        record = self._records.get(journey_id)
+        if record is not None:
+            return record
+
+        row = db.get(ActiveJourney, journey_id)
+        if row is None:
+            return None
+        last_event_at = row.last_event_at
+        if last_event_at.tzinfo is None:
+            last_event_at = last_event_at.replace(tzinfo=timezone.utc)
+        record = ActiveRecord(row.journey_id, row.route_id, row.status, last_event_at)
+        with self._lock:
+            self._records[journey_id] = record
+        return record
+
+    def expire_stale(self, db: Session, ttl_hours: float | None = None) -> int:
+        """Mark journeys with no events for `ttl_hours` as ABANDONED. Returns how many."""
+        ttl = ttl_hours if ttl_hours is not None else float(
+            os.getenv("ACTIVE_JOURNEY_TTL_HOURS", self.DEFAULT_TTL_HOURS)
+        )
+        now = datetime.now(timezone.utc)
+        cutoff = now - timedelta(hours=ttl)
+        expired = 0
+
+        while True:
+            stale_ids = [
+                row[0] for row in db.query(ActiveJourney.journey_id)
+                .filter(ActiveJourney.last_event_at < cutoff)
+                .limit(EXPIRE_BATCH)
+            ]
+            if not stale_ids:
+                break
+
+            db.query(Journey).filter(
+                Journey.id.in_(stale_ids),
+                Journey.status.in_(ACTIVE_STATUSES),
+            ).update(
+                {Journey.status: JourneyEventType.EVENT_TYPE_ABANDONED, Journey.end_time: now},
+                synchronize_session=False,
+            )
+            db.query(ActiveJourney).filter(ActiveJourney.journey_id.in_(stale_ids)).delete(synchronize_session=False)
+            db.commit()
+
+            with self._lock:
+                for journey_id in stale_ids:
+                    self._records.pop(journey_id, None)
+            expired += len(stale_ids)
+
+        # Records this worker holds that another worker already expired or completed
+        with self._lock:
+            for journey_id in [j for j, r in self._records.items() if r.last_event_at < cutoff]:
+                del self._records[journey_id]
+
+        if expired:
+            logger.info(f"[ACTIVE] Expired {expired} journeys idle for more than {ttl}h as ABANDONED")
+        return expired
+
+    def backfill(self, db: Session) -> int:
+        """One-off: add hot rows for active journeys created before the hot table existed."""
+        tracked = db.query(ActiveJourney.journey_id)
+        journeys = db.query(Journey).filter(
+            Journey.status.in_(ACTIVE_STATUSES),
+            Journey.id.not_in(tracked),
+        ).all()
+        for journey in journeys:
+            db.add(ActiveJourney(
+                journey_id=journey.id,
+                route_id=journey.route_id,
+                status=journey.status,
+                last_event_at=journey.start_time or journey.created_at,
+            ))
+        db.commit()
+        return len(journeys)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+active_store = ActiveJourneyStore()
@@ -10,22 +10,36 @@ from app.models.Journey import Journey
 from app.schemas.journey import JourneyEventType
 
 from app.Services.Prediction.prediction import PredictionService
+from app.Services.Prediction.cache import get_prediction_cache
+from app.Services.Prediction.data_quality import DurationQualityCheck, EXCLUDED_FLAGS
+from app.Services.Prediction.delay_tracker import get_delay_tracker
+from app.Services.journeyService.active_store import active_store
+from app.Services.Reliability.rollup import ReliabilityRollup
+from app.utils.dates import as_utc
 
 logger = logger.get_logger()
 
+# A DELAYED report counts as at least this late, even if sent right at the planned start
+REPORTED_DELAY_FLOOR_SECONDS = 120
+
+
+def _segment(journey: Journey) -> tuple | None:
+    if journey.start_stop_id and journey.end_stop_id:
+        return (journey.start_stop_id, journey.end_stop_id)
+    return None
+
 
 class JourneyEventHandler:
     @staticmethod
     def arrived(journey_id: UUID, db: Session) -> Journey:
         """Set user active journey status to arrived"""
-        allowed = {"STARTED", "DELAYED"}
         journey = db.get(Journey, str(journey_id))
 
         if not journey:
             logger.warning(f"Journey not found: {journey_id}")
             raise HTTPException(404, f"Journey {journey_id} not found")
 
-        if journey.status not in allowed:
+        if not active_store.can_transition(journey.status, JourneyEventType.EVENT_TYPE_ARRIVED):
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot mark as ARRIVED from status: {journey.status}"
@@ -33,42 +47,59 @@ class JourneyEventHandler:
         
         journey.start_time = datetime.now(timezone.utc)
         journey.status = JourneyEventType.EVENT_TYPE_ARRIVED
+        active_store.apply(db, journey)
         db.commit()
         db.refresh(journey)
+
+        # How long past the planned start the bus turned up
+        planned = as_utc(journey.planned_start_time)
+        if planned is not None:
+            get_delay_tracker().observe(
+                journey.route_id,
+                (as_utc(journey.start_time) - planned).total_seconds(),
+                segment=_segment(journey),
+            )
         return journey
     
 
     @staticmethod
     def delayed(journey_id: UUID, db: Session) -> Journey:
         """Set user active journey status to DELAYED"""
-        allowed = {JourneyEventType.EVENT_TYPE_STARTED}
         journey = db.get(Journey, str(journey_id))
         
         if not journey:
             raise HTTPException(404, f"Journey {journey_id} not found")
 
-        if journey.status not in allowed:
+        if not active_store.can_transition(journey.status, JourneyEventType.EVENT_TYPE_DELAYED):
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot mark as DELAYED from status: {journey.status}"
             )
 
         journey.status = JourneyEventType.EVENT_TYPE_DELAYED
+        active_store.apply(db, journey)
        
         db.commit()
         db.refresh(journey)
+
+        planned = as_utc(journey.planned_start_time or journey.created_at)
+        waited = (datetime.now(timezone.utc) - planned).total_seconds() if planned else 0.0
+        tracker = get_delay_tracker()
+        # A planned start far in the future is a bad client time, not a report to round up
+        if waited > -tracker.max_early:
+            waited = max(waited, REPORTED_DELAY_FLOOR_SECONDS)
+        tracker.observe(journey.route_id, waited, segment=_segment(journey))
         return journey
     
 
     @staticmethod
     def stop_reached(journey_id: UUID, db: Session) -> Journey:
-        allowed = {JourneyEventType.EVENT_TYPE_STARTED, JourneyEventType.EVENT_TYPE_DELAYED, JourneyEventType.EVENT_TYPE_ARRIVED}
         journey = db.get(Journey, str(journey_id))
 
         if not journey:
             raise HTTPException(404, f"Journey {journey_id} not found")
 
-        if journey.status not in allowed:
+        if not active_store.can_transition(journey.status, JourneyEventType.EVENT_TYPE_STOP_REACHED):
             raise HTTPException(
                 status_code=400,
                 detail=f"Cannot mark stop reached, journey is already finished ({journey.status})"
@@ -76,8 +107,24 @@ class JourneyEventHandler:
 
         journey.status = JourneyEventType.EVENT_TYPE_STOP_REACHED
         journey.end_time = datetime.now(timezone.utc)
+        active_store.apply(db, journey)
+        quality = DurationQualityCheck.apply(db, journey)
         db.commit()
         db.refresh(journey)
+
+        # New usable journey changes the route's stats
+        if quality not in EXCLUDED_FLAGS:
+            get_prediction_cache().invalidate_route(journey.route_id)
+            ReliabilityRollup.record(db, journey)
+
+            # How far off the prediction was feeds the live correction
+            predicted = as_utc(journey.predicted_arrival)
+            if predicted is not None:
+                get_delay_tracker().observe(
+                    journey.route_id,
+                    (as_utc(journey.end_time) - predicted).total_seconds(),
+                    segment=_segment(journey),
+                )
         return journey
  
     @staticmethod
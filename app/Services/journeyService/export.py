@@ -0,0 +1,168 @@
+"""
+Streaming export of journeys as NDJSON or CSV.
+
+Rows are read through a server-side cursor (stream_results / yield_per), so
+only one batch is held in memory however large the export is. Filters on the
+hot table are part of the SQL. Rows come out in table order, not sorted, so
+the database doesn't have to sort the whole range before the first row is
+sent. Journeys archived out of the hot table follow, read from the columnar
+archive one part file at a time and filtered the same way; any still in the
+hot table (an archive run between its write and delete) are skipped.
+"""
+
+import csv
+import io
+import os
+from itertools import chain
+from datetime import datetime, timezone
+from typing import Iterator
+
+from sqlalchemy import DateTime, select
+
+from app.models.Database import init_engine
+from app.models.Journey import Journey
+from app.Services.Archive import archive
+from app.utils.dates import naive_utc
+from app.utils.responses import dumps
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+COLUMNS = tuple(column.name for column in Journey.__table__.columns)
+# The archive gives every time back aware; these are naive in the table
+NAIVE_TIME_COLUMNS = frozenset(
+    column.name for column in Journey.__table__.columns
+    if isinstance(column.type, DateTime) and not column.type.timezone
+)
+
+
+def batch_size() -> int:
+    return int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+
+def _plain(value):
+    # ISO strings for datetimes in both formats (csv writes None as an empty field)
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+class JourneyExport:
+
+    @staticmethod
+    def statement(
+        route_id: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        data_source: str | None = None,
+    ):
+        """SELECT for the export. start/end filter on created_at, [start, end)."""
+        table = Journey.__table__
+        query = select(*table.columns)
+        if route_id is not None:
+            query = query.where(table.c.route_id == route_id)
+        if data_source is not None:
+            query = query.where(table.c.data_source == data_source)
+        if start is not None:
+            query = query.where(table.c.created_at >= naive_utc(start))
+        if end is not None:
+            query = query.where(table.c.created_at < naive_utc(end))
+        return query
+
+    @staticmethod
+    def batches(statement, size: int | None = None) -> Iterator[list]:
+        """Row batches from a server-side cursor on a connection of its own."""
+        size = size or batch_size()
+        with init_engine().connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=size).execute(statement)
+            for rows in result.partitions():
+                yield rows
+
+    @staticmethod
+    def archived_batches(
+        route_id: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        data_source: str | None = None,
+        size: int | None = None,
+        root: str | None = None,
+    ) -> Iterator[list]:
+        """Archived journeys matching the same filters, as row tuples in COLUMNS order."""
+        size = size or batch_size()
+        start, end = naive_utc(start), naive_utc(end)
+        # A journey ends after it is created, so end_time >= start prunes safely;
+        # `end` can't prune on end_time and is checked per row
+        since = start.replace(tzinfo=timezone.utc) if start is not None else None
+
+        batch = []
+        for row in archive.scan(route_id=route_id, since=since, root=root):
+            if data_source is not None and row.get("data_source") != data_source:
+                continue
+            created_at = naive_utc(row.get("created_at"))
+            if start is not None and (created_at is None or created_at < start):
+                continue
+            if end is not None and (created_at is None or created_at >= end):
+                continue
+            batch.append(tuple(
+                naive_utc(row.get(name)) if name in NAIVE_TIME_COLUMNS else row.get(name)
+                for name in COLUMNS
+            ))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    @staticmethod
+    def without_hot_rows(batches: Iterator[list]) -> Iterator[list]:
+        """
+        Drop archived rows whose id is still in the hot table (archived but not yet
+        deleted); they went out with the hot rows. One id lookup per batch, so
+        memory stays at a batch.
+        """
+        table = Journey.__table__
+        id_index = COLUMNS.index("id")
+        with init_engine().connect() as conn:
+            for rows in batches:
+                ids = [row[id_index] for row in rows]
+                hot = set(conn.execute(select(table.c.id).where(table.c.id.in_(ids))).scalars())
+                rows = [row for row in rows if row[id_index] not in hot]
+                if rows:
+                    yield rows
+
+    @staticmethod
+    def stream(fmt: str, statement, size: int | None = None, archived: dict | None = None) -> Iterator[bytes]:
+        """
+        Encoded chunks, one per batch, ready to be written or sent as they come.
+        `archived` holds the statement's filters to also export matching archived
+        journeys after the hot ones; None exports the hot table only.
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        batches = JourneyExport.batches(statement, size)
+        if archived is not None:
+            archived_rows = JourneyExport.archived_batches(size=size, **archived)
+            batches = chain(batches, JourneyExport.without_hot_rows(archived_rows))
+
+        exported = 0
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(COLUMNS)
+            yield buffer.getvalue().encode("utf-8")
+
+        for rows in batches:
+            if fmt == "ndjson":
+                yield b"".join(dumps({name: _plain(value) for name, value in zip(COLUMNS, row)}) + b"\n" for row in rows)
+            else:
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows([_plain(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode("utf-8")
+            exported += len(rows)
+
+        logger.info(f"[EXPORT] {exported:,} journeys exported as {fmt}")
@@ -0,0 +1,234 @@
+"""
+Idempotency keys for journey writes.
+
+Clients on flaky links retry POST /journeys/start and /journeys/{id}/event.
+When a request carries an `Idempotency-Key` header, its successful response is
+kept in a bounded, expiring store; a retry with the same key gets that
+response back without touching the database. A concurrent retry waits for the
+first request instead of running alongside it.
+
+Keys are scoped per client (token subject, or the internal key holder) and
+per endpoint (and journey for events), and bound to a hash of the request
+body, so two clients can pick the same key and reusing a key for a different
+payload is rejected.
+
+Responses are kept in process, or in Redis when IDEMPOTENCY_REDIS_URL (or the
+prediction cache's PREDICTION_CACHE_REDIS_URL) is set, so a retry landing on
+another worker is answered too. If Redis is unreachable the local store is used.
+"""
+
+import hashlib
+import json
+import os
+import time
+from threading import Event, Lock
+from typing import Any, Callable, Hashable
+
+from fastapi import HTTPException
+
+from app.utils.lazy import lazy_singleton
+from app.utils.ttl_cache import TTLCache
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+MAX_KEY_LENGTH = 255
+
+INTERNAL_CLIENT = "internal"
+
+
+def client_identity(claims: dict | None) -> str:
+    """Who a key belongs to: the token subject, or the internal key holder (claims None)."""
+    if claims is None:
+        return INTERNAL_CLIENT
+    subject = claims.get("sub")
+    if subject:
+        return f"sub:{subject}"
+    # Tokens without a subject scope keys to the token itself
+    return "claims:" + hashlib.sha256(json.dumps(claims, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RedisTier:
+    """Shared responses and in-progress markers, so every worker sees a key once it is used."""
+
+    # A marker outlives a crashed leader by at most this long
+    PENDING_SECONDS = 30.0
+    POLL_SECONDS = 0.05
+
+    def __init__(self, url: str, ttl: float):
+        import redis  # Only needed when the shared tier is configured
+
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2)
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(scope: Hashable) -> str:
+        raw = json.dumps(scope, default=str).encode("utf-8")
+        return "idempotency:" + hashlib.sha256(raw).hexdigest()
+
+    def get(self, scope: Hashable) -> dict | None:
+        raw = self._client.get(self._key(scope))
+        return json.loads(raw) if raw else None
+
+    def claim(self, scope: Hashable, fingerprint: str) -> bool:
+        """Mark the key in progress. False if another request got there first."""
+        record = json.dumps({"fingerprint": fingerprint, "done": False})
+        return bool(self._client.set(self._key(scope), record, nx=True, px=int(self.PENDING_SECONDS * 1000)))
+
+    def complete(self, scope: Hashable, fingerprint: str, response: Any) -> None:
+        record = json.dumps({"fingerprint": fingerprint, "done": True, "response": response})
+        self._client.set(self._key(scope), record, px=int(self.ttl * 1000))
+
+    def release(self, scope: Hashable) -> None:
+        self._client.delete(self._key(scope))
+
+
+class _SharedTierDown(Exception):
+    pass
+
+
+class _InFlight:
+    __slots__ = ("done", "fingerprint")
+
+    def __init__(self, fingerprint: str):
+        self.done = Event()
+        self.fingerprint = fingerprint
+
+
+class IdempotencyStore:
+    WAIT_SECONDS = 10.0
+
+    def __init__(self, ttl: float = 86400.0, maxsize: int = 50_000, shared: RedisTier | None = None):
+        self._responses = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: dict[Hashable, _InFlight] = {}
+        self._lock = Lock()
+        self.shared = shared
+        self.replays = 0
+        self.conflicts = 0
+        self.shared_errors = 0
+
+    @staticmethod
+    def fingerprint(payload: str | bytes) -> str:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def run(self, scope: Hashable, fingerprint: str, handler: Callable[[], Any]) -> tuple[Any, bool]:
+        """
+        Run `handler` once per scope. Returns (response, replayed).
+        Failed requests (exceptions) are not stored, so the client can retry them.
+        """
+        if self.shared is not None:
+            try:
+                return self._run_shared(scope, fingerprint, handler)
+            except _SharedTierDown:
+                pass  # Fall through to the local store
+        while True:
+            stored = self._responses.get(scope)
+            if stored is not None:
+                self._check(stored[0], fingerprint)
+                self.replays += 1
+                return stored[1], True
+
+            with self._lock:
+                flight = self._in_flight.get(scope)
+                leader = flight is None
+                if leader:
+                    flight = self._in_flight[scope] = _InFlight(fingerprint)
+
+            if leader:
+                break
+
+            self._check(flight.fingerprint, fingerprint)
+            if not flight.done.wait(self.WAIT_SECONDS):
+                raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+            # Loop: replay the stored response, or become leader if the first attempt failed
+
+        try:
+            response = handler()
+            self._responses.set(scope, (fingerprint, response))
+            return response, False
+        finally:
+            flight.done.set()
+            with self._lock:
+                self._in_flight.pop(scope, None)
+
+    def _run_shared(self, scope: Hashable, fingerprint: str, handler: Callable[[], Any]) -> tuple[Any, bool]:
+        deadline = time.monotonic() + self.WAIT_SECONDS
+        while True:
+            record = self._shared(self.shared.get, scope)
+            if record is not None:
+                self._check(record["fingerprint"], fingerprint)
+                if record["done"]:
+                    self.replays += 1
+                    return record["response"], True
+                if time.monotonic() >= deadline:
+                    raise HTTPException(409, "A request with this Idempotency-Key is still in progress")
+                time.sleep(self.shared.POLL_SECONDS)
+            elif self._shared(self.shared.claim, scope, fingerprint):
+                break
+            # Lost the claim race, or the leader failed: look again
+
+        try:
+            response = handler()
+        except BaseException:
+            self._shared_quietly(self.shared.release, scope)
+            raise
+        self._shared_quietly(self.shared.complete, scope, fingerprint, response)
+        return response, False
+
+    # The shared tier is best effort, like the prediction cache's: until a
+    # request is claimed a Redis failure falls back to the local store, after
+    # that it only costs the retry protection for this key
+    def _shared(self, operation: Callable, *args) -> Any:
+        try:
+            return operation(*args)
+        except Exception as e:
+            self.shared_errors += 1
+            logger.warning(f"Shared idempotency store unavailable: {e}")
+            raise _SharedTierDown() from e
+
+    def _shared_quietly(self, operation: Callable, *args) -> None:
+        try:
+            self._shared(operation, *args)
+        except _SharedTierDown:
+            pass
+
+    def _check(self, stored: str, fingerprint: str) -> None:
+        if stored != fingerprint:
+            self.conflicts += 1
+            raise HTTPException(422, "Idempotency-Key was already used with a different request body")
+
+    def stats(self) -> dict:
+        return {
+            **self._responses.stats(),
+            "replays": self.replays,
+            "conflicts": self.conflicts,
+            "in_flight": len(self._in_flight),
+            "shared_tier": self.shared is not None,
+            "shared_errors": self.shared_errors,
+        }
+
+
+def validate_key(key: str) -> str:
+    key = key.strip()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+    return key
+
+
+@lazy_singleton
+def get_idempotency_store() -> IdempotencyStore:
+    ttl = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+    shared = None
+    url = os.getenv("IDEMPOTENCY_REDIS_URL") or os.getenv("PREDICTION_CACHE_REDIS_URL")
+    if url:
+        try:
+            shared = RedisTier(url, ttl=ttl)
+        except ImportError:
+            logger.warning("A Redis URL is set but redis is not installed, idempotency keys stay per process")
+    return IdempotencyStore(
+        ttl=ttl,
+        maxsize=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "50000")),
+        shared=shared,
+    )
@@ -9,6 +9,10 @@ from app.models.Journey import Journey
 from app.schemas.journey import StartJourney, JourneyEventType
 
 from app.Services.Prediction.prediction import PredictionService
+from app.Services.Catalog.snapshot import get_catalog
+from app.Services.journeyService.active_store import active_store, ACTIVE_STATUSES
+from app.utils.dates import as_utc
+from app.utils.timetable import timetable_minute, timetable_span, timetable_zone
 #from app.utils.fetch_timetable_cif import get_official_timetable_for_route
 
 
@@ -32,14 +36,24 @@ class JourneyService:
 
         planned = data.planned_start_time or datetime.now(timezone.utc)
 
-        # Get official times. Fallback to empty string if None 
-        official_start = route.official_timetable.get('start_time') if route.official_timetable else ""
-        official_end   = route.official_timetable.get('end_time')   if route.official_timetable else ""
+        # Get official times. Fallback to the catalog snapshot trips, then none
+        start_min = timetable_minute(route.official_timetable.get('start_time')) if route.official_timetable else None
+        end_min   = timetable_minute(route.official_timetable.get('end_time'))   if route.official_timetable else None
+
+        catalog = get_catalog()
+        if start_min is None and catalog is not None:
+            # Trips are local wall-clock minutes
+            trip = catalog.closest_trip(data.route_id, as_utc(planned).astimezone(timetable_zone()))
+            if trip:
+                start_min, end_min = trip
+        official_start, official_end = timetable_span(planned, start_min, end_min)
 
         predicted_arrival, predicted_status = PredictionService.predict_journey(
             db=db,
             route_id=data.route_id,
-            start_time=datetime.now(timezone.utc)
+            start_time=datetime.now(timezone.utc),
+            start_stop_id=data.start_stop_id,
+            end_stop_id=data.end_stop_id,
         )
 
         journey = Journey(
@@ -52,33 +66,25 @@ class JourneyService:
             status=JourneyEventType.EVENT_TYPE_STARTED,
             created_at=datetime.now(timezone.utc),
             predicted_status=predicted_status,
-            predicted_arrival=predicted_arrival.strftime("%Y-%m-%d %H:%M:%S") if predicted_arrival else "",
+            predicted_arrival=predicted_arrival,
             official_start_time=official_start,   
             official_end_time=official_end,       
         )
 
         db.add(journey)
+        active_store.add(db, journey)
         db.commit()
         return journey
 
     @staticmethod
     def get_active_journey(journey_id: UUID, db: Session) -> Journey:
         """Retrieve an active (ongoing) journey by its internal UUID."""
-        journey = (
-            db.query(Journey)
-            .filter(
-                Journey.id == journey_id,           
-                Journey.status.in_([
-                    JourneyEventType.EVENT_TYPE_STARTED,
-                    JourneyEventType.EVENT_TYPE_DELAYED,
-                    JourneyEventType.EVENT_TYPE_ARRIVED
-                ]),
-                Journey.end_time.is_(None)
-            )
-            .one_or_none()
-        )
+        journey = None
+        if active_store.get(db, str(journey_id)) is not None:
+            journey = db.get(Journey, str(journey_id))
 
-        if journey is None:
+        # The journey row is authoritative, another worker may have finished it
+        if journey is None or journey.status not in ACTIVE_STATUSES:
             raise HTTPException(
                 status_code=404,
                 detail=f"Active journey not found for ID: {journey_id}"
@@ -0,0 +1,227 @@
+"""
+Admission control for the journey write endpoints.
+
+At most `limit` journey requests run at once, by default a share of the DB
+pool that leaves headroom for reads, exports and scheduler jobs, so a burst
+waits here instead of every request queueing on the pool and timing out
+together. Requests over the limit wait in a priority queue: events on
+journeys this worker knows are active go first, then events it can't vouch
+for (finished, unknown, or cached only on another worker), then new starts.
+Starts can't take the last `reserve` slots, so riders already travelling
+keep getting through.
+
+A request that can't be admitted before its queue deadline, or finds the
+queue full of equal or higher priority requests, is shed straight away with
+503 and a Retry-After estimated from recent service times. A full queue
+makes room for an event by shedding the newest waiting start.
+
+Everything here runs on the event loop (the dependency is async), so the
+counters need no lock. The sync endpoints themselves run in the threadpool.
+"""
+
+import asyncio
+import heapq
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from uuid import UUID
+
+from fastapi import HTTPException
+
+from app.Services.journeyService.active_store import active_store
+from app.utils.lazy import lazy_singleton
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+PRIORITY_EVENT = 0
+PRIORITY_UNVERIFIED_EVENT = 1
+PRIORITY_START = 2
+PRIORITY_NAMES = {PRIORITY_EVENT: "event", PRIORITY_UNVERIFIED_EVENT: "unverified_event", PRIORITY_START: "start"}
+
+
+class AdmissionController:
+    # Weight of the newest sample in the service time average
+    EWMA_ALPHA = 0.1
+
+    def __init__(self, limit: int, reserve: int, max_queue: int, deadlines: dict[int, float]):
+        if limit < 1 or reserve < 0 or max_queue < 0 or any(deadline <= 0 for deadline in deadlines.values()):
+            raise ValueError(f"Invalid admission settings: limit={limit} reserve={reserve} max_queue={max_queue}")
+        self.limit = limit
+        self.reserve = min(reserve, limit - 1)
+        self.max_queue = max_queue
+        self.deadlines = deadlines
+        self.active = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._seq = 0
+        self.avg_service_sec = 0.1
+        self.admitted = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.shed = {name: 0 for name in PRIORITY_NAMES.values()}
+        self.max_queued = 0
+
+    def _slots_for(self, priority: int) -> int:
+        return self.limit if priority < PRIORITY_START else self.limit - self.reserve
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has likely drained."""
+        backlog = len(self._waiters) + self.active
+        return max(1, math.ceil(self.avg_service_sec * backlog / self.limit))
+
+    def _shed(self, priority: int, reason: str):
+        name = PRIORITY_NAMES[priority]
+        self.shed[name] += 1
+        logger.warning(f"[ADMISSION] shed {name} ({reason}), {self.active} active, {len(self._waiters)} queued")
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry shortly",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    async def acquire(self, priority: int) -> None:
+        """Wait for a slot or raise a 503. Pair every successful acquire with release()."""
+        name = PRIORITY_NAMES[priority]
+        self._drop_stale()
+        # Nobody of equal or higher priority waiting, and a slot free for this priority
+        if (not self._waiters or self._waiters[0][0] > priority) and self.active < self._slots_for(priority):
+            self.active += 1
+            self.admitted[name] += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            worst = max(self._waiters, default=None)
+            if worst is None or worst[0] <= priority:
+                self._shed(priority, "queue full")
+            # Make room by turning away the newest lower priority waiter
+            self._leave(worst)
+            worst[2].set_result(False)
+
+        future = asyncio.get_running_loop().create_future()
+        self._seq += 1
+        entry = (priority, self._seq, future)
+        heapq.heappush(self._waiters, entry)
+        self.max_queued = max(self.max_queued, len(self._waiters))
+        try:
+            admitted = await asyncio.wait_for(future, timeout=self.deadlines[priority])
+        except asyncio.TimeoutError:
+            self._leave(entry)
+            self._shed(priority, "queue deadline")
+        except asyncio.CancelledError:
+            self._leave(entry)
+            # Client went away; if the slot was handed over just before, give it back
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            raise
+        if not admitted:
+            self._shed(priority, "evicted")
+        self.admitted[name] += 1
+
+    def _drop_stale(self) -> None:
+        # A waiter whose deadline fired (or whose client left) keeps its entry until
+        # its task resumes; it must not block the fast path or be evicted twice
+        if any(future.done() for _, _, future in self._waiters):
+            self._waiters = [entry for entry in self._waiters if not entry[2].done()]
+            heapq.heapify(self._waiters)
+
+    def _leave(self, entry: tuple) -> None:
+        # The queue is at most max_queue long, so a linear remove is fine
+        if entry in self._waiters:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+
+    def release(self, service_sec: float | None = None) -> None:
+        if service_sec is not None:
+            self.avg_service_sec += self.EWMA_ALPHA * (service_sec - self.avg_service_sec)
+        self.active -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        # Hand free slots to the best waiters; a slot passes straight to the waiter
+        while self._waiters:
+            priority, _, future = self._waiters[0]
+            if future.done():  # Timing out, about to leave
+                heapq.heappop(self._waiters)
+                continue
+            if self.active >= self._slots_for(priority):
+                return
+            heapq.heappop(self._waiters)
+            self.active += 1
+            future.set_result(True)
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "reserved_for_events": self.reserve,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_queued": self.max_queued,
+            "admitted": dict(self.admitted),
+            "shed": dict(self.shed),
+            "avg_service_ms": round(self.avg_service_sec * 1000, 1),
+        }
+
+
+def _env_number(name: str, default, minimum, cast=int):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    try:
+        number = cast(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}") from None
+    if number < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value!r}")
+    return number
+
+
+def default_limit() -> int:
+    """A share of the DB pool, after keeping `ADMISSION_POOL_HEADROOM` connections back."""
+    from app.models.Database import pool_capacity
+
+    headroom = _env_number("ADMISSION_POOL_HEADROOM", 2, 0)
+    share = _env_number("ADMISSION_POOL_SHARE", 0.75, 0.01, float)
+    if share > 1:
+        raise ValueError(f"ADMISSION_POOL_SHARE must be at most 1, got {share}")
+    return max(int((pool_capacity() - headroom) * share), 1)
+
+
+@lazy_singleton
+def get_admission_controller() -> AdmissionController:
+    """Built on first use. Bad settings raise ValueError naming the variable."""
+    limit = _env_number("ADMISSION_MAX_CONCURRENT", None, 1) or default_limit()
+    event_deadline = _env_number("ADMISSION_EVENT_DEADLINE_MS", 2000.0, 1, float) / 1000
+    return AdmissionController(
+        limit=limit,
+        reserve=_env_number("ADMISSION_RESERVED_FOR_EVENTS", max(limit // 5, 1), 0),
+        max_queue=_env_number("ADMISSION_MAX_QUEUE", limit * 4, 1),
+        deadlines={
+            PRIORITY_EVENT: event_deadline,
+            PRIORITY_UNVERIFIED_EVENT: event_deadline,
+            PRIORITY_START: _env_number("ADMISSION_START_DEADLINE_MS", 500.0, 1, float) / 1000,
+        },
+    )
+
+
+@asynccontextmanager
+async def _slot(priority: int):
+    controller = get_admission_controller()
+    await controller.acquire(priority)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        controller.release(time.perf_counter() - started)
+
+
+async def admit_event(journey_id: UUID):
+    # Only this worker's in-memory copy is checked; a DB lookup here would take
+    # the very connection admission is rationing
+    record = active_store.peek(str(journey_id))
+    async with _slot(PRIORITY_EVENT if record is not None else PRIORITY_UNVERIFIED_EVENT):
+        yield
+
+
+async def admit_start():
+    # New starts are shed first under load
+    async with _slot(PRIORITY_START):
+        yield
@@ -0,0 +1,132 @@
+"""
+Access for app clients: the internal key, or an anon JWT once token auth is configured.
+
+Tokens are verified with JWT_SECRET (HS*) or JWT_PUBLIC_KEY (RS*/ES*), loaded
+once per process. A verified token's claims are cached until the token expires
+(capped at JWT_CACHE_TTL_SECONDS), keyed by the token's hash, so a client
+sending the same bearer token on every request pays one signature check.
+Rejected tokens are remembered briefly too, so a flood of bad tokens stays cheap.
+"""
+
+import hashlib
+import os
+import time
+
+from fastapi import Header, HTTPException
+
+from app.dependencies.internal_access import get_keyring
+from app.utils.lazy import lazy_singleton
+from app.utils.ttl_cache import TTLCache
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+_REJECTED = object()
+
+
+class TokenVerifier:
+    REJECTED_TTL_SECONDS = 30
+
+    def __init__(self, key: str, algorithms: list[str], audience: str | None = None,
+                 issuer: str | None = None, cache_ttl: float = 300.0, maxsize: int = 10_000):
+        import jwt  # PyJWT, only needed once token auth is configured
+
+        self._jwt = jwt
+        self._key = key
+        self.algorithms = algorithms
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_ttl = cache_ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=cache_ttl)
+        self.verified = 0
+
+    def verify(self, token: str) -> dict | None:
+        """Claims of a valid token, None otherwise."""
+        cache_key = hashlib.sha256(token.encode("utf-8")).digest()
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            if cached is _REJECTED:
+                return None
+            claims, expires_at = cached
+            if expires_at > time.time():
+                return claims
+            # The claim check below will reject it
+
+        try:
+            claims = self._jwt.decode(
+                token,
+                self._key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"require": ["exp"]},
+            )
+        except self._jwt.InvalidTokenError as e:
+            logger.debug(f"[AUTH] rejected token: {e}")
+            self._cache.set(cache_key, _REJECTED, ttl=self.REJECTED_TTL_SECONDS)
+            return None
+
+        self.verified += 1
+        expires_at = float(claims["exp"])
+        ttl = min(expires_at - time.time(), self.cache_ttl)
+        if ttl > 0:
+            self._cache.set(cache_key, (claims, expires_at), ttl=ttl)
+        return claims
+
+    def stats(self) -> dict:
+        return {**self._cache.stats(), "verified": self.verified}
+
+
+@lazy_singleton
+def get_token_verifier() -> TokenVerifier | None:
+    """None when neither JWT_SECRET nor JWT_PUBLIC_KEY is set."""
+    secret = os.getenv("JWT_SECRET")
+    public_key = os.getenv("JWT_PUBLIC_KEY")
+    if not secret and not public_key:
+        return None
+    default_algorithms = "HS256" if secret else "RS256"
+    return TokenVerifier(
+        key=secret or public_key.replace("\\n", "\n"),
+        algorithms=os.getenv("JWT_ALGORITHMS", default_algorithms).split(","),
+        audience=os.getenv("JWT_AUDIENCE"),
+        issuer=os.getenv("JWT_ISSUER"),
+        cache_ttl=float(os.getenv("JWT_CACHE_TTL_SECONDS", "300")),
+        maxsize=int(os.getenv("JWT_CACHE_MAX_ENTRIES", "10000")),
+    )
+
+
+def client_access(x_internal_key: str = Header(None), authorization: str = Header(None)) -> dict | None:
+    """
+    Returns the token claims for JWT clients, None for internal key holders.
+    Without JWT auth configured this is the internal key check. With it, access
+    is never open: a valid key or a valid bearer token is required.
+    """
+    keyring = get_keyring()
+    verifier = get_token_verifier()
+    if verifier is None:
+        if keyring.check(x_internal_key):
+            return None  # The right key, or no key configured (local dev)
+        raise HTTPException(status_code=403, detail="Access only to DEVS, Forbidden")
+
+    if x_internal_key is not None and keyring.check(x_internal_key, open_when_unset=False):
+        return None
+
+    if authorization:
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token.strip():
+            claims = verifier.verify(token.strip())
+            if claims is not None:
+                return claims
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if x_internal_key is not None:
+        raise HTTPException(status_code=403, detail="Access only to DEVS, Forbidden")
+    raise HTTPException(
+        status_code=401,
+        detail="Missing credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
@@ -1,13 +1,76 @@
 """Just a simnple dependency for keeping access controlled until pub release """
 
-import os 
-from fastapi import Header, HTTPException, Depends
+import hashlib
+import hmac
+import os
+
+from fastapi import Header, HTTPException
+
+from app.utils.lazy import lazy_singleton
+from app.utils.logger.logger import get_logger
+
+
+class KeyRing:
+    """
+    Accepted internal API keys, held as SHA-256 digests so plaintext keys needn't
+    sit in the environment. Every digest is compared in constant time.
+    """
+
+    def __init__(self, digests: list[bytes]):
+        self._digests = digests
+
+    @classmethod
+    def from_env(cls) -> "KeyRing":
+        # INTERNAL_API_KEY takes one or more comma separated keys,
+        # INTERNAL_API_KEY_HASHES their hex SHA-256 digests
+        digests = [
+            hashlib.sha256(key.strip().encode("utf-8")).digest()
+            for key in os.getenv("INTERNAL_API_KEY", "").split(",") if key.strip()
+        ]
+        digests += [
+            bytes.fromhex(digest.strip())
+            for digest in os.getenv("INTERNAL_API_KEY_HASHES", "").split(",") if digest.strip()
+        ]
+        return cls(digests)
+
+    @property
+    def configured(self) -> bool:
+        return bool(self._digests)
+
+    def check(self, key: str | None, open_when_unset: bool = True) -> bool:
+        if not self._digests:
+            # No key configured: open, as before keys were set up (local dev),
+            # unless another credential (JWT) is configured
+            return open_when_unset
+        if key is None:
+            return False
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        matched = False
+        for expected in self._digests:
+            matched |= hmac.compare_digest(expected, digest)
+        return matched
+
+
+@lazy_singleton
+def get_keyring() -> KeyRing:
+    """Loaded from the environment once per process."""
+    keyring = KeyRing.from_env()
+    if not keyring.configured:
+        get_logger().warning("INTERNAL_API_KEY is not set, internal access is open")
+    return keyring
+
+
+def reset_keyring() -> None:
+    """Re-read keys on next request, e.g. after rotating them."""
+    get_keyring.reset()
+
 
 def internal_access(x_internal_key: str = Header(None)):
-    if x_internal_key != os.getenv("INTERNAL_API_KEY"):
+    from app.dependencies.client_access import get_token_verifier
+
+    # Open without keys only in local dev, i.e. when JWT auth isn't configured either
+    if not get_keyring().check(x_internal_key, open_when_unset=get_token_verifier() is None):
         raise HTTPException(
             status_code=403,
             detail="Access only to DEVS, Forbidden"
-        )   
-    
-
+        )
@@ -1,31 +1,64 @@
 import os
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
+from threading import Lock
 
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, declarative_base
 
 Base = declarative_base()
 
-load_dotenv()
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-engine = create_engine(
-    DATABASE_URL,
-    echo=True
-)
-
+# Sessions are bound when the engine is created (app lifespan or init_engine()),
+# so importing models never opens a connection pool.
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
-    bind= engine
     )
 
+engine = None
+_lock = Lock()
+
+
+def init_engine():
+    """Create the engine once per process and bind SessionLocal to it."""
+    global engine
+
+    if engine is not None:
+        return engine
+
+    with _lock:
+        if engine is None:
+            from dotenv import load_dotenv
+
+            load_dotenv()
+            engine = create_engine(
+                os.getenv("DATABASE_URL"),
+                echo=os.getenv("SQL_ECHO", "false").lower() == "true"
+            )
+            SessionLocal.configure(bind=engine)
+    return engine
+
+
+def dispose_engine():
+    global engine
+
+    with _lock:
+        if engine is not None:
+            engine.dispose()
+            engine = None
+
+
 def get_db():
+    init_engine()
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
 
+
+def pool_capacity() -> int:
+    """Connections the pool can hand out at once: pool_size + max_overflow (QueuePool)."""
+    pool = init_engine().pool
+    size = pool.size() if hasattr(pool, "size") else 1
+    # QueuePool doesn't expose max_overflow publicly; -1 means unlimited
+    overflow = getattr(pool, "_max_overflow", 0)
+    return size + max(overflow, 0)
@@ -15,13 +15,28 @@ class Journey(Base):
     end_time = Column(DateTime, nullable=True)
     status = Column(String, nullable=True)  # completed, delayed etc
     created_at = Column(DateTime, nullable=False)
-    official_start_time = Column(String, nullable=True)
-    official_end_time = Column(String, nullable=True)
+    # Official trip times on the journey's day (UTC), from the timetable
+    official_start_time = Column(DateTime(timezone=True), nullable=True)
+    official_end_time = Column(DateTime(timezone=True), nullable=True)
     
     predicted_status = Column(String, nullable=False)
-    predicted_arrival = Column(String, nullable=False) 
+    predicted_arrival = Column(DateTime(timezone=True), nullable=True)
 
 
     # Track data source
     data_source = Column(String, nullable=False, default="user")  # "official" or "user"
-    is_synthetic = Column(Boolean, default=False)  # True for seeded data
\ No newline at end of file
+    is_synthetic = Column(Boolean, default=False)  # True for seeded data
+
+    # Set once on completion by the data-quality stage (ok, outlier, implausible...)
+    quality_flag = Column(String, nullable=True)
+
+
+class ActiveJourney(Base):
+    """Small hot table with one row per journey that is still in progress"""
+
+    __tablename__ = "active_journeys"
+
+    journey_id = Column(String, ForeignKey("journeys.id"), primary_key=True)
+    route_id = Column(String, nullable=False)
+    status = Column(String, nullable=False)
+    last_event_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, Integer, Float, DateTime, JSON
+from app.models.Database import Base
+
+
+class RouteReliability(Base):
+    """
+    Pre-aggregated reliability per route and time slot, updated as journeys complete.
+    Rows for any range merge by adding columns and histogram buckets.
+    """
+
+    __tablename__ = "route_reliability"
+
+    route_id = Column(String(50), primary_key=True)
+    granularity = Column(String(8), primary_key=True)  # "hour" or "day"
+    slot_start = Column(DateTime, primary_key=True)  # UTC start of the local hour/day
+    local_hour = Column(Integer, nullable=True, index=True)  # 0-23 for hourly rows
+
+    journeys = Column(Integer, nullable=False, default=0)
+    delay_count = Column(Integer, nullable=False, default=0)
+    on_time = Column(Integer, nullable=False, default=0)
+    delay_sum = Column(Float, nullable=False, default=0.0)
+    delay_sq_sum = Column(Float, nullable=False, default=0.0)
+    duration_count = Column(Integer, nullable=False, default=0)
+    duration_sum = Column(Float, nullable=False, default=0.0)
+    # Counts per delay bucket, see app/Services/Reliability/rollup.py
+    delay_histogram = Column(JSON, nullable=True)
@@ -1,6 +1,7 @@
 from app.models.Route import Route
-from app.models.Journey import Journey
+from app.models.Journey import Journey, ActiveJourney
 from app.models.Route import Stop
+from app.models.Reliability import RouteReliability
 
 
 
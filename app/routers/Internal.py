@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.models.Database import get_db
+from app.Services.Prediction.accuracy import PredictionAccuracy
+from app.Services.Prediction.cache import get_prediction_cache
+from app.Services.Prediction.delay_tracker import get_delay_tracker
+from app.Services.journeyService.idempotency import get_idempotency_store
+from app.Services.Scheduler import scheduler
+from app.Services.Shared.shared_tables import get_shared_reader
+from app.utils.dates import as_utc
+from app.utils.responses import get_response_cache
+from app.utils.profiling import get_profile_store, sample_rate
+
+from app.dependencies.internal_access import internal_access
+from app.dependencies.client_access import get_token_verifier
+from app.dependencies.admission import get_admission_controller
+
+router = APIRouter(dependencies=[Depends(internal_access)], prefix="/internal", tags=["Internal"])
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Counters for in-process caches and background components"""
+    verifier = get_token_verifier()
+    shared = get_shared_reader()
+    return {
+        "prediction_cache": get_prediction_cache().stats(),
+        "delay_tracker": get_delay_tracker().stats(),
+        "scheduler": scheduler.stats(),
+        "response_cache": get_response_cache().stats(),
+        "idempotency": get_idempotency_store().stats(),
+        "token_cache": verifier.stats() if verifier else None,
+        "shared_tables": shared.stats() if shared else None,
+        "admission": get_admission_controller().stats(),
+    }
+
+
+@router.get("/profiles")
+def get_profiles(limit: int = Query(10, ge=1, le=100)):
+    """Slowest sampled requests with their SQL timeline and folded stacks"""
+    store = get_profile_store()
+    if store is None:
+        raise HTTPException(404, "Profiling is off, set PROFILE_SAMPLE_RATE to enable it")
+    return {
+        "sample_rate": sample_rate(),
+        "sampled": store.sampled,
+        "profiles": store.slowest(limit),
+    }
+
+
+@router.get("/prediction-accuracy")
+def get_prediction_accuracy(
+    start: datetime | None = Query(None, description="Completed from, defaults to 7 days before end"),
+    end: datetime | None = Query(None, description="Completed until, defaults to now"),
+    route_id: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """Served prediction error and timetable adherence per route, aggregated in the database"""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=7)
+    start, end = as_utc(start), as_utc(end)
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "routes": PredictionAccuracy.by_route(db, start, end, route_id=route_id),
+    }
@@ -1,5 +1,6 @@
 from uuid import UUID
-from fastapi import Depends, APIRouter, HTTPException
+from fastapi import Depends, APIRouter, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 
@@ -12,26 +13,91 @@ from app.schemas.journey import StartJourney, JourneyEventType, AddJourneyEvent
 
 from app.Services.journeyService.journey_service import JourneyService
 from app.Services.journeyService.eventHandler import JourneyEventHandler
+from app.Services.journeyService.idempotency import client_identity, get_idempotency_store, validate_key
+from app.Services.journeyService.export import FORMATS, JourneyExport
 
 
+from app.dependencies.client_access import client_access
 from app.dependencies.internal_access import internal_access
+from app.dependencies.admission import admit_event, admit_start
+from app.utils.dates import as_utc
 
-router = APIRouter(dependencies=[Depends(internal_access)], prefix="/journeys", tags=['Journeys'])
+router = APIRouter(dependencies=[Depends(client_access)], prefix="/journeys", tags=['Journeys'])
 
 # Rate limiting variables. V2 will have a more robust retry logic 
 last_request_time = {}
 COOLDOWN_SECONDS = 180
 
 
-@router.post("/start")
+def _idempotent(scope: tuple, client: dict | None, idempotency_key: str | None, body: str, response: Response, handler):
+    """Run handler once per client and Idempotency-Key; retries get the first response back."""
+    if idempotency_key is None:
+        return handler()
+
+    store = get_idempotency_store()
+    result, replayed = store.run(
+        (client_identity(client),) + scope + (validate_key(idempotency_key),),
+        store.fingerprint(body),
+        handler,
+    )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+@router.get("/export", dependencies=[Depends(internal_access)])
+def export_journeys(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    route_id: str | None = None,
+    start: datetime | None = Query(None, description="created_at from (inclusive), naive values are UTC"),
+    end: datetime | None = Query(None, description="created_at until (exclusive)"),
+    data_source: str | None = None,
+    include_archived: bool = Query(True, description="Also export journeys moved to the archive"),
+):
+    """
+    Stream journey history for offline use as NDJSON or CSV.
+    Rows are sent in chunks as they are read from a server-side cursor, unsorted,
+    followed by matching archived journeys.
+    """
+    if start is not None and end is not None and as_utc(start) >= as_utc(end):
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    filters = {"route_id": route_id, "start": start, "end": end, "data_source": data_source}
+    statement = JourneyExport.statement(**filters)
+    return StreamingResponse(
+        JourneyExport.stream(format, statement, archived=filters if include_archived else None),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="journeys.{format}"'},
+    )
+
+
+def _arrival(value: datetime | None) -> str | None:
+    """Stored as a timestamp, served in the same UTC "YYYY-MM-DD HH:MM:SS" form as before."""
+    if value is None:
+        return None
+    return as_utc(value).astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+@router.post("/start", dependencies=[Depends(admit_start)])
 def start_journey(
     journey: StartJourney,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    client: dict | None = Depends(client_access),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
     ):
     """
     User starts their journey by submitting route and start/end stops.
     Frontend sends plain string IDs (public_id values).
+    Send an Idempotency-Key header so retries don't create duplicate journeys.
     """
+    return _idempotent(
+        ("start",), client, idempotency_key, journey.model_dump_json(), response,
+        lambda: _start_journey(journey, db),
+    )
+
+
+def _start_journey(journey: StartJourney, db: Session) -> dict:
 
     
     if not journey.start_stop_id:
@@ -56,21 +122,31 @@ def start_journey(
         "route_id": new_journey.route_id,
         "start_stop_id": new_journey.start_stop_id,
         "predicted_status": new_journey.predicted_status,
-        "predicted_arrival": new_journey.predicted_arrival,
+        "predicted_arrival": _arrival(new_journey.predicted_arrival),
         "status": new_journey.status
     }
 
 
-@router.post("/{journey_id}/event")
+@router.post("/{journey_id}/event", dependencies=[Depends(admit_event)])
 def add_journey_event(
     journey_id: UUID,      
     event: AddJourneyEvent,
-    db: Session = Depends(get_db)
+    response: Response,
+    db: Session = Depends(get_db),
+    client: dict | None = Depends(client_access),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
 ):
     """
     User submits a journey event (Arrived, Delayed, StopReached, etc.)
     journey_id is the internal UUID returned from /start
     """
+    return _idempotent(
+        ("event", str(journey_id)), client, idempotency_key, event.model_dump_json(), response,
+        lambda: _add_journey_event(journey_id, event, db),
+    )
+
+
+def _add_journey_event(journey_id: UUID, event: AddJourneyEvent, db: Session) -> dict:
 
     now = datetime.now(timezone.utc)
     last_time = last_request_time.get(journey_id)
@@ -106,7 +182,7 @@ def add_journey_event(
     return {
         "journey_id": str(updated_journey.id),     
         "status": updated_journey.status,
-        "predicted_arrival": updated_journey.predicted_arrival,
+        "predicted_arrival": _arrival(updated_journey.predicted_arrival),
         "updated_at": updated_journey.created_at.isoformat() if updated_journey.created_at else None
     }
 
@@ -0,0 +1,40 @@
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.Services.Planner.planner import get_network
+from app.utils.dates import as_utc
+from app.utils.timetable import timetable_zone
+
+from app.dependencies.client_access import client_access
+
+router = APIRouter(dependencies=[Depends(client_access)], tags=["Plan"])
+
+
+@router.get("/plan")
+def plan_journey(
+    from_stop: str = Query(..., alias="from", description="Origin stop ATCO code"),
+    to_stop: str = Query(..., alias="to", description="Destination stop ATCO code"),
+    depart: datetime | None = Query(None, description="Earliest departure, defaults to now"),
+    options: int = Query(3, ge=1, le=5),
+):
+    """Fastest itineraries between two stops across all routes"""
+
+    network = get_network()
+    if network is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Journey planner unavailable, no catalog snapshot loaded"
+        )
+
+    for stop_id in (from_stop, to_stop):
+        if network.catalog.stop_idx(stop_id) is None:
+            raise HTTPException(404, f"Stop '{stop_id}' not found")
+
+    depart = as_utc(depart or datetime.now(timezone.utc))
+
+    itineraries = network.plan(from_stop, to_stop, depart, options=options, tz=timetable_zone())
+    if not itineraries:
+        raise HTTPException(404, f"No journey found from '{from_stop}' to '{to_stop}'")
+
+    return itineraries
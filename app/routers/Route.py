@@ -1,8 +1,11 @@
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.orm import Session, joinedload
-from app.models.Database import SessionLocal, engine, get_db
+from app.models.Database import get_db
+from app.Services.Catalog.snapshot import get_catalog
+from app.Services.Reliability.rollup import ReliabilityRollup
 
 from app.models.Route import Route
 from app.models.Route import Stop
@@ -12,37 +15,66 @@ from app.schemas.route import StopsPerRoute
 from app.schemas.route import RouteOut
 
 from app.utils.logger import logger
+from app.utils.dates import as_utc
+from app.utils.responses import cached_json_response
 
 
-from app.dependencies.internal_access import internal_access
+from app.dependencies.client_access import client_access
 logger = logger.get_logger()
 
 
-router = APIRouter(dependencies=[Depends(internal_access)], prefix="/route", tags=["Route"])
+router = APIRouter(dependencies=[Depends(client_access)], prefix="/route", tags=["Route"])
+
+
+def _cache_key(*parts) -> tuple | None:
+    """
+    Key for cached bodies, ending in the snapshot's mtime so a rebuilt snapshot is
+    served as soon as it is loaded. None without a snapshot: bodies built from the
+    DB have no version to key on, so they aren't cached.
+    """
+    catalog = get_catalog()
+    return None if catalog is None else (*parts, catalog.mtime)
 
 
 # This is used for populating the drop down menu for the frontend
 @router.get("/routes", response_model=List[RouteOut])
-def get_routes(db: Session = Depends(get_db)):
+def get_routes(request: Request, db: Session = Depends(get_db)):
     """Return a list of available routes"""
 
-    routes = db.query(Route).all()  
-    if not routes:
-        raise HTTPException(
-            status_code=404,
-            detail="Could not return a list of routes"
-        )
-    
-    return [
-        {
-            "id": route.id,
-            "name": route.name
-        }
-        for route in routes
-    ]
+    def build():
+        routes = db.query(Route).all()  
+        if not routes:
+            raise HTTPException(
+                status_code=404,
+                detail="Could not return a list of routes"
+            )
+        
+        return [
+            {
+                "id": route.id,
+                "name": route.name
+            }
+            for route in routes
+        ]
+
+    return cached_json_response(request, _cache_key("routes"), build)
 
 @router.get("/routes/{route_id}/stops", response_model=List[StopsPerRoute])
-def get_stops_per_route(route_id: str, db: Session = Depends(get_db)):
+def get_stops_per_route(route_id: str, request: Request, db: Session = Depends(get_db)):
+    return cached_json_response(
+        request,
+        _cache_key("stops", route_id),
+        lambda: _stops_per_route(route_id, db),
+    )
+
+
+def _stops_per_route(route_id: str, db: Session) -> list[dict]:
+    # Compiled at ingest: invalid stops already dropped, loop calls kept
+    catalog = get_catalog()
+    stops = catalog.route_stops(route_id) if catalog is not None else []
+    if stops:
+        return stops
+
     route_stops = (
         db.query(RouteStop)
         .options(joinedload(RouteStop.stop))
@@ -77,4 +109,33 @@ def get_stops_per_route(route_id: str, db: Session = Depends(get_db)):
             logger.warning(f"[WARNING] Missing or invalid stop data for stop_id: {rs.stop_id}")
 
     logger.warning(f"[DEBUG] Valid stops for {route_id}: {len(result)}")
-    return result
\ No newline at end of file
+    return result
+
+
+@router.get("/routes/{route_id}/reliability")
+def get_route_reliability(
+    route_id: str,
+    start: datetime | None = Query(None, description="Range start, defaults to 30 days before end"),
+    end: datetime | None = Query(None, description="Range end, defaults to now"),
+    hour: int | None = Query(None, ge=0, le=23, description="Only journeys planned in this local hour"),
+    db: Session = Depends(get_db),
+):
+    """On-time share and delay spread for a route, merged from pre-aggregated rollups"""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - timedelta(days=30)
+    start, end = as_utc(start), as_utc(end)
+    if start >= end:
+        raise HTTPException(400, "start must be before end")
+
+    catalog = get_catalog()
+    known = catalog.route_position(route_id) is not None if catalog is not None else db.get(Route, route_id) is not None
+    if not known:
+        raise HTTPException(404, f"Route '{route_id}' not found")
+
+    return {
+        "route_id": route_id,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "hour": hour,
+        **ReliabilityRollup.query(db, route_id, start, end, hour=hour),
+    }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, datetime_parse, Field
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
@@ -15,6 +15,9 @@ class JourneyEventType():
 
     # User Journey stops
     EVENT_TYPE_STOP_REACHED = "STOP_REACHED"
+
+    # Set by the server when a journey gets no events for too long
+    EVENT_TYPE_ABANDONED = "ABANDONED"
     
 
 
@@ -15,6 +15,7 @@ class StopsPerRoute(BaseModel):
     name: str
     sequence: Optional[int] = None  
     direction: Optional[str] = None  
+    distance_m: Optional[float] = None
 
     class Config:
         from_attributes = True  
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+UTC normalisation.
+
+Timestamps are stored as UTC. Depending on the backend and on whether a row
+was just set or read back, the same column can hold a naive or an aware
+datetime, so compare and query through one of these.
+"""
+
+from datetime import datetime, timezone
+
+
+def as_utc(value: datetime | None) -> datetime | None:
+    """Aware UTC; naive values are taken to be UTC already."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def naive_utc(value: datetime | None) -> datetime | None:
+    """Naive UTC, the form naive DateTime columns hold."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -2,6 +2,10 @@ import re
 from pathlib import Path
 from datetime import datetime, timezone
 
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
 def parse_cif_for_route(cif_content: str, target_route: str) -> list[dict]:
     """
     Parse CIF timetable content for a specific route.
@@ -63,3 +67,169 @@ def get_official_timetable_for_route(cif_file_path: str, route_id: str, planned_
         "start_time": closest_trip["start_time"],
         "end_time": closest_trip["end_time"]
     }
+
+
+def _cif_minutes(hhmm: str) -> int | None:
+    """Convert a CIF HHMM field to minutes past midnight."""
+    if len(hhmm) != 4 or not hhmm.isdigit():
+        return None
+    return int(hhmm[:2]) * 60 + int(hhmm[2:])
+
+
+def parse_cif_trips(cif_file_path: str) -> dict[str, list[tuple[int, int]]]:
+    """
+    Parse every journey in an ATCO-CIF file into official trip times.
+    Returns {route_id: [(start_minute, end_minute), ...]} sorted by start,
+    using the same "<route>-<O|I>" ids that initdb.py gives routes.
+    """
+    path = Path(cif_file_path)
+    if not path.exists():
+        return {}
+
+    trips: dict[str, list[tuple[int, int]]] = {}
+    route_id = None
+    start_min = None
+
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            record_type = line[:2]
+
+            if record_type == "QS":  # Journey header
+                route_code = line[38:42].strip()
+                direction = line[64:65].strip() or "O"
+                route_id = f"{route_code}-{direction}" if route_code else None
+                start_min = None
+
+            elif record_type == "QO" and route_id:  # Origin, departure time
+                start_min = _cif_minutes(line[14:18])
+
+            elif record_type == "QT" and route_id and start_min is not None:  # Destination, arrival time
+                end_min = _cif_minutes(line[14:18])
+                if end_min is not None:
+                    if end_min < start_min:  # Runs past midnight
+                        end_min += 24 * 60
+                    trips.setdefault(route_id, []).append((start_min, end_min))
+                route_id = None
+                start_min = None
+
+    for route_trips in trips.values():
+        route_trips.sort()
+    return trips
+
+
+def parse_cif_route_sequences(cif_file_path: str) -> tuple[dict, dict]:
+    """
+    Parse route metadata and the longest stop sequence per route from a CIF file.
+    Returns (routes, sequences) keyed by normalized "<route>-<O|I>" ids:
+        routes:    {route_id: {"code", "dir_char", "direction", "name"}}
+        sequences: {route_id: [stop_id, ...]}  (repeats kept, e.g. loop routes)
+    """
+    with open(cif_file_path, "r", encoding="utf-8", errors="replace") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip() and not line.startswith("#")]
+
+    routes = {}
+    route_sequences = {}
+    current_key = None
+    current_stops = []
+    current_direction_char = None
+
+    def save_current_sequence():
+        if current_key is None or len(current_stops) < 3:
+            return
+        existing = route_sequences.get(current_key, [])
+        if len(current_stops) > len(existing):
+            route_sequences[current_key] = current_stops[:]
+            logger.debug(f"Saved/updated sequence for {current_key:12} → {len(current_stops)} stops")
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith("QDN"):
+            save_current_sequence()
+            parts = line.split(maxsplit=3)
+            if len(parts) < 4:
+                continue
+            _, route_code, dir_char, description = parts
+            current_direction_char = dir_char
+            current_stops = []
+            temp_key = f"{route_code}-{dir_char}"
+            routes[temp_key] = {
+                "code": route_code,
+                "dir_char": dir_char,
+                "direction": "Outbound" if dir_char == "O" else "Inbound",
+                "name": f"{route_code} {description.strip()}",
+            }
+            current_key = temp_key
+
+        elif line.startswith("QSN") and current_key:
+            save_current_sequence()
+            parts = line.split()
+            variant_code = None
+            for idx in range(4, min(9, len(parts))):
+                p = parts[idx].strip("X")
+                if len(p) >= 1 and any(c.isdigit() for c in p) and p[0] not in ('2','0','1'):
+                    variant_code = p
+                    break
+            if not variant_code:
+                for p in parts[3:]:
+                    p = p.strip("X")
+                    if len(p) >= 1 and p[0].isdigit():
+                        variant_code = p
+                        break
+            if not variant_code and "code" in routes.get(current_key, {}):
+                variant_code = routes[current_key]["code"]
+            variant_code = variant_code or "UNKNOWN"
+            final_key = f"{variant_code}-{current_direction_char}"
+            if final_key != current_key and current_key in routes:
+                if final_key not in routes:
+                    routes[final_key] = routes.pop(current_key)
+            current_key = final_key
+            current_stops = []
+
+        elif line.startswith(("QO", "QI", "QT")) and current_key:
+            stop_id = line[2:14].strip()
+            if stop_id.startswith("7000") and len(stop_id) == 12:
+                current_stops.append(stop_id)
+
+    save_current_sequence()
+
+    # Cleanup invalid keys
+    to_remove = [k for k in route_sequences if not k or k.endswith("-") or "--" in k or k.count("-") < 1]
+    for bad in to_remove:
+        logger.debug(f"Removing invalid key: {bad}")
+        route_sequences.pop(bad, None)
+        routes.pop(bad, None)
+
+    # Normalize keys
+    normalized_routes = {}
+    normalized_sequences = {}
+    for old_key, seq in route_sequences.items():
+        if old_key not in routes:
+            continue
+        meta = routes[old_key]
+        code = meta.get("code")
+        if not code or code == "UNKNOWN":
+            possible = old_key.split("-")[0]
+            if any(c.isdigit() for c in possible) or len(possible) in (1,2,3):
+                code = possible
+            else:
+                continue
+        dir_char = meta.get("dir_char")
+        if not dir_char or dir_char not in ("O", "I"):
+            parts = old_key.split("-")
+            if len(parts) >= 2:
+                last = parts[-1].strip()
+                if last and last[0] in ("O", "I"):
+                    dir_char = last[0]
+                else:
+                    dir_char = "O"
+            else:
+                dir_char = "O"
+        new_key = f"{code}-{dir_char}"
+        if new_key not in normalized_sequences or len(seq) > len(normalized_sequences[new_key]):
+            normalized_sequences[new_key] = seq
+            normalized_routes[new_key] = meta
+
+    return normalized_routes, normalized_sequences
@@ -0,0 +1,41 @@
+"""
+Process-wide objects built on first use.
+
+Services read their settings from the environment, which .env has only
+filled in once the app has started, so they can't be built at import time.
+`lazy_singleton` wraps a zero-argument factory: the first call builds the
+object under a lock, later calls return it without locking. `reset()` drops
+it so the next call rebuilds it (rotated keys, tests).
+"""
+
+import functools
+from threading import Lock
+from typing import Callable, TypeVar
+
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+def lazy_singleton(build: Callable[[], T]) -> Callable[[], T]:
+    lock = Lock()
+    instance = _UNSET
+
+    @functools.wraps(build)
+    def get() -> T:
+        nonlocal instance
+        value = instance
+        if value is _UNSET:
+            with lock:
+                if instance is _UNSET:
+                    instance = build()
+                value = instance
+        return value
+
+    def reset() -> None:
+        nonlocal instance
+        with lock:
+            instance = _UNSET
+
+    get.reset = reset
+    return get
@@ -0,0 +1,257 @@
+"""
+Opt-in request profiling.
+
+With PROFILE_SAMPLE_RATE > 0 (e.g. 0.01 for 1% of requests) a sampled request
+gets:
+    - a stack profile: a background thread samples the stacks of the threads
+      the request runs on every PROFILE_INTERVAL_MS and folds them into
+      flamegraph-style "outer;...;inner" counts
+    - a SQL timeline: every statement with its offset into the request,
+      duration and the driver's rowcount
+
+The slowest PROFILE_KEEP profiles are kept and served by GET /internal/profiles.
+
+When the rate is 0 (default) neither the middleware nor the SQL listeners are
+installed, so an unprofiled deployment runs exactly the code it did before.
+
+Threads are attached to a request when it enters the middleware (event loop)
+and when it runs SQL (the threadpool thread of a sync endpoint), so Python work
+a sync endpoint does before its first query isn't sampled.
+"""
+
+import heapq
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from itertools import count
+
+from app.utils.logger.logger import get_logger
+
+logger = get_logger()
+
+MAX_STACK_DEPTH = 48
+MAX_STATEMENT_CHARS = 300
+MAX_QUERIES_PER_PROFILE = 500
+TOP_STACKS = 25
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    __slots__ = ("method", "path", "started_at", "_started", "duration_ms", "status_code",
+                 "queries", "threads", "stacks", "samples")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms = None
+        self.status_code = None
+        # (offset_ms, duration_ms, rowcount, statement)
+        self.queries: list[tuple[float, float, int, str]] = []
+        self.threads: set[int] = set()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def as_dict(self) -> dict:
+        sql_ms = sum(q[1] for q in self.queries)
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "sql": {
+                "count": len(self.queries),
+                "total_ms": round(sql_ms, 2),
+                "rows": sum(max(q[2], 0) for q in self.queries),
+                "timeline": [
+                    {"offset_ms": round(o, 2), "duration_ms": round(d, 2), "rows": r, "statement": s}
+                    for o, d, r, s in self.queries
+                ],
+            },
+            "stack_samples": self.samples,
+            "stacks": [{"stack": stack, "samples": n} for stack, n in self.stacks.most_common(TOP_STACKS)],
+        }
+
+
+class StackSampler:
+    """One daemon thread for the process; it only wakes up while sampled requests are running."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: set[RequestProfile] = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def start(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.add(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, profile: RequestProfile) -> None:
+        with self._lock:
+            self._active.discard(profile)
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._wake.clear()
+            if not active:
+                self._wake.wait()
+                continue
+
+            frames = sys._current_frames()
+            for profile in active:
+                for ident in list(profile.threads):
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        profile.stacks[_fold(frame)] += 1
+                        profile.samples += 1
+            time.sleep(self.interval)
+
+
+def _fold(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class ProfileStore:
+    """Keeps the slowest `keep` profiles."""
+
+    def __init__(self, keep: int = 20):
+        self.keep = keep
+        self._heap: list[tuple[float, int, RequestProfile]] = []
+        self._seq = count()
+        self._lock = threading.Lock()
+        self.sampled = 0
+
+    def add(self, profile: RequestProfile) -> None:
+        entry = (profile.duration_ms, next(self._seq), profile)
+        with self._lock:
+            self.sampled += 1
+            if len(self._heap) < self.keep:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def slowest(self, limit: int | None = None) -> list[dict]:
+        with self._lock:
+            profiles = [p for _, _, p in sorted(self._heap, reverse=True)]
+        return [p.as_dict() for p in profiles[:limit]]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+
+
+class ProfilingMiddleware:
+    """Pure ASGI middleware, so unsampled requests pay one random() call."""
+
+    def __init__(self, app, sample_rate: float, sampler: StackSampler, store: ProfileStore):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.sampler = sampler
+        self.store = store
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(scope.get("method", ""), scope.get("path", ""))
+        profile.threads.add(threading.get_ident())
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+            await send(message)
+
+        token = _current.set(profile)
+        self.sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.sampler.stop(profile)
+            _current.reset(token)
+            profile.duration_ms = profile.elapsed_ms()
+            self.store.add(profile)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is not None:
+        profile.threads.add(threading.get_ident())
+        conn.info["profile_query_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = conn.info.pop("profile_query_started", None)
+    if profile is None or started is None or len(profile.queries) >= MAX_QUERIES_PER_PROFILE:
+        return
+    now = time.perf_counter()
+    profile.queries.append((
+        (started - profile._started) * 1000,
+        (now - started) * 1000,
+        cursor.rowcount,
+        " ".join(statement.split())[:MAX_STATEMENT_CHARS],
+    ))
+
+
+_store: ProfileStore | None = None
+_sample_rate = 0.0
+
+
+def sample_rate() -> float:
+    return _sample_rate
+
+
+def get_profile_store() -> ProfileStore | None:
+    """None when profiling is off."""
+    return _store
+
+
+def install_profiling(app) -> bool:
+    """Add the middleware and SQL listeners if PROFILE_SAMPLE_RATE > 0. Returns whether it did."""
+    global _store, _sample_rate
+
+    # Middleware has to be added before the app starts, so .env is read here
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    rate = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+    if rate <= 0:
+        return False
+
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    _sample_rate = min(rate, 1.0)
+    _store = ProfileStore(keep=int(os.getenv("PROFILE_KEEP", "20")))
+    sampler = StackSampler(interval=float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000)
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    app.add_middleware(ProfilingMiddleware, sample_rate=_sample_rate, sampler=sampler, store=_store)
+    logger.info(f"[PROFILE] sampling {_sample_rate:.1%} of requests")
+    return True
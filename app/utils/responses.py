@@ -0,0 +1,134 @@
+"""
+Fast JSON responses and cached, pre-compressed bodies.
+
+FastJSONResponse encodes with orjson when it is installed (stdlib json
+otherwise) and is the app's default response class.
+
+The big list endpoints (routes, stops per route) serve data that only changes
+when the catalog is rebuilt. `cached_json_response` encodes such a body once,
+keeps it with its gzip / brotli variants in a small LRU, and answers later
+requests with the encoding the client accepts, skipping response_model
+validation and JSON encoding entirely.
+"""
+
+import gzip
+import json
+import os
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+
+from app.utils.lazy import lazy_singleton
+from app.utils.ttl_cache import TTLCache
+
+try:
+    import orjson
+except ImportError:  # Optional speedup, see requirements.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # Optional, gzip is always available
+    brotli = None
+
+# Compressing tiny bodies costs more than it saves
+MIN_COMPRESS_BYTES = 512
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class EncodedBody:
+    """One JSON body plus its compressed variants, made on first request for each."""
+
+    __slots__ = ("raw", "_variants", "_lock")
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._variants: dict[str, bytes] = {}
+        self._lock = Lock()
+
+    def get(self, encoding: str) -> bytes:
+        if encoding == "identity":
+            return self.raw
+        body = self._variants.get(encoding)
+        if body is None:
+            with self._lock:
+                body = self._variants.get(encoding)
+                if body is None:
+                    body = self._variants[encoding] = _compress(self.raw, encoding)
+        return body
+
+
+def _compress(raw: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(raw, quality=5)
+    return gzip.compress(raw, compresslevel=6)
+
+
+def negotiate_encoding(accept_encoding: str | None, size: int) -> str:
+    """Pick br, gzip or identity from an Accept-Encoding header."""
+    if not accept_encoding or size < MIN_COMPRESS_BYTES:
+        return "identity"
+
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return "identity"
+
+
+def encoded_response(request: Request, body: EncodedBody, status_code: int = 200) -> Response:
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"), len(body.raw))
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(body.get(encoding), status_code=status_code, media_type="application/json", headers=headers)
+
+
+@lazy_singleton
+def get_response_cache() -> TTLCache:
+    return TTLCache(
+        maxsize=int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "512")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600")),
+    )
+
+
+def cached_json_response(request: Request, key: Hashable | None, build: Callable[[], Any]) -> Response:
+    """
+    Serve a JSON body cached under `key`, building it with `build()` on a miss.
+    `build` returns data that is already in response shape; exceptions (e.g. a 404)
+    propagate and nothing is cached. Put whatever version the data depends on in the key;
+    with no version to key on, pass key=None and the body is built every time.
+    """
+    if key is None:
+        return encoded_response(request, EncodedBody(dumps(build())))
+
+    cache = get_response_cache()
+    body = cache.get(key)
+    if body is None:
+        body = EncodedBody(dumps(build()))
+        cache.set(key, body)
+    return encoded_response(request, body)
@@ -0,0 +1,34 @@
+"""
+Portable SQL expressions the ORM doesn't provide.
+
+`epoch_seconds(column)` is a timestamp as seconds since 1970 in SQL, so two
+timestamps can be subtracted inside the query whatever the dialect:
+EXTRACT(EPOCH ...) on PostgreSQL (wall-clock seconds for naive `timestamp`,
+true epoch for `timestamptz`, which agree for the UTC values stored here)
+and julianday() on SQLite.
+"""
+
+from sqlalchemy import Float
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class epoch_seconds(FunctionElement):
+    type = Float()
+    name = "epoch_seconds"
+    inherit_cache = True
+
+
+@compiles(epoch_seconds)
+def _epoch_seconds(element, compiler, **kw):
+    return f"EXTRACT(EPOCH FROM {compiler.process(element.clauses, **kw)})"
+
+
+@compiles(epoch_seconds, "sqlite")
+def _epoch_seconds_sqlite(element, compiler, **kw):
+    return f"((julianday({compiler.process(element.clauses, **kw)}) - 2440587.5) * 86400.0)"
+
+
+def seconds_between(later, earlier):
+    """`later - earlier` in seconds, as a SQL expression."""
+    return epoch_seconds(later) - epoch_seconds(earlier)
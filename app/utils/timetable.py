@@ -0,0 +1,48 @@
+"""
+Official timetable times.
+
+CIF times are local wall-clock "HHMM" minutes past the service day's
+midnight in TIMETABLE_TZ, and trips past midnight run over 24:00. These
+helpers turn them into minutes and into UTC datetimes on a given day.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+
+def timetable_zone() -> ZoneInfo:
+    # CIF times are local wall-clock times
+    return ZoneInfo(os.getenv("TIMETABLE_TZ", "Europe/London"))
+
+
+def timetable_minute(value: str | None) -> int | None:
+    """Minutes past local midnight from an "HH:MM" (or CIF "HHMM") timetable time."""
+    if not value:
+        return None
+    value = value.strip().replace(":", "")
+    if len(value) != 4 or not value.isdigit():
+        return None
+    return int(value[:2]) * 60 + int(value[2:])
+
+
+def timetable_datetime(day: datetime, minute: int) -> datetime:
+    """
+    UTC datetime of a timetable minute on the local day of `day` (naive = UTC).
+    Minutes past 24h run into the next day, as CIF trips past midnight do.
+    """
+    zone = timetable_zone()
+    if day.tzinfo is None:
+        day = day.replace(tzinfo=timezone.utc)
+    midnight = datetime.combine(day.astimezone(zone).date(), datetime.min.time(), tzinfo=zone)
+    return (midnight + timedelta(minutes=minute)).astimezone(timezone.utc)
+
+
+def timetable_span(day: datetime, start_minute: int | None, end_minute: int | None) -> tuple[datetime | None, datetime | None]:
+    """(start, end) UTC datetimes of an official trip on the local day of `day`."""
+    if start_minute is None:
+        return None, None
+    if end_minute is not None and end_minute < start_minute:
+        end_minute += 24 * 60  # Runs past midnight
+    start = timetable_datetime(day, start_minute)
+    return start, timetable_datetime(day, end_minute) if end_minute is not None else None
@@ -2,9 +2,12 @@
 import json
 from datetime import datetime
 
-from app.models.Database import Base, engine, SessionLocal
+from app.models.Database import Base, SessionLocal, init_engine
 from app.models.Route import Route, Stop, RouteStop
+from app.Services.Catalog.builder import rebuild_snapshot
+from app.utils.fetch_timetable_cif import parse_cif_route_sequences
 
+engine = init_engine()
 db = SessionLocal()
 
 try:
@@ -44,119 +47,9 @@ try:
 
     # 2. Parse Metro.cif
     print("Parsing Metro.cif...")
-    with open("app/data/Metro.cif", "r", encoding="utf-8", errors="replace") as f:
-        lines = [line.rstrip("\n") for line in f if line.strip() and not line.startswith("#")]
-
-    routes = {}
-    route_sequences = {}
-    current_key = None
-    current_stops = []
-    current_direction_char = None
-
-    def save_current_sequence():
-        if current_key is None or len(current_stops) < 3:
-            return
-        existing = route_sequences.get(current_key, [])
-        if len(current_stops) > len(existing):
-            route_sequences[current_key] = current_stops[:]
-            print(f"Saved/updated sequence for {current_key:12} → {len(current_stops)} stops")
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        if line.startswith("QDN"):
-            save_current_sequence()
-            parts = line.split(maxsplit=3)
-            if len(parts) < 4:
-                continue
-            _, route_code, dir_char, description = parts
-            current_direction_char = dir_char
-            current_stops = []
-            temp_key = f"{route_code}-{dir_char}"
-            routes[temp_key] = {
-                "code": route_code,
-                "dir_char": dir_char,
-                "direction": "Outbound" if dir_char == "O" else "Inbound",
-                "name": f"{route_code} {description.strip()}",
-            }
-            current_key = temp_key
-
-        elif line.startswith("QSN") and current_key:
-            save_current_sequence()
-            parts = line.split()
-            variant_code = None
-            for idx in range(4, min(9, len(parts))):
-                p = parts[idx].strip("X")
-                if len(p) >= 1 and any(c.isdigit() for c in p) and p[0] not in ('2','0','1'):
-                    variant_code = p
-                    break
-            if not variant_code:
-                for p in parts[3:]:
-                    p = p.strip("X")
-                    if len(p) >= 1 and p[0].isdigit():
-                        variant_code = p
-                        break
-            if not variant_code and "code" in routes.get(current_key, {}):
-                variant_code = routes[current_key]["code"]
-            variant_code = variant_code or "UNKNOWN"
-            final_key = f"{variant_code}-{current_direction_char}"
-            if final_key != current_key and current_key in routes:
-                if final_key not in routes:
-                    routes[final_key] = routes.pop(current_key)
-            current_key = final_key
-            current_stops = []
-
-        elif line.startswith(("QO", "QI", "QT")) and current_key:
-            stop_id = line[2:14].strip()
-            if stop_id.startswith("7000") and len(stop_id) == 12:
-                current_stops.append(stop_id)
-
-    save_current_sequence()
-
-    # Cleanup invalid keys
-    to_remove = [k for k in route_sequences if not k or k.endswith("-") or "--" in k or k.count("-") < 1]
-    for bad in to_remove:
-        print(f"Removing invalid key: {bad}")
-        route_sequences.pop(bad, None)
-        routes.pop(bad, None)
-
-    # Normalize keys
-    normalized_routes = {}
-    normalized_sequences = {}
-    for old_key, seq in route_sequences.items():
-        if old_key not in routes:
-            continue
-        meta = routes[old_key]
-        code = meta.get("code")
-        if not code or code == "UNKNOWN":
-            possible = old_key.split("-")[0]
-            if any(c.isdigit() for c in possible) or len(possible) in (1,2,3):
-                code = possible
-            else:
-                continue
-        dir_char = meta.get("dir_char")
-        if not dir_char or dir_char not in ("O", "I"):
-            parts = old_key.split("-")
-            if len(parts) >= 2:
-                last = parts[-1].strip()
-                if last and last[0] in ("O", "I"):
-                    dir_char = last[0]
-                else:
-                    dir_char = "O"
-            else:
-                dir_char = "O"
-        new_key = f"{code}-{dir_char}"
-        if new_key not in normalized_sequences or len(seq) > len(normalized_sequences[new_key]):
-            normalized_sequences[new_key] = seq
-            normalized_routes[new_key] = meta
-
-    routes = normalized_routes
-    route_sequences = normalized_sequences
+    routes, route_sequences = parse_cif_route_sequences("app/data/Metro.cif")
 
     print(f"\nAfter normalization: {len(routes)} routes / {len(route_sequences)} sequences\n")
-
         # 3. Insert into database – FINAL VERSION WITH PER-ROUTE DEDUPLICATION
     print("Inserting routes and links (deduplicating stops per route)...")
 
@@ -239,8 +132,14 @@ try:
     print(f"  Duplicates within route skipped: {skipped_intra_route:,}")
     print("═" * 80 + "\n")
 
+    # 4. Snapshot for fast worker cold start. It also holds the compiled stop
+    #    sequences, which keep the repeated calls of loop routes skipped above.
+    print("Writing catalog snapshot (compiling stop sequences)...")
+    snapshot_file = rebuild_snapshot(db, cif_path="app/data/Metro.cif")
+    print(f"→ Snapshot written to {snapshot_file}\n")
+
     print("Start your API:")
-    print("  uvicorn main:app --reload")
+    print("  uvicorn main:create_app --factory --reload")
     print("\nQuick tests:")
     print("  http://127.0.0.1:8000/route/1A-O/stops")
     print("  http://127.0.0.1:8000/route/2F-O/stops")
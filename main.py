@@ -1,32 +1,88 @@
-"""Entry file for Bus tracker API"""
+"""
+Entry file for Bus tracker API.
+
+Nothing is built at import; run the factory:
+
+    uvicorn main:create_app --factory
+"""
+
+import threading
+import time
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers.Journey import router as journey_endpoint
-from app.routers.Route import router as routes_endpoint
-
-app = FastAPI(
-    title="Bus Tracker API",
-    description="API for managing Belfast bus journeys, routes, and related data",
-    version="0.1.0"
-)
-
-# CORS configuration
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"], 
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-app.include_router(journey_endpoint)
-app.include_router(routes_endpoint)
-
-@app.get("/")
-async def root():
-    return {"message": "Bus Tracker API is running"}
-
-@app.get("/health")
-async def health():
-    return {"status": "healthy", "code": 200}
\ No newline at end of file
+
+from app.utils.logger.logger import get_logger
+
+_import_started = time.perf_counter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy setup happens here, not at import, so /health is reachable as soon as possible
+    from app.models.Database import init_engine, dispose_engine
+    from app.Services.Catalog.snapshot import get_catalog
+    from app.Services.Scheduler.scheduler import build_local_scheduler
+
+    logger = get_logger()
+    started = time.perf_counter()
+    init_engine()
+    if get_catalog() is not None:
+        # Compile the planner network off the startup path
+        from app.Services.Planner.planner import get_network
+        threading.Thread(target=get_network, name="planner-compile", daemon=True).start()
+    logger.info(
+        f"[STARTUP] ready in {(time.perf_counter() - _import_started) * 1000:.0f} ms "
+        f"(lifespan {(time.perf_counter() - started) * 1000:.0f} ms)"
+    )
+    scheduler = build_local_scheduler()
+    scheduler.start()
+    yield
+    await scheduler.stop()
+    dispose_engine()
+
+
+def create_app() -> FastAPI:
+    """Build the API. Routers (and through them models and services) are imported here."""
+    from app.utils.responses import FastJSONResponse
+
+    app = FastAPI(
+        title="Bus Tracker API",
+        description="API for managing Belfast bus journeys, routes, and related data",
+        version="0.1.0",
+        lifespan=lifespan,
+        default_response_class=FastJSONResponse,
+    )
+
+    # CORS configuration
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"], 
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    from app.utils.profiling import install_profiling
+    install_profiling(app)
+
+    @app.get("/")
+    async def root():
+        return {"message": "Bus Tracker API is running"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy", "code": 200}
+
+    from app.routers.Journey import router as journey_endpoint
+    from app.routers.Route import router as routes_endpoint
+    from app.routers.Internal import router as internal_endpoint
+    from app.routers.Plan import router as plan_endpoint
+
+    app.include_router(journey_endpoint)
+    app.include_router(routes_endpoint)
+    app.include_router(plan_endpoint)
+    app.include_router(internal_endpoint)
+
+    return app
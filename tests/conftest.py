@@ -0,0 +1,24 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+
+@pytest.fixture
+def db(tmp_path):
+    """A session on a fresh SQLite database with every table created."""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import Session
+
+    import app.models.Journey, app.models.Reliability, app.models.Route  # noqa: F401  (register tables)
+    from app.models.Database import Base
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
@@ -0,0 +1,172 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from app.dependencies.admission import PRIORITY_EVENT, PRIORITY_START, AdmissionController
+
+
+def _controller(limit=1, reserve=0, max_queue=1, event_deadline=1.0, start_deadline=1.0):
+    return AdmissionController(
+        limit=limit,
+        reserve=reserve,
+        max_queue=max_queue,
+        deadlines={PRIORITY_EVENT: event_deadline, PRIORITY_START: start_deadline},
+    )
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_event_evicts_newest_waiting_start():
+    async def run():
+        controller = _controller()
+        await controller.acquire(PRIORITY_START)
+        waiting_start = asyncio.create_task(controller.acquire(PRIORITY_START))
+        await _settle()
+        event = asyncio.create_task(controller.acquire(PRIORITY_EVENT))
+        await _settle()
+
+        with pytest.raises(HTTPException) as shed:
+            await waiting_start
+        assert shed.value.status_code == 503
+        assert "Retry-After" in shed.value.headers
+
+        controller.release(0.01)
+        await event
+        assert controller.active == 1
+        assert controller.shed["start"] == 1 and controller.shed["event"] == 0
+
+    asyncio.run(run())
+
+
+def test_start_shed_after_deadline():
+    async def run():
+        controller = _controller(start_deadline=0.01)
+        await controller.acquire(PRIORITY_START)
+        with pytest.raises(HTTPException) as shed:
+            await controller.acquire(PRIORITY_START)
+        assert shed.value.status_code == 503
+        assert controller.stats()["queued"] == 0
+
+        # The slot is free again once the holder finishes
+        controller.release(0.01)
+        await controller.acquire(PRIORITY_START)
+        assert controller.active == 1
+
+    asyncio.run(run())
+
+
+def test_stale_waiter_is_not_evicted():
+    async def run():
+        controller = _controller()
+        await controller.acquire(PRIORITY_START)
+        waiting_start = asyncio.create_task(controller.acquire(PRIORITY_START))
+        await _settle()
+        # The start's deadline has fired but its task hasn't resumed to leave the queue yet
+        controller._waiters[0][2].cancel()
+
+        event = asyncio.create_task(controller.acquire(PRIORITY_EVENT))
+        await _settle()
+        assert not event.done()
+
+        controller.release(0.01)
+        await event
+        await asyncio.gather(waiting_start, return_exceptions=True)
+        assert controller.active == 1
+        assert controller.stats()["queued"] == 0
+
+    asyncio.run(run())
+
+
+def test_stale_waiter_does_not_block_fast_path():
+    async def run():
+        controller = _controller(limit=2, max_queue=2)
+        await controller.acquire(PRIORITY_EVENT)
+        await controller.acquire(PRIORITY_EVENT)
+        waiting = asyncio.create_task(controller.acquire(PRIORITY_EVENT))
+        await _settle()
+        controller._waiters[0][2].cancel()
+        controller.active -= 1  # A holder finished without waking anyone
+
+        await asyncio.wait_for(controller.acquire(PRIORITY_START), timeout=0.1)
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_back_its_slot():
+    async def request(controller, priority, hold):
+        await controller.acquire(priority)
+        try:
+            await hold.wait()
+        finally:
+            controller.release(0.01)
+
+    async def run():
+        controller = _controller(max_queue=2)
+        hold = asyncio.Event()
+        holder = asyncio.create_task(request(controller, PRIORITY_EVENT, hold))
+        await _settle()
+
+        # Cancelled while queued: never took a slot
+        queued = asyncio.create_task(request(controller, PRIORITY_EVENT, hold))
+        await _settle()
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert controller.active == 1 and controller.stats()["queued"] == 0
+
+        # Cancelled just after being handed the slot: it must come back
+        handed = asyncio.create_task(request(controller, PRIORITY_EVENT, hold))
+        await _settle()
+        hold.set()
+        await holder
+        handed.cancel()
+        await asyncio.gather(handed, return_exceptions=True)
+        assert controller.active == 0
+
+        await asyncio.wait_for(controller.acquire(PRIORITY_START), timeout=0.1)
+
+    asyncio.run(run())
+
+
+def test_bad_settings_are_rejected(monkeypatch):
+    from app.dependencies import admission
+
+    admission.get_admission_controller.reset()
+    monkeypatch.setenv("ADMISSION_MAX_CONCURRENT", "4")
+    monkeypatch.setenv("ADMISSION_MAX_QUEUE", "0")
+    with pytest.raises(ValueError, match="ADMISSION_MAX_QUEUE"):
+        admission.get_admission_controller()
+
+    monkeypatch.setenv("ADMISSION_MAX_QUEUE", "ten")
+    with pytest.raises(ValueError, match="ADMISSION_MAX_QUEUE"):
+        admission.get_admission_controller()
+    admission.get_admission_controller.reset()
+
+
+def test_verified_events_go_before_unverified_and_starts():
+    from app.dependencies.admission import PRIORITY_UNVERIFIED_EVENT
+
+    async def run():
+        controller = AdmissionController(
+            limit=1, reserve=0, max_queue=3,
+            deadlines={PRIORITY_EVENT: 1.0, PRIORITY_UNVERIFIED_EVENT: 1.0, PRIORITY_START: 1.0},
+        )
+        await controller.acquire(PRIORITY_START)
+        order = []
+
+        async def request(priority):
+            await controller.acquire(priority)
+            order.append(priority)
+            controller.release(0.01)
+
+        tasks = [asyncio.create_task(request(p)) for p in (PRIORITY_START, PRIORITY_UNVERIFIED_EVENT, PRIORITY_EVENT)]
+        await _settle()
+        controller.release(0.01)
+        await asyncio.gather(*tasks)
+        assert order == [PRIORITY_EVENT, PRIORITY_UNVERIFIED_EVENT, PRIORITY_START]
+
+    asyncio.run(run())
@@ -0,0 +1,145 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.models.Journey import Journey
+from app.Services.Archive import archive
+from app.Services.Archive.archive import COLUMNS, JourneyArchiver, read_part, scan, write_part
+
+
+def _at(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def _row(end_time: datetime, **values) -> dict:
+    row = {name: None for name, _ in COLUMNS}
+    row.update(
+        id=str(uuid.uuid4()),
+        start_stop_id="S1",
+        end_stop_id="S2",
+        start_time=end_time - timedelta(minutes=20),
+        end_time=end_time,
+        created_at=end_time - timedelta(minutes=25),
+        status="STOP_REACHED",
+        predicted_status="on_time",
+        data_source="user",
+        is_synthetic=False,
+    )
+    row.update(values)
+    return row
+
+
+def _write(root, route_id, month, rows):
+    return write_part(root / f"route={route_id}" / f"month={month}", rows)
+
+
+def test_part_round_trip(tmp_path):
+    rows = [
+        _row(_at(2026, 1, 5, 8, 30), quality_flag="ok", is_synthetic=True),
+        _row(_at(2026, 1, 6, 9, 15), start_time=None, end_stop_id=None),
+    ]
+    decoded = read_part(_write(tmp_path, "R1", "2026-01", rows))
+
+    assert decoded["id"] == [row["id"] for row in rows]
+    assert decoded["end_time"] == [row["end_time"] for row in rows]
+    assert decoded["start_time"] == [rows[0]["start_time"], None]
+    assert decoded["end_stop_id"] == ["S2", None]
+    assert decoded["is_synthetic"] == [True, False]
+    assert decoded["quality_flag"] == ["ok", None]
+
+
+def test_read_part_decodes_only_requested_columns(tmp_path):
+    path = _write(tmp_path, "R1", "2026-01", [_row(_at(2026, 1, 5, 8, 30))])
+    assert set(read_part(path, ("status", "end_time"))) == {"status", "end_time"}
+
+
+def test_scan_projects_columns(tmp_path):
+    _write(tmp_path, "R1", "2026-01", [_row(_at(2026, 1, 5, 8, 30))])
+    (row,) = scan(columns=("status",), root=str(tmp_path))
+    assert set(row) == {"status", "id", "end_time", "route_id"}
+    assert row["status"] == "STOP_REACHED" and row["route_id"] == "R1"
+
+
+def test_scan_prunes_partitions(tmp_path, monkeypatch):
+    _write(tmp_path, "R1", "2026-01", [_row(_at(2026, 1, 5, 8, 30))])
+    _write(tmp_path, "R1", "2026-02", [_row(_at(2026, 2, 5, 8, 30)), _row(_at(2026, 2, 20, 8, 30))])
+    _write(tmp_path, "R2", "2026-02", [_row(_at(2026, 2, 6, 8, 30))])
+
+    opened = []
+    real_read_part = archive.read_part
+    monkeypatch.setattr(archive, "read_part", lambda path, columns=None: opened.append(path) or real_read_part(path, columns))
+
+    rows = list(scan(route_id="R1", since=_at(2026, 2, 1), until=_at(2026, 2, 10), root=str(tmp_path)))
+    assert [row["end_time"] for row in rows] == [_at(2026, 2, 5, 8, 30)]
+    # Only R1's February part was opened; the 20th was filtered per row
+    assert [(p.parent.parent.name, p.parent.name) for p in opened] == [("route=R1", "month=2026-02")]
+
+    newest = list(scan(root=str(tmp_path), newest_first=True, columns=("end_time",)))
+    assert [row["end_time"].month for row in newest] == [2, 2, 2, 1]
+
+
+def test_scan_drops_journeys_archived_twice(tmp_path):
+    row = _row(_at(2026, 1, 5, 8, 30))
+    _write(tmp_path, "R1", "2026-01", [row])
+    _write(tmp_path, "R1", "2026-01", [row, _row(_at(2026, 1, 6, 8, 30))])
+    assert len(list(scan(root=str(tmp_path)))) == 2
+
+
+def test_older_parts_with_string_times_decode_to_datetimes(tmp_path, monkeypatch):
+    monkeypatch.setenv("TIMETABLE_TZ", "Europe/London")
+    legacy_columns = tuple((name, "str" if name in archive.LEGACY_TIME_COLUMNS else kind) for name, kind in COLUMNS)
+    monkeypatch.setattr(archive, "COLUMNS", legacy_columns)
+    rows = [
+        _row(_at(2026, 7, 1, 8, 45), planned_start_time=_at(2026, 7, 1, 7, 50),
+             predicted_arrival="2026-07-01 08:45:00", official_start_time="08:55", official_end_time="09:40"),
+        _row(_at(2026, 1, 25, 0, 25), created_at=_at(2026, 1, 24, 23, 0),
+             official_start_time="23:50", official_end_time="00:20"),
+        _row(_at(2026, 1, 24, 9, 0), predicted_arrival="soon", official_start_time="8:5"),
+    ]
+    path = _write(tmp_path, "R1", "2026-01", rows)
+    monkeypatch.undo()
+    monkeypatch.setenv("TIMETABLE_TZ", "Europe/London")
+
+    decoded = read_part(path)
+    assert decoded["predicted_arrival"] == [_at(2026, 7, 1, 8, 45), None, None]
+    # Local timetable times placed on the journey's local day, as the DB migration does
+    assert decoded["official_start_time"] == [_at(2026, 7, 1, 7, 55), _at(2026, 1, 24, 23, 50), None]
+    assert decoded["official_end_time"] == [_at(2026, 7, 1, 8, 40), _at(2026, 1, 25, 0, 20), None]
+
+    # Asking for one of the pair still places it using the other's day and time
+    (row, *_) = scan(columns=("official_end_time",), root=str(tmp_path))
+    assert row["official_end_time"] == _at(2026, 7, 1, 8, 40)
+
+
+def _journey(end_time: datetime, route_id="R1", status="STOP_REACHED") -> Journey:
+    return Journey(
+        id=str(uuid.uuid4()), route_id=route_id, start_stop_id="S1", end_stop_id="S2",
+        start_time=end_time - timedelta(minutes=20), end_time=end_time, status=status,
+        created_at=end_time - timedelta(minutes=25), predicted_status="on_time", data_source="user",
+    )
+
+
+def test_archive_completed_moves_old_journeys_part_by_part(db, tmp_path, monkeypatch):
+    old = datetime.utcnow() - timedelta(days=60)
+    journeys = [_journey(old + timedelta(minutes=i), route_id=f"R{i % 2}") for i in range(5)]
+    recent = _journey(datetime.utcnow() - timedelta(days=1))
+    active = _journey(old, status="ACTIVE")
+    db.add_all(journeys + [recent, active])
+    db.commit()
+    archived_ids = sorted(journey.id for journey in journeys)
+    kept_ids = {recent.id, active.id}
+
+    monkeypatch.setattr(archive, "PART_ROWS", 2)
+    commits = []
+    real_commit = db.commit
+    monkeypatch.setattr(db, "commit", lambda: commits.append(1) or real_commit())
+
+    root = tmp_path / "archive"
+    assert JourneyArchiver.archive_completed(db, older_than_days=30, root=str(root)) == 5
+    assert len(commits) == len(list(root.rglob("*.jcol"))) >= 3
+
+    remaining = {journey.id for journey in db.query(Journey)}
+    assert remaining == kept_ids
+    assert sorted(row["id"] for row in scan(root=str(root))) == archived_ids
+
+    # Nothing left to archive: a rerun writes nothing
+    assert JourneyArchiver.archive_completed(db, older_than_days=30, root=str(root)) == 0
@@ -0,0 +1,147 @@
+import hashlib
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from app.dependencies.client_access import TokenVerifier, client_access, get_token_verifier
+from app.dependencies.internal_access import KeyRing, get_keyring, internal_access
+
+SECRET = "test-secret-long-enough-for-hs256-keys"
+
+
+@pytest.fixture
+def auth_env(monkeypatch):
+    """Set INTERNAL_API_KEY / JWT_SECRET (None = unset) and reload both."""
+    def configure(key=None, secret=None):
+        for name, value in (("INTERNAL_API_KEY", key), ("JWT_SECRET", secret)):
+            if value is None:
+                monkeypatch.delenv(name, raising=False)
+            else:
+                monkeypatch.setenv(name, value)
+        for name in ("INTERNAL_API_KEY_HASHES", "JWT_PUBLIC_KEY", "JWT_AUDIENCE", "JWT_ISSUER"):
+            monkeypatch.delenv(name, raising=False)
+        get_keyring.reset()
+        get_token_verifier.reset()
+
+    yield configure
+    get_keyring.reset()
+    get_token_verifier.reset()
+
+
+def _token(exp_in: float = 300, **claims) -> str:
+    return jwt.encode({"sub": "rider-1", "exp": time.time() + exp_in, **claims}, SECRET, algorithm="HS256")
+
+
+def _status(func, *args):
+    try:
+        func(*args)
+    except HTTPException as e:
+        return e.status_code
+    return 200
+
+
+def test_open_only_without_keys_or_jwt(auth_env):
+    auth_env()
+    assert client_access(None, None) is None
+    assert client_access("anything", None) is None
+    assert _status(internal_access, None) == 200
+
+
+def test_keys_without_jwt(auth_env):
+    auth_env(key="k1")
+    assert client_access("k1", None) is None
+    assert _status(client_access, "wrong", None) == 403
+    assert _status(client_access, None, None) == 403
+    assert _status(internal_access, "k1") == 200
+    assert _status(internal_access, None) == 403
+
+
+def test_jwt_without_keys_is_never_open(auth_env):
+    auth_env(secret=SECRET)
+    assert _status(client_access, None, None) == 401
+    assert _status(client_access, "anything", None) == 403
+    assert _status(client_access, None, "Bearer not-a-token") == 401
+    assert _status(client_access, None, "Basic abc") == 401
+    assert client_access(None, f"Bearer {_token()}")["sub"] == "rider-1"
+    assert _status(internal_access, None) == 403
+    assert _status(internal_access, "anything") == 403
+
+
+def test_jwt_with_keys(auth_env):
+    auth_env(key="k1", secret=SECRET)
+    assert client_access("k1", None) is None
+    assert client_access(None, f"Bearer {_token()}")["sub"] == "rider-1"
+    # A bad key doesn't spoil a good token
+    assert client_access("wrong", f"Bearer {_token()}")["sub"] == "rider-1"
+    assert _status(client_access, "wrong", None) == 403
+    assert _status(client_access, None, None) == 401
+    assert _status(client_access, None, f"Bearer {_token(exp_in=-10)}") == 401
+
+
+def test_keyring_takes_keys_and_digests(monkeypatch):
+    monkeypatch.setenv("INTERNAL_API_KEY", " k1 , k2 ")
+    monkeypatch.setenv("INTERNAL_API_KEY_HASHES", hashlib.sha256(b"k3").hexdigest())
+    keyring = KeyRing.from_env()
+
+    assert keyring.configured
+    assert all(keyring.check(key) for key in ("k1", "k2", "k3"))
+    assert not keyring.check("k4")
+    assert not keyring.check(None)
+
+
+def test_empty_keyring_is_open_unless_told_otherwise():
+    keyring = KeyRing([])
+    assert not keyring.configured
+    assert keyring.check(None)
+    assert not keyring.check("anything", open_when_unset=False)
+
+
+def _counting_verifier(monkeypatch, **kwargs) -> tuple[TokenVerifier, list]:
+    verifier = TokenVerifier(SECRET, ["HS256"], **kwargs)
+    calls = []
+    decode = verifier._jwt.decode
+
+    def counting_decode(*args, **decode_kwargs):
+        calls.append(1)
+        return decode(*args, **decode_kwargs)
+
+    monkeypatch.setattr(verifier, "_jwt", type("Jwt", (), {
+        "decode": staticmethod(counting_decode),
+        "InvalidTokenError": jwt.InvalidTokenError,
+    }))
+    return verifier, calls
+
+
+def test_verified_token_is_cached(monkeypatch):
+    verifier, calls = _counting_verifier(monkeypatch)
+    token = _token()
+
+    assert verifier.verify(token)["sub"] == "rider-1"
+    assert verifier.verify(token)["sub"] == "rider-1"
+    assert len(calls) == 1
+    assert verifier.stats()["verified"] == 1 and verifier.stats()["hits"] == 1
+
+
+def test_rejected_token_is_cached(monkeypatch):
+    verifier, calls = _counting_verifier(monkeypatch)
+
+    assert verifier.verify("not-a-token") is None
+    assert verifier.verify("not-a-token") is None
+    assert len(calls) == 1
+    assert verifier.verified == 0
+
+
+def test_cached_token_stops_working_at_expiry(monkeypatch):
+    verifier, calls = _counting_verifier(monkeypatch)
+    expires_at = int(time.time()) + 2  # PyJWT compares whole seconds
+    token = jwt.encode({"sub": "rider-1", "exp": expires_at}, SECRET, algorithm="HS256")
+    assert verifier.verify(token) is not None
+    assert verifier.verify(token) is not None
+    assert len(calls) == 1
+
+    # Past `exp` the cached claims aren't trusted; the token is checked again and rejected
+    time.sleep(expires_at + 0.05 - time.time())
+    assert verifier.verify(token) is None
+    assert len(calls) == 2
@@ -0,0 +1,183 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.Services.Prediction.cache import PredictionCache
+from app.utils import ttl_cache
+from app.utils.lazy import lazy_singleton
+from app.utils.ttl_cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ttl_cache.time, "monotonic", clock)
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=5)
+
+    clock.now += 10
+    assert cache.get("short") is None
+    assert cache.get("default") == 1
+
+    clock.now += 60
+    assert cache.get("default") is None
+    assert len(cache) == 0
+    assert cache.stats()["misses"] == 2
+
+
+def _key(cache, route_id="R1"):
+    return cache.key(route_id, "S1", "S2", datetime(2026, 1, 24, 8, 1, tzinfo=timezone.utc))
+
+
+def test_prediction_cache_serves_hits_without_recomputing():
+    cache = PredictionCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 600.0, "on_time"
+
+    assert cache.get_or_compute(_key(cache), compute) == (600.0, "on_time")
+    assert cache.get_or_compute(_key(cache), compute) == (600.0, "on_time")
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_prediction_cache_buckets_start_times():
+    cache = PredictionCache(bucket_minutes=5)
+    early = cache.key("R1", "S1", "S2", datetime(2026, 1, 24, 8, 1, tzinfo=timezone.utc))
+    late = cache.key("R1", "S1", "S2", datetime(2026, 1, 24, 8, 4, tzinfo=timezone.utc))
+    next_bucket = cache.key("R1", "S1", "S2", datetime(2026, 1, 24, 8, 6, tzinfo=timezone.utc))
+    assert early == late != next_bucket
+
+
+def test_prediction_cache_coalesces_concurrent_misses():
+    cache = PredictionCache()
+    started = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return 600.0, "on_time"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute(_key(cache), compute)))
+    leader.start()
+    started.wait(1)
+    followers = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute(_key(cache), compute)))
+        for _ in range(4)
+    ]
+    for thread in followers:
+        thread.start()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert results == [(600.0, "on_time")] * 5
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 4
+
+
+def test_prediction_cache_invalidates_one_route():
+    cache = PredictionCache()
+    cache.get_or_compute(_key(cache, "R1"), lambda: (600.0, "on_time"))
+    cache.get_or_compute(_key(cache, "R2"), lambda: (900.0, "on_time"))
+
+    cache.invalidate_route("R1")
+
+    assert cache.get_or_compute(_key(cache, "R1"), lambda: (700.0, "delayed")) == (700.0, "delayed")
+    assert cache.get_or_compute(_key(cache, "R2"), lambda: (0.0, "unused")) == (900.0, "on_time")
+
+
+def test_prediction_cache_drops_result_computed_across_invalidation():
+    cache = PredictionCache()
+
+    def compute():
+        cache.invalidate_route("R1")  # A journey completed while we were computing
+        return 600.0, "on_time"
+
+    cache.get_or_compute(_key(cache), compute)
+    assert cache.get_or_compute(_key(cache), lambda: (700.0, "delayed")) == (700.0, "delayed")
+
+
+def test_lazy_singleton_builds_once_until_reset():
+    built = []
+
+    @lazy_singleton
+    def get_thing():
+        built.append(object())
+        return built[-1]
+
+    assert get_thing() is get_thing()
+    assert len(built) == 1
+
+    get_thing.reset()
+    assert get_thing() is built[1]
+
+
+def test_lazy_singleton_keeps_none():
+    built = []
+
+    @lazy_singleton
+    def get_nothing():
+        built.append(1)
+        return None
+
+    assert get_nothing() is None and get_nothing() is None
+    assert len(built) == 1
+
+
+def _route_names(monkeypatch, db, catalog) -> list[list[str]]:
+    import json
+
+    from starlette.requests import Request
+
+    from app.models.Route import Route
+    from app.routers import Route as route_router
+    from app.utils.responses import get_response_cache
+
+    monkeypatch.setattr(route_router, "get_catalog", lambda: catalog)
+    get_response_cache.reset()
+    request = Request({"type": "http", "headers": []})
+    served = []
+    try:
+        for route_id in ("1", "2"):
+            db.add(Route(id=route_id, name=f"Route {route_id}"))
+            db.commit()
+            response = route_router.get_routes(request, db)
+            served.append([route["name"] for route in json.loads(response.body)])
+    finally:
+        get_response_cache.reset()
+    return served
+
+
+def test_route_list_from_the_db_is_not_cached(monkeypatch, db):
+    # No snapshot, so no version to key on: a re-ingest shows up at once
+    assert _route_names(monkeypatch, db, None) == [["Route 1"], ["Route 1", "Route 2"]]
+
+
+def test_route_list_is_cached_per_snapshot(monkeypatch, db):
+    catalog = type("Catalog", (), {"mtime": 1.0})()
+    assert _route_names(monkeypatch, db, catalog) == [["Route 1"], ["Route 1"]]
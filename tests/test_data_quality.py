@@ -0,0 +1,105 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.models.Journey import Journey
+from app.Services.Prediction.data_quality import (
+    FLAG_IMPLAUSIBLE,
+    FLAG_INCOMPLETE,
+    FLAG_OK,
+    FLAG_OUTLIER,
+    FLAG_SYNTHETIC,
+    DurationQualityCheck,
+)
+
+# 20 minutes give or take a little, MAD 60s
+BASELINE = [1200.0 + offset for offset in (-120, -60, -60, 0, 0, 0, 60, 60, 120, 180)] * 2
+
+
+def test_implausible_bounds():
+    assert DurationQualityCheck.score(59, BASELINE) == FLAG_IMPLAUSIBLE
+    assert DurationQualityCheck.score(4 * 3600 + 1, BASELINE) == FLAG_IMPLAUSIBLE
+    # Checked even without a baseline
+    assert DurationQualityCheck.score(30, []) == FLAG_IMPLAUSIBLE
+    assert DurationQualityCheck.score(60, BASELINE[:5]) == FLAG_OK
+
+
+def test_too_small_baseline_accepts_plausible_durations():
+    assert DurationQualityCheck.score(3 * 3600, BASELINE[:DurationQualityCheck.MIN_BASELINE - 1]) == FLAG_OK
+
+
+def test_modified_z_score():
+    # |0.6745 * (x - 1200) / 60| > 3.5 beyond about 311s from the median
+    assert DurationQualityCheck.score(1500, BASELINE) == FLAG_OK
+    assert DurationQualityCheck.score(900, BASELINE) == FLAG_OK
+    assert DurationQualityCheck.score(1520, BASELINE) == FLAG_OUTLIER
+    assert DurationQualityCheck.score(880, BASELINE) == FLAG_OUTLIER
+
+
+def test_iqr_fence_when_most_durations_are_identical():
+    # MAD is 0 (six identical values), so the 3 x IQR fence around 600..800 decides
+    baseline = [600.0] * 6 + [700.0, 800.0, 900.0, 1000.0]
+    assert DurationQualityCheck.score(1400, baseline) == FLAG_OK
+    assert DurationQualityCheck.score(1401, baseline) == FLAG_OUTLIER
+
+    # No spread at all: nothing to judge against
+    assert DurationQualityCheck.score(3000, [600.0] * 10) == FLAG_OK
+
+
+def _journey(end_time: datetime, duration_sec: float, **values) -> Journey:
+    fields = dict(
+        id=str(uuid.uuid4()), route_id="R1", start_stop_id="S1", end_stop_id="S2",
+        start_time=end_time - timedelta(seconds=duration_sec), end_time=end_time,
+        status="STOP_REACHED", created_at=end_time - timedelta(seconds=duration_sec + 60),
+        predicted_status="on_time", data_source="user", is_synthetic=False,
+    )
+    fields.update(values)
+    return Journey(**fields)
+
+
+def test_apply_flags_synthetic_and_incomplete(db):
+    now = datetime(2026, 1, 24, 8, 0)
+    assert DurationQualityCheck.apply(db, _journey(now, 600, is_synthetic=True)) == FLAG_SYNTHETIC
+    assert DurationQualityCheck.apply(db, _journey(now, 600, start_time=None)) == FLAG_INCOMPLETE
+
+
+def test_apply_scores_against_the_route_baseline(db):
+    start = datetime(2026, 1, 1, 8, 0)
+    for i, duration in enumerate(BASELINE):
+        db.add(_journey(start + timedelta(hours=i), duration, quality_flag=FLAG_OK))
+    # Neither synthetic nor other routes' journeys feed the baseline
+    db.add(_journey(start, 5000, is_synthetic=True, quality_flag=FLAG_SYNTHETIC))
+    db.add(_journey(start, 5000, route_id="R2", quality_flag=FLAG_OK))
+    db.commit()
+
+    # end_time just set (aware) against start_time read back naive
+    end = datetime(2026, 1, 3, 8, 0, tzinfo=timezone.utc)
+    journey = _journey(end, 1250)
+    journey.start_time = journey.start_time.replace(tzinfo=None)
+    assert DurationQualityCheck.apply(db, journey) == FLAG_OK
+    assert journey.quality_flag == FLAG_OK
+    assert DurationQualityCheck.apply(db, _journey(end, 2400)) == FLAG_OUTLIER
+
+
+def test_baseline_follows_a_shift_in_route_duration(db):
+    moment = datetime(2026, 1, 1, 8, 0)
+    for duration in BASELINE * 4:  # 80 journeys around 20 min
+        moment += timedelta(minutes=30)
+        db.add(_journey(moment, duration, quality_flag=FLAG_OK))
+    db.commit()
+
+    # A diversion: journeys now take about 40 min
+    flags = []
+    for duration in [2400.0 + offset for offset in (-60, 0, 60, 0, 120, -120, 60, 0, -60, 0, 60, 0, 0, 60, -60)]:
+        moment += timedelta(minutes=30)
+        journey = _journey(moment, duration)
+        flags.append(DurationQualityCheck.apply(db, journey))
+        db.add(journey)
+        db.commit()
+
+    first_ok = flags.index(FLAG_OK)
+    assert flags[:first_ok] == [FLAG_OUTLIER] * first_ok
+    assert first_ok == DurationQualityCheck.MIN_BASELINE
+    assert set(flags[first_ok:]) == {FLAG_OK}
+
+    # The old duration is now the outlier
+    assert DurationQualityCheck.apply(db, _journey(moment + timedelta(minutes=30), 1200)) == FLAG_OUTLIER
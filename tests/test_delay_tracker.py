@@ -0,0 +1,101 @@
+import math
+
+import pytest
+
+from app.Services.Prediction.delay_tracker import DelayTracker, get_delay_tracker
+
+TAU = 600.0
+
+
+def test_one_fresh_report_gives_half_its_value():
+    tracker = DelayTracker(tau_seconds=TAU)
+    tracker.observe("R1", 120, now=0)
+    assert tracker.correction("R1", now=0) == pytest.approx(60)
+
+
+def test_several_reports_give_nearly_all_of_it():
+    tracker = DelayTracker(tau_seconds=TAU)
+    for _ in range(9):
+        tracker.observe("R1", 120, now=0)
+    assert tracker.correction("R1", now=0) == pytest.approx(120 * 9 / 10)
+
+
+def test_correction_decays_with_tau():
+    tracker = DelayTracker(tau_seconds=TAU)
+    tracker.observe("R1", 120, now=0)
+
+    for elapsed in (TAU, 3 * TAU):
+        weight = math.exp(-elapsed / TAU)
+        assert tracker.correction("R1", now=elapsed) == pytest.approx(120 * weight / (weight + 1))
+    # A quiet route drifts back to its baseline
+    assert tracker.correction("R1", now=20 * TAU) == pytest.approx(0, abs=1e-6)
+
+
+def test_old_reports_weigh_less_than_new_ones():
+    tracker = DelayTracker(tau_seconds=TAU)
+    tracker.observe("R1", 600, now=0)
+    tracker.observe("R1", 0, now=TAU)
+
+    old = math.exp(-1)
+    value = 600 * old / (old + 1)
+    assert tracker.correction("R1", now=TAU) == pytest.approx(value * (old + 1) / (old + 2))
+
+
+def test_shorter_tau_forgets_faster():
+    slow, fast = DelayTracker(tau_seconds=1200), DelayTracker(tau_seconds=300)
+    for tracker in (slow, fast):
+        tracker.observe("R1", 300, now=0)
+    assert fast.correction("R1", now=600) < slow.correction("R1", now=600)
+
+
+def test_segment_falls_back_to_route_signal():
+    tracker = DelayTracker(tau_seconds=TAU)
+    for _ in range(4):
+        tracker.observe("R1", 60, now=0)
+    tracker.observe("R1", 600, segment=("S1", "S2"), now=0)
+    tracker.observe("R1", 600, segment=("S1", "S2"), now=0)
+
+    # Two fresh segment reports are enough evidence of their own
+    assert tracker.correction("R1", segment=("S1", "S2"), now=0) == pytest.approx(600 * 2 / 3)
+    # After a tau their weight is below one and the route signal is used
+    route = tracker.correction("R1", now=TAU)
+    assert tracker.correction("R1", segment=("S1", "S2"), now=TAU) == pytest.approx(route)
+    assert tracker.correction("R2", now=0) == 0.0
+
+
+def test_out_of_bounds_delays_are_rejected():
+    tracker = DelayTracker(tau_seconds=TAU, max_late_seconds=1800, max_early_seconds=600)
+
+    # An hour out: a naive local time read as UTC
+    assert tracker.observe("R1", 3600, segment=("S1", "S2"), now=0) is False
+    assert tracker.observe("R1", -601, now=0) is False
+    assert tracker.correction("R1", now=0) == 0.0
+    assert tracker.correction("R1", segment=("S1", "S2"), now=0) == 0.0
+
+    # The bounds themselves are accepted
+    assert tracker.observe("R1", 1800, now=0) is True
+    assert tracker.observe("R1", -600, now=0) is True
+    assert tracker.stats() == {"keys": 1, "observations": 2, "rejected": 2, "tau_seconds": TAU}
+
+
+def test_idle_keys_are_pruned_when_full(monkeypatch):
+    tracker = DelayTracker(tau_seconds=TAU)
+    monkeypatch.setattr(tracker, "MAX_KEYS", 3)
+    for route in ("R1", "R2", "R3"):
+        tracker.observe(route, 60, now=0)
+    tracker.observe("R4", 60, now=10 * TAU)
+    assert tracker.stats()["keys"] == 1
+
+
+def test_settings_come_from_env(monkeypatch):
+    monkeypatch.setenv("LIVE_DELAY_TAU_SECONDS", "120")
+    monkeypatch.setenv("LIVE_DELAY_MAX_LATE_SECONDS", "900")
+    monkeypatch.setenv("LIVE_DELAY_MAX_EARLY_SECONDS", "60")
+    get_delay_tracker.reset()
+    try:
+        tracker = get_delay_tracker()
+        assert (tracker.tau, tracker.max_late, tracker.max_early) == (120, 900, 60)
+        assert tracker.observe("R1", 901, now=0) is False
+        assert tracker.observe("R1", -61, now=0) is False
+    finally:
+        get_delay_tracker.reset()
@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models import Database
+from app.models.Journey import Journey
+from app.Services.Archive.archive import COLUMNS as ARCHIVE_COLUMNS, write_part
+from app.Services.journeyService.export import COLUMNS, JourneyExport
+
+
+def _journey(journey_id: str, created_at: datetime, route_id: str = "R1", **values) -> dict:
+    fields = dict(
+        id=journey_id, route_id=route_id, start_stop_id="S1", end_stop_id="S2",
+        planned_start_time=created_at + timedelta(minutes=5), start_time=created_at + timedelta(minutes=7),
+        end_time=created_at + timedelta(minutes=30), status="STOP_REACHED", created_at=created_at,
+        predicted_status="on_time", predicted_arrival=None, official_start_time=None, official_end_time=None,
+        data_source="user", is_synthetic=False, quality_flag="ok",
+    )
+    fields.update(values)
+    return fields
+
+
+def _archive(root, journeys: list[dict]):
+    route_id = journeys[0]["route_id"]
+    month = journeys[0]["end_time"].strftime("%Y-%m")
+    rows = [{name: journey[name] for name, _ in ARCHIVE_COLUMNS} for journey in journeys]
+    write_part(root / f"route={route_id}" / f"month={month}", rows)
+
+
+@pytest.fixture
+def journeys(db, tmp_path, monkeypatch):
+    """j1-j3 hot, j4-j5 archived, j3 in both (an archive run stopped before its delete)."""
+    monkeypatch.setattr(Database, "engine", db.get_bind())
+    day = datetime(2026, 1, 5, 8, 0)
+    hot = [_journey(f"j{i}", day + timedelta(days=i)) for i in (1, 2, 3)]
+    hot.append(_journey("other", day, route_id="R2", data_source="official"))
+    for journey in hot:
+        db.add(Journey(**journey))
+    db.commit()
+
+    archived = [hot[2]] + [_journey(f"j{i}", day - timedelta(hours=i)) for i in (4, 5)]
+    _archive(tmp_path, archived)
+    return str(tmp_path)
+
+
+def _ndjson(filters: dict, root: str) -> list[dict]:
+    statement = JourneyExport.statement(**filters)
+    body = b"".join(JourneyExport.stream("ndjson", statement, size=2, archived={**filters, "root": root}))
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def test_ndjson_exports_hot_then_archived_once_each(journeys):
+    rows = _ndjson({"route_id": "R1"}, journeys)
+
+    assert [row["id"] for row in rows] == ["j1", "j2", "j3", "j4", "j5"]
+    assert set(rows[0]) == set(COLUMNS)
+    # Naive columns come out naive from both sources
+    assert rows[0]["created_at"] == "2026-01-06T08:00:00"
+    assert rows[3]["created_at"] == "2026-01-05T04:00:00"
+    assert rows[3]["route_id"] == "R1" and rows[3]["quality_flag"] == "ok"
+
+
+def test_filters_apply_to_archived_journeys(journeys):
+    start, end = datetime(2026, 1, 5, 3, 30, tzinfo=timezone.utc), datetime(2026, 1, 7)
+    rows = _ndjson({"route_id": "R1", "start": start, "end": end}, journeys)
+    assert [row["id"] for row in rows] == ["j1", "j4"]
+
+    rows = _ndjson({"data_source": "official"}, journeys)
+    assert [row["id"] for row in rows] == ["other"]
+
+
+def test_hot_only_export(journeys):
+    statement = JourneyExport.statement(route_id="R1")
+    body = b"".join(JourneyExport.stream("ndjson", statement, size=2))
+    assert [json.loads(line)["id"] for line in body.splitlines()] == ["j1", "j2", "j3"]
+
+
+def test_csv_streams_a_header_then_one_chunk_per_batch(journeys):
+    statement = JourneyExport.statement(route_id="R1")
+    chunks = list(JourneyExport.stream("csv", statement, size=2, archived={"route_id": "R1", "root": journeys}))
+
+    # Header, two hot batches, two archived ones with j3 dropped from the first
+    assert len(chunks) == 5
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8"))))
+    assert rows[0] == list(COLUMNS)
+    records = [dict(zip(COLUMNS, row)) for row in rows[1:]]
+    assert [record["id"] for record in records] == ["j1", "j2", "j3", "j4", "j5"]
+    assert records[0]["predicted_arrival"] == ""  # None is an empty field
+    assert records[0]["is_synthetic"] == "False"
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        list(JourneyExport.stream("xml", JourneyExport.statement()))
@@ -0,0 +1,206 @@
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.Services.journeyService.idempotency import (
+    INTERNAL_CLIENT,
+    MAX_KEY_LENGTH,
+    IdempotencyStore,
+    client_identity,
+    validate_key,
+)
+
+BODY = IdempotencyStore.fingerprint('{"route_id": "16"}')
+OTHER_BODY = IdempotencyStore.fingerprint('{"route_id": "17"}')
+
+
+def _counting(response="created"):
+    calls = []
+
+    def handler():
+        calls.append(1)
+        return {"journey": response, "call": len(calls)}
+
+    return handler, calls
+
+
+def test_retry_replays_first_response():
+    store = IdempotencyStore()
+    handler, calls = _counting()
+
+    assert store.run(("start", "k1"), BODY, handler) == ({"journey": "created", "call": 1}, False)
+    assert store.run(("start", "k1"), BODY, handler) == ({"journey": "created", "call": 1}, True)
+    assert len(calls) == 1
+    assert store.stats()["replays"] == 1
+
+
+def test_key_reused_with_different_body_is_rejected():
+    store = IdempotencyStore()
+    handler, _ = _counting()
+    store.run(("start", "k1"), BODY, handler)
+
+    with pytest.raises(HTTPException) as conflict:
+        store.run(("start", "k1"), OTHER_BODY, handler)
+    assert conflict.value.status_code == 422
+    assert store.stats()["conflicts"] == 1
+
+
+def test_failed_requests_are_not_stored():
+    store = IdempotencyStore()
+
+    def failing():
+        raise HTTPException(404, "Route not found")
+
+    with pytest.raises(HTTPException):
+        store.run(("start", "k1"), BODY, failing)
+    handler, calls = _counting()
+    assert store.run(("start", "k1"), BODY, handler)[1] is False
+    assert len(calls) == 1
+
+
+def test_keys_are_scoped_per_client_and_endpoint():
+    store = IdempotencyStore()
+    handler, calls = _counting()
+    alice, bob = client_identity({"sub": "alice"}), client_identity({"sub": "bob"})
+
+    store.run((alice, "start", "k1"), BODY, handler)
+    # Same key, different client or endpoint: a separate request, even with another body
+    assert store.run((bob, "start", "k1"), OTHER_BODY, handler)[1] is False
+    assert store.run((INTERNAL_CLIENT, "start", "k1"), BODY, handler)[1] is False
+    assert store.run((alice, "event", "j1", "k1"), BODY, handler)[1] is False
+    assert len(calls) == 4
+
+
+def test_client_identity():
+    assert client_identity(None) == INTERNAL_CLIENT
+    assert client_identity({"sub": "alice", "exp": 1}) == client_identity({"sub": "alice", "exp": 2})
+    # Tokens without a subject are told apart by their claims
+    assert client_identity({"exp": 1}) != client_identity({"exp": 2})
+    assert client_identity({"exp": 1}) == client_identity({"exp": 1})
+
+
+def _slow(store_calls: list, started: threading.Event, release: threading.Event, fail: bool = False):
+    def handler():
+        store_calls.append(1)
+        started.set()
+        release.wait(2)
+        if fail:
+            raise HTTPException(503, "Busy")
+        return {"call": len(store_calls)}
+
+    return handler
+
+
+def test_concurrent_retries_wait_for_the_first_request():
+    store = IdempotencyStore()
+    calls, started, release = [], threading.Event(), threading.Event()
+    handler = _slow(calls, started, release)
+    results = []
+
+    def run():
+        results.append(store.run(("start", "k1"), BODY, handler))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    threads[0].start()
+    started.wait(1)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    assert store.stats()["in_flight"] == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(replayed for _, replayed in results) == [False, True, True, True]
+    assert {response["call"] for response, _ in results} == {1}
+    assert store.stats()["in_flight"] == 0
+
+
+def test_concurrent_retry_with_different_body_is_rejected_at_once():
+    store = IdempotencyStore()
+    calls, started, release = [], threading.Event(), threading.Event()
+    leader = threading.Thread(target=store.run, args=(("start", "k1"), BODY, _slow(calls, started, release)))
+    leader.start()
+    started.wait(1)
+    try:
+        with pytest.raises(HTTPException) as conflict:
+            store.run(("start", "k1"), OTHER_BODY, lambda: None)
+        assert conflict.value.status_code == 422
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_retry_gives_up_on_a_stuck_first_request(monkeypatch):
+    store = IdempotencyStore()
+    monkeypatch.setattr(store, "WAIT_SECONDS", 0.05)
+    calls, started, release = [], threading.Event(), threading.Event()
+    leader = threading.Thread(target=store.run, args=(("start", "k1"), BODY, _slow(calls, started, release)))
+    leader.start()
+    started.wait(1)
+    try:
+        with pytest.raises(HTTPException) as busy:
+            store.run(("start", "k1"), BODY, lambda: None)
+        assert busy.value.status_code == 409
+    finally:
+        release.set()
+        leader.join()
+
+
+def test_waiting_retry_runs_itself_when_the_first_request_fails():
+    store = IdempotencyStore()
+    calls, started, release = [], threading.Event(), threading.Event()
+
+    def lead():
+        with pytest.raises(HTTPException):
+            store.run(("start", "k1"), BODY, _slow(calls, started, release, fail=True))
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    started.wait(1)
+    retry_handler, retry_calls = _counting("second")
+    results = []
+    retry = threading.Thread(target=lambda: results.append(store.run(("start", "k1"), BODY, retry_handler)))
+    retry.start()
+    time.sleep(0.05)
+    release.set()
+    leader.join()
+    retry.join()
+
+    assert results == [({"journey": "second", "call": 1}, False)]
+
+
+def test_validate_key():
+    assert validate_key("  abc  ") == "abc"
+    assert validate_key("k" * MAX_KEY_LENGTH) == "k" * MAX_KEY_LENGTH
+    for bad in ("", "   ", "k" * (MAX_KEY_LENGTH + 1)):
+        with pytest.raises(HTTPException) as invalid:
+            validate_key(bad)
+        assert invalid.value.status_code == 400
+
+
+def test_router_scopes_keys_by_client():
+    from fastapi import Response
+
+    from app.routers.Journey import _idempotent
+    from app.Services.journeyService.idempotency import get_idempotency_store
+
+    get_idempotency_store.reset()
+    try:
+        handler, calls = _counting()
+        alice, bob = {"sub": "alice"}, {"sub": "bob"}
+        body = '{"route_id": "16"}'
+
+        _idempotent(("start",), alice, "k1", body, Response(), handler)
+        replay = Response()
+        _idempotent(("start",), alice, "k1", body, replay, handler)
+        _idempotent(("start",), bob, "k1", body, Response(), handler)
+        _idempotent(("start",), alice, None, body, Response(), handler)  # No key, always runs
+
+        assert replay.headers["Idempotent-Replayed"] == "true"
+        assert len(calls) == 3
+    finally:
+        get_idempotency_store.reset()
@@ -0,0 +1,84 @@
+import sys
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, select, text
+
+from app.models import Database
+from app.models.Journey import Journey
+from app.Scripts import migrate_journey_datetimes as migration
+from app.utils.dates import as_utc
+
+LEGACY_ROWS = [
+    # Summer: "HH:MM" timetable times are BST, an hour ahead of UTC
+    {"id": "j1", "planned": "2026-07-01 07:50:00", "created": "2026-07-01 07:45:00",
+     "arrival": "2026-07-01 08:45:00", "start": "08:55", "end": "09:40"},
+    # No planned start: placed on created_at's day, and the end runs past midnight
+    {"id": "j2", "planned": None, "created": "2026-01-24 23:00:00",
+     "arrival": None, "start": "23:50", "end": "00:20"},
+    {"id": "j3", "planned": "2026-01-24 08:00:00", "created": "2026-01-24 07:55:00",
+     "arrival": "soon", "start": "8:5", "end": None},
+]
+
+
+def _at(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def legacy_engine(tmp_path, monkeypatch):
+    """A database whose journeys table still holds the three times as strings."""
+    monkeypatch.setenv("TIMETABLE_TZ", "Europe/London")
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    import app.models.Route  # noqa: F401  (register tables)
+    Database.Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for name in migration.COLUMNS:
+            conn.execute(text(f"ALTER TABLE journeys DROP COLUMN {name}"))
+            conn.execute(text(f"ALTER TABLE journeys ADD COLUMN {name} VARCHAR"))
+        for row in LEGACY_ROWS:
+            conn.execute(text(
+                "INSERT INTO journeys (id, route_id, start_stop_id, planned_start_time, created_at, "
+                "predicted_status, data_source, predicted_arrival, official_start_time, official_end_time) "
+                "VALUES (:id, 'R1', 'S1', :planned, :created, 'on_time', 'user', :arrival, :start, :end)"
+            ), row)
+
+    monkeypatch.setattr(Database, "engine", engine)
+    monkeypatch.setattr(sys, "argv", ["migrate_journey_datetimes", "--batch-size", "2"])
+    yield engine
+    engine.dispose()
+
+
+def _migrated(engine) -> dict[str, tuple]:
+    table = Journey.__table__
+    columns = (table.c.id, table.c.predicted_arrival, table.c.official_start_time, table.c.official_end_time)
+    with engine.connect() as conn:
+        return {row[0]: tuple(as_utc(value) for value in row[1:]) for row in conn.execute(select(*columns))}
+
+
+def _check(engine):
+    assert _migrated(engine) == {
+        "j1": (_at(2026, 7, 1, 8, 45), _at(2026, 7, 1, 7, 55), _at(2026, 7, 1, 8, 40)),
+        "j2": (None, _at(2026, 1, 24, 23, 50), _at(2026, 1, 25, 0, 20)),
+        # Values that don't parse become NULL
+        "j3": (None, None, None),
+    }
+    names = {column["name"] for column in inspect(engine).get_columns("journeys")}
+    assert not any(name.endswith("_text") for name in names)
+
+
+def test_string_columns_become_timestamps(legacy_engine, capsys):
+    migration.main()
+    assert "Converted 3 journeys" in capsys.readouterr().out
+    _check(legacy_engine)
+
+    migration.main()
+    assert "Already migrated" in capsys.readouterr().out
+
+
+def test_rerun_after_an_interrupted_run_finishes_the_job(legacy_engine, capsys):
+    # Columns renamed aside and added, then the run died before the backfill
+    assert migration._prepare(legacy_engine)
+    migration.main()
+    assert "Converted 3 journeys" in capsys.readouterr().out
+    _check(legacy_engine)
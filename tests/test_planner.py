@@ -0,0 +1,128 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from app.Services.Catalog.snapshot import CatalogSnapshot, pack_snapshot
+from app.Services.Planner.planner import CompiledNetwork
+from app.utils.timetable import timetable_minute, timetable_span
+
+UTC = ZoneInfo("UTC")
+LONDON = ZoneInfo("Europe/London")
+
+
+def _network(trips: dict, routes: list[dict], stats: dict | None = None, segments: dict | None = None) -> CompiledNetwork:
+    stop_ids = sorted({stop for route in routes for stop in route["stops"]} | {"LONELY"})
+    stops = [{"id": stop_id, "name": stop_id, "latitude": 0.0, "longitude": 0.0} for stop_id in stop_ids]
+    for route in routes:
+        route.setdefault("name", route["id"])
+        route.setdefault("direction", "outbound")
+        route.setdefault("distances", [100.0 * i for i in range(len(route["stops"]))])
+    return CompiledNetwork(CatalogSnapshot(pack_snapshot(routes, stops, trips, stats or {}, segments)))
+
+
+def _minutes(hour: int, minute: int = 0) -> int:
+    return hour * 60 + minute
+
+
+# A runs A1-A2-A3 taking 30 min; B runs A3-B1 taking 20 min; X runs A1-B1 directly but slowly
+ROUTES = [
+    {"id": "A", "stops": ["A1", "A2", "A3"]},
+    {"id": "B", "stops": ["A3", "B1"]},
+    {"id": "X", "stops": ["A1", "B1"]},
+]
+TRIPS = {
+    "A": [(_minutes(8), _minutes(8, 30)), (_minutes(9), _minutes(9, 30))],
+    "B": [(_minutes(8, 30), _minutes(8, 50)), (_minutes(8, 40), _minutes(9))],
+    "X": [(_minutes(8, 5), _minutes(9, 30))],
+}
+
+
+def _plan(network, origin, target, when, options=1):
+    return network.plan(origin, target, when, options=options, tz=UTC)
+
+
+def test_direct_trip_earliest_arrival():
+    network = _network(TRIPS, [dict(r) for r in ROUTES])
+    (plan,) = _plan(network, "A1", "A3", datetime(2026, 1, 24, 7, 50, tzinfo=UTC))
+
+    assert plan["departure"] == "2026-01-24T08:00:00+00:00"
+    assert plan["arrival"] == "2026-01-24T08:30:00+00:00"
+    assert plan["transfers"] == 0
+    assert [leg["route_id"] for leg in plan["legs"]] == ["A"]
+
+
+def test_transfer_respects_minimum_connection_time():
+    network = _network(TRIPS, [dict(r) for r in ROUTES])
+    (plan,) = _plan(network, "A1", "B1", datetime(2026, 1, 24, 7, 50, tzinfo=UTC))
+
+    # Arriving A3 at 08:30, the 08:30 B leaves too soon after the 60s transfer; the 08:40 beats route X
+    assert plan["transfers"] == 1
+    assert [(leg["route_id"], leg["from_stop_id"], leg["to_stop_id"]) for leg in plan["legs"]] == [
+        ("A", "A1", "A3"), ("B", "A3", "B1"),
+    ]
+    assert plan["legs"][1]["departure"] == "2026-01-24T08:40:00+00:00"
+    assert plan["arrival"] == "2026-01-24T09:00:00+00:00"
+
+
+def test_later_options_leave_later():
+    network = _network(TRIPS, [dict(r) for r in ROUTES])
+    plans = _plan(network, "A1", "A3", datetime(2026, 1, 24, 7, 50, tzinfo=UTC), options=3)
+    assert [plan["departure"][11:16] for plan in plans] == ["08:00", "09:00"]
+
+
+def test_unreachable_and_unknown_stops():
+    network = _network(TRIPS, [dict(r) for r in ROUTES])
+    when = datetime(2026, 1, 24, 7, 50, tzinfo=UTC)
+
+    assert _plan(network, "B1", "A1", when) == []  # No route runs that way
+    assert _plan(network, "A1", "LONELY", when) == []  # Stop no route serves
+    assert _plan(network, "A1", "NOPE", when) == []
+    assert _plan(network, "A1", "A1", when) == []
+    # Nothing leaves within the scan horizon
+    assert _plan(network, "A1", "A3", datetime(2026, 1, 24, 10, 0, tzinfo=UTC)) == []
+
+
+def test_late_query_finds_next_days_first_trip():
+    trips = {"A": [(_minutes(0, 30), _minutes(1)), (_minutes(22), _minutes(22, 30))]}
+    network = _network(trips, [{"id": "A", "stops": ["A1", "A2", "A3"]}])
+    (plan,) = _plan(network, "A1", "A3", datetime(2026, 1, 24, 23, 0, tzinfo=UTC))
+
+    assert plan["departure"] == "2026-01-25T00:30:00+00:00"
+    assert plan["arrival"] == "2026-01-25T01:00:00+00:00"
+
+
+def test_small_hours_query_boards_trip_from_previous_day():
+    # Leaves 23:50 and reaches A2 at 00:05, A3 at 00:20 the next day
+    trips = {"A": [(_minutes(23, 50), _minutes(24, 20))]}
+    network = _network(trips, [{"id": "A", "stops": ["A1", "A2", "A3"]}])
+    (plan,) = _plan(network, "A2", "A3", datetime(2026, 1, 25, 0, 1, tzinfo=UTC))
+
+    assert plan["departure"] == "2026-01-25T00:05:00+00:00"
+    assert plan["arrival"] == "2026-01-25T00:20:00+00:00"
+
+
+def test_local_timetable_times():
+    trips = {"A": [(_minutes(8), _minutes(8, 30))]}
+    network = _network(trips, [{"id": "A", "stops": ["A1", "A2", "A3"]}])
+    # 08:00 London summer time is 07:00 UTC
+    (plan,) = network.plan("A1", "A3", datetime(2026, 7, 1, 6, 0, tzinfo=UTC), tz=LONDON)
+    assert plan["departure"] == "2026-07-01T07:00:00+00:00"
+
+
+def test_legs_use_learned_segment_factors_over_the_route_factor():
+    trips = {"A": [(_minutes(8), _minutes(8, 30))]}
+    stats = {"A": {"count": 50, "avg_sec": 3600.0, "median_sec": 3600.0, "p75_sec": 3600.0}}
+    # The first leg has its own factor (1.0), the second falls back to the route's (2.0)
+    segments = {"A": [1.0, 0.0, 0.0]}
+    network = _network(trips, [{"id": "A", "stops": ["A1", "A2", "A3"]}], stats=stats, segments=segments)
+
+    (to_a2,) = _plan(network, "A1", "A2", datetime(2026, 1, 24, 7, 50, tzinfo=UTC))
+    (to_a3,) = _plan(network, "A1", "A3", datetime(2026, 1, 24, 7, 50, tzinfo=UTC))
+    assert to_a2["duration_minutes"] == 15.0
+    assert to_a3["duration_minutes"] == 45.0
+
+
+def test_timetable_span_runs_past_midnight():
+    start, end = timetable_span(datetime(2026, 1, 24, 12, 0), timetable_minute("23:50"), timetable_minute("0020"))
+    assert start.isoformat() == "2026-01-24T23:50:00+00:00"
+    assert end.isoformat() == "2026-01-25T00:20:00+00:00"
+    assert timetable_minute("8:5") is None and timetable_minute(None) is None
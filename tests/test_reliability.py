@@ -0,0 +1,161 @@
+import math
+import statistics
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.Journey import Journey
+from app.models.Reliability import RouteReliability
+from app.Services.Reliability.rollup import DELAY_BUCKETS, ReliabilityRollup, _add, _percentile, _slots
+
+
+@pytest.fixture(autouse=True)
+def london(monkeypatch):
+    monkeypatch.setenv("TIMETABLE_TZ", "Europe/London")
+
+
+def _exact_percentile(values: list[float], q: float) -> float:
+    return statistics.quantiles(values, n=100, method="inclusive")[round(q * 100) - 1]
+
+
+def _histogram(delays: list[float]) -> list[int]:
+    row = RouteReliability()
+    for delay in delays:
+        _add(row, {"delay": delay, "duration": None})
+    return row.delay_histogram
+
+
+def test_histogram_percentiles_track_exact_ones():
+    # Evenly spread from 5 min early to 30 min late, so every bucket it touches is filled edge to edge
+    delays = [-300 + 1.5 + i * 3 for i in range(700)]
+    histogram = _histogram(delays)
+
+    for q in (0.1, 0.25, 0.5, 0.75, 0.9):
+        estimate = _percentile(histogram, len(delays), q)
+        assert estimate == pytest.approx(_exact_percentile(delays, q), abs=3)
+
+
+def test_histogram_percentiles_on_a_skewed_sample():
+    # Mostly a minute or two late, a tail of badly late buses
+    delays = [30.0] * 40 + [90.0] * 30 + [150.0] * 20 + [700.0] * 8 + [2000.0] * 2
+    histogram = _histogram(delays)
+
+    # Read off the right bucket, interpolated inside it
+    assert 0 <= _percentile(histogram, len(delays), 0.25) < 60
+    assert 60 <= _percentile(histogram, len(delays), 0.5) < 120
+    assert 600 <= _percentile(histogram, len(delays), 0.95) < 900
+    assert _percentile(histogram, 0, 0.5) is None
+
+
+def test_buckets_cover_edges():
+    histogram = _histogram([-1000, -300, 0, 59.9, 60, 10_000])
+    assert len(histogram) == len(DELAY_BUCKETS) + 1
+    assert histogram[0] == 1  # Earlier than the first edge
+    assert histogram[1] == 1  # -300 is the first bucket's upper edge, so it goes in the next one
+    assert histogram[-1] == 1  # Open ended last bucket
+    assert sum(histogram) == 6
+
+
+def test_local_day_and_hour_slots():
+    # 23:30 UTC in July is 00:30 BST the next day
+    slots = _slots(datetime(2026, 7, 1, 23, 30))
+    assert slots["hour"] == (datetime(2026, 7, 1, 23, 0), 0)
+    assert slots["day"] == (datetime(2026, 7, 1, 23, 0), None)
+
+    # In winter local time is UTC
+    slots = _slots(datetime(2026, 1, 15, 23, 30))
+    assert slots["hour"] == (datetime(2026, 1, 15, 23, 0), 23)
+    assert slots["day"] == (datetime(2026, 1, 15, 0, 0), None)
+
+
+def _journey(planned: datetime, delay_sec: float, duration_min: float = 20, **values) -> Journey:
+    start = planned + timedelta(seconds=delay_sec)
+    fields = dict(
+        id=str(uuid.uuid4()), route_id="R1", start_stop_id="S1", end_stop_id="S2",
+        planned_start_time=planned, start_time=start, end_time=start + timedelta(minutes=duration_min),
+        status="STOP_REACHED", created_at=planned - timedelta(minutes=5), predicted_status="on_time",
+        data_source="user", is_synthetic=False, quality_flag="ok",
+    )
+    fields.update(values)
+    return Journey(**fields)
+
+
+def _record(db, journeys):
+    for journey in journeys:
+        db.add(journey)
+        db.commit()
+        ReliabilityRollup.record(db, journey)
+
+
+# Five January days, three journeys a day at 07:10, 08:10 and 17:10 with growing delays
+def _week(db):
+    journeys = []
+    for day in range(5):
+        for n, hour in enumerate((7, 8, 17)):
+            journeys.append(_journey(datetime(2026, 1, 5 + day, hour, 10), delay_sec=60 * (day + n)))
+    _record(db, journeys)
+    return journeys
+
+
+def test_query_merges_daily_rows_with_hourly_edges(db):
+    journeys = _week(db)
+
+    # From 08:00 on the 5th to 08:00 on the 9th: partial days at both ends, three whole days between
+    result = ReliabilityRollup.query(db, "R1", datetime(2026, 1, 5, 8, 0), datetime(2026, 1, 9, 8, 0))
+    inside = [j for j in journeys if datetime(2026, 1, 5, 8) <= j.planned_start_time < datetime(2026, 1, 9, 8)]
+    delays = [(j.start_time - j.planned_start_time).total_seconds() for j in inside]
+
+    assert result["journeys"] == len(inside) == 12
+    # 2 hourly rows on the 5th, 3 daily rows, 1 hourly row on the 9th
+    assert result["rows_merged"] == 6
+    assert result["mean_delay_minutes"] == round(statistics.mean(delays) / 60, 1)
+    assert result["delay_stddev_minutes"] == round(statistics.pstdev(delays) / 60, 1)
+    assert result["on_time_pct"] == round(100 * sum(d <= 300 for d in delays) / len(delays), 1)
+    assert result["avg_duration_minutes"] == 20.0
+    assert abs(result["median_delay_minutes"] - statistics.median(delays) / 60) <= 1.0
+
+
+def test_query_by_local_hour(db):
+    _week(db)
+    result = ReliabilityRollup.query(db, "R1", datetime(2026, 1, 1), datetime(2026, 2, 1), hour=8)
+    assert result["journeys"] == 5
+    assert result["rows_merged"] == 5
+    # 8am delays are 1..5 minutes
+    assert result["mean_delay_minutes"] == 3.0
+
+
+def test_only_usable_user_journeys_count(db):
+    planned = datetime(2026, 1, 5, 8, 0)
+    skipped = [
+        _journey(planned, 60, is_synthetic=True),
+        _journey(planned, 60, data_source="official"),
+        _journey(planned, 60, quality_flag="outlier"),
+        _journey(planned, 60, status="ABANDONED"),
+    ]
+    for journey in skipped:
+        db.add(journey)
+    db.commit()
+    assert not any(ReliabilityRollup.record(db, journey) for journey in skipped)
+    assert db.query(RouteReliability).count() == 0
+
+
+def test_rebuild_matches_incremental_rollups(db, tmp_path):
+    _week(db)
+    incremental = ReliabilityRollup.query(db, "R1", datetime(2026, 1, 1), datetime(2026, 2, 1))
+
+    db.query(RouteReliability).delete()
+    db.commit()
+    assert ReliabilityRollup.rebuild(db, root=str(tmp_path / "no-archive")) == 15
+    rebuilt = ReliabilityRollup.query(db, "R1", datetime(2026, 1, 1), datetime(2026, 2, 1))
+
+    assert rebuilt == incremental
+    assert rebuilt["journeys"] == 15 and not math.isnan(rebuilt["mean_delay_minutes"])
+
+
+def test_rebuild_since_keeps_earlier_rows(db, tmp_path):
+    _week(db)
+    assert ReliabilityRollup.rebuild(db, since=datetime(2026, 1, 8, 12, 0), root=str(tmp_path)) == 6
+    # The 8th is rebuilt whole, earlier days are untouched
+    result = ReliabilityRollup.query(db, "R1", datetime(2026, 1, 1), datetime(2026, 2, 1))
+    assert result["journeys"] == 15
@@ -0,0 +1,119 @@
+import asyncio
+import importlib
+import sys
+import threading
+
+import pytest
+
+from app.Services.Scheduler import jobs
+from app.Services.Scheduler import scheduler as sch
+
+
+@pytest.fixture
+def fake_jobs(monkeypatch):
+    """Swap in jobs built from plain functions, with fresh stats. Returns a setter."""
+    def install(**funcs):
+        job_table = {}
+        for name, func in funcs.items():
+            monkeypatch.setenv(f"TEST_{name.upper()}_SECONDS", "0.02")
+            job_table[name] = sch.Job(name, func, f"TEST_{name.upper()}_SECONDS", 60)
+        monkeypatch.setattr(sch, "JOBS", job_table)
+        monkeypatch.setattr(sch, "_stats", {name: sch.JobStats() for name in job_table})
+
+    return install
+
+
+def _blocking():
+    started, release = threading.Event(), threading.Event()
+
+    def func():
+        started.set()
+        release.wait(2)
+        return {"done": True}
+
+    return func, started, release
+
+
+def test_run_job_skips_while_the_previous_run_is_going(fake_jobs):
+    func, started, release = _blocking()
+    fake_jobs(slow=func)
+    first = threading.Thread(target=sch.run_job, args=("slow",))
+    first.start()
+    started.wait(1)
+
+    assert sch.run_job("slow") is None
+    assert sch.stats()["jobs"]["slow"]["running"] is True
+    release.set()
+    first.join()
+
+    slow = sch.stats()["jobs"]["slow"]
+    assert (slow["runs"], slow["skipped"], slow["running"]) == (1, 1, False)
+    assert slow["last_result"] == {"done": True}
+    # Free again once it finished
+    assert sch.run_job("slow") == {"done": True}
+
+
+def test_run_job_counts_failures_without_raising(fake_jobs):
+    def broken():
+        raise RuntimeError("no database")
+
+    fake_jobs(broken=broken)
+    assert sch.run_job("broken") is None
+    broken_stats = sch.stats()["jobs"]["broken"]
+    assert (broken_stats["runs"], broken_stats["failures"]) == (1, 1)
+    assert broken_stats["last_result"] == "error: no database"
+
+
+def test_local_scheduler_runs_jobs_concurrently_and_skips_overlaps(fake_jobs, monkeypatch):
+    slow, started, release = _blocking()
+    fast_runs = []
+    fake_jobs(slow=slow, fast=lambda: fast_runs.append(1) or {})
+    monkeypatch.setattr(sch.LocalScheduler, "TICK_SECONDS", 0.01)
+
+    async def run():
+        scheduler = sch.LocalScheduler(["slow", "fast"])
+        scheduler.start()
+        await asyncio.sleep(0.4)
+        await scheduler.stop()
+
+    try:
+        asyncio.run(run())
+        # The fast job kept running while the slow one held its thread
+        assert started.is_set()
+        assert len(fast_runs) >= 3
+        assert sch.stats()["jobs"]["slow"]["skipped"] >= 3
+        assert sch.stats()["jobs"]["fast"]["skipped"] == 0
+    finally:
+        release.set()
+
+
+def test_build_local_scheduler_follows_the_mode(monkeypatch):
+    monkeypatch.setenv("SCHEDULER_MODE", "off")
+    assert sch.build_local_scheduler().job_names == []
+    monkeypatch.setenv("SCHEDULER_MODE", "worker")
+    assert sch.build_local_scheduler().job_names == ["catalog_reload"]
+    monkeypatch.setenv("SCHEDULER_MODE", "local")
+    assert sch.build_local_scheduler().job_names == list(sch.JOBS)
+
+
+def test_host_lock_is_exclusive(tmp_path, monkeypatch):
+    monkeypatch.setenv("SCHEDULER_LOCK_DIR", str(tmp_path))
+    with jobs._exclusive("archive") as first:
+        with jobs._exclusive("archive") as second, jobs._exclusive("snapshot") as other:
+            assert (first, second, other) == (True, False, True)
+    with jobs._exclusive("archive") as again:
+        assert again
+
+
+def test_jobs_import_without_fcntl(monkeypatch):
+    # As on Windows: the module still imports and jobs run without the host lock
+    monkeypatch.setitem(sys.modules, "fcntl", None)
+    try:
+        reloaded = importlib.reload(jobs)
+        assert reloaded.fcntl is None
+        with reloaded._exclusive("archive") as first, reloaded._exclusive("archive") as second:
+            assert first and second
+    finally:
+        monkeypatch.undo()
+        importlib.reload(jobs)
+    assert jobs.fcntl is not None
@@ -0,0 +1,21 @@
+from app.Scripts.profile_startup import FORBIDDEN, profile_imports
+
+IMPORT_BUDGET_MS = 1500
+# Loaded by create_app(), never by importing main
+DEFERRED = ("app.routers", "app.models", "app.Services", "app.dependencies", "dotenv")
+
+
+def test_importing_main_stays_within_budget():
+    modules = profile_imports("main")
+    names = {name for name, _, _ in modules}
+
+    assert not sorted(name for name in names if name.split(".")[0] in FORBIDDEN)
+    assert not sorted(name for name in names if name.startswith(DEFERRED))
+    assert sum(self_us for _, self_us, _ in modules) / 1000 < IMPORT_BUDGET_MS
+
+
+def test_factory_builds_the_app():
+    from main import create_app
+
+    paths = set(create_app().openapi()["paths"])
+    assert {"/health", "/journeys/start", "/internal/metrics"} <= paths